@@ -17,13 +17,13 @@
 import contextlib
 import getpass
 import hashlib
+import io
 import json
 import logging
 import operator
 import os
 import re
 import subprocess
-import tempfile
 from datetime import datetime
 from subprocess import Popen
 from typing import Dict, Iterable, TextIO
@@ -32,9 +32,9 @@ from typing import Dict, Iterable, TextIO
 from snapcraft.cli import echo
 from tabulate import tabulate
 
-from snapcraft.file_utils import calculate_sha3_384, get_tool_path
+from snapcraft.file_utils import calculate_sha3_384
 from snapcraft import storeapi, yaml_utils
-from snapcraft.internal import cache, deltas, repo
+from snapcraft.internal import cache, deltas, repo, squashfs
 from snapcraft.internal.errors import SnapDataExtractionError
 from snapcraft.internal.deltas.errors import (
     DeltaGenerationError,
@@ -47,59 +47,27 @@ logger = logging.getLogger(__name__)
 
 
 def _get_data_from_snap_file(snap_path):
-    with tempfile.TemporaryDirectory() as temp_dir:
-        unsquashfs_path = get_tool_path("unsquashfs")
-        try:
-            output = subprocess.check_output(
-                [
-                    unsquashfs_path,
-                    "-d",
-                    os.path.join(temp_dir, "squashfs-root"),
-                    snap_path,
-                    "-e",
-                    os.path.join("meta", "snap.yaml"),
-                ]
-            )
-        except subprocess.CalledProcessError:
-            raise SnapDataExtractionError(os.path.basename(snap_path))
-        logger.debug(output)
-        with open(
-            os.path.join(temp_dir, "squashfs-root", "meta", "snap.yaml")
-        ) as yaml_file:
-            snap_yaml = yaml_utils.load(yaml_file)
-    return snap_yaml
+    snap_yaml = squashfs.read_snap_file(snap_path, "meta/snap.yaml")
+    if snap_yaml is None:
+        raise SnapDataExtractionError(os.path.basename(snap_path))
+    return yaml_utils.load(snap_yaml)
 
 
 @contextlib.contextmanager
 def _get_icon_from_snap_file(snap_path):
     icon_file = None
-    with tempfile.TemporaryDirectory() as temp_dir:
-        unsquashfs_path = get_tool_path("unsquashfs")
-        try:
-            output = subprocess.check_output(
-                [
-                    unsquashfs_path,
-                    "-d",
-                    os.path.join(temp_dir, "squashfs-root"),
-                    snap_path,
-                    "-e",
-                    "meta/gui",
-                ]
-            )
-        except subprocess.CalledProcessError:
-            raise SnapDataExtractionError(os.path.basename(snap_path))
-        logger.debug("Output extracting icon from snap: %s", output)
-        for extension in ("png", "svg"):
-            icon_name = "icon.{}".format(extension)
-            icon_path = os.path.join(temp_dir, "squashfs-root", "meta/gui", icon_name)
-            if os.path.exists(icon_path):
-                icon_file = open(icon_path, "rb")
-                break
-        try:
-            yield icon_file
-        finally:
-            if icon_file is not None:
-                icon_file.close()
+    for extension in ("png", "svg"):
+        icon_name = "icon.{}".format(extension)
+        icon = squashfs.read_snap_file(snap_path, "meta/gui/{}".format(icon_name))
+        if icon is not None:
+            icon_file = io.BytesIO(icon)
+            icon_file.name = icon_name
+            break
+    try:
+        yield icon_file
+    finally:
+        if icon_file is not None:
+            icon_file.close()
 
 
 def _fail_login(msg: str = "") -> bool:
@@ -608,7 +576,8 @@ def _push_delta(snap_name, snap_filename, source_snap):
         raise storeapi.errors.StoreDeltaApplicationError(str(e))
 
     snap_hashes = {
-        "source_hash": calculate_sha3_384(source_snap),
+        # Cached snaps are named after their hash.
+        "source_hash": os.path.basename(source_snap),
         "target_hash": calculate_sha3_384(target_snap),
         "delta_hash": calculate_sha3_384(delta_filename),
     }
@@ -34,6 +34,7 @@ _BUILD_OPTION_NAMES = [
     "--shell-after",
     "--destructive-mode",
     "--use-lxd",
+    "--jobs",
 ]
 
 _BUILD_OPTIONS = [
@@ -45,6 +46,11 @@ _BUILD_OPTIONS = [
         is_flag=True, help="Forces snapcraft to try and use the current host to build."
     ),
     dict(is_flag=True, help="Forces snapcraft to use LXD to build."),
+    dict(
+        metavar="<jobs>",
+        type=click.IntRange(min=1),
+        help="Number of parts to pull or build concurrently.",
+    ),
 ]
 
 
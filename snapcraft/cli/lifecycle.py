@@ -60,6 +60,7 @@ def _execute(  # noqa: C901
     _clean_provider_error()
 
     build_environment = get_build_environment(**kwargs)
+    jobs = kwargs.get("jobs")
     project = get_project(is_managed_host=build_environment.is_managed_host, **kwargs)
 
     echo.wrapped(
@@ -74,7 +75,7 @@ def _execute(  # noqa: C901
 
     if build_environment.is_managed_host or build_environment.is_host:
         project_config = project_loader.load_config(project)
-        lifecycle.execute(step, project_config, parts)
+        lifecycle.execute(step, project_config, parts, jobs=jobs or 1)
         if pack_project:
             _pack(project.prime_dir, output=output)
     else:
@@ -110,14 +111,14 @@ def _execute(  # noqa: C901
                         previous_step = step.previous_step()
                     # steps.PULL is the first step, so we would directly shell into it.
                     if previous_step:
-                        instance.execute_step(previous_step)
+                        instance.execute_step(previous_step, jobs=jobs)
                 elif pack_project:
-                    instance.pack_project(output=output)
+                    instance.pack_project(output=output, jobs=jobs)
                 elif setup_prime_try:
                     instance.expose_prime()
-                    instance.execute_step(step)
+                    instance.execute_step(step, jobs=jobs)
                 else:
-                    instance.execute_step(step)
+                    instance.execute_step(step, jobs=jobs)
             except Exception:
                 _retrieve_provider_error(instance)
                 if project.debug:
@@ -14,16 +14,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
 from contextlib import contextmanager, suppress
 import errno
+import fcntl
 import hashlib
 import logging
+import mmap
 import re
 import os
 import shutil
+import stat
 import subprocess
 import sys
-from typing import Pattern, Callable, Generator, List
+from typing import Pattern, Callable, Dict, Generator, Iterable, List, Tuple
 from typing import Set  # noqa F401
 
 from snapcraft.internal import common
@@ -42,6 +46,26 @@ if sys.version_info < (3, 6):
 
 logger = logging.getLogger(__name__)
 
+# The FICLONE ioctl from linux/fs.h, sharing the extents of a file.
+_FICLONE = 0x40049409
+
+# From fastest to slowest, each method falls back to the next one.
+_COPY_METHODS = ["reflink", "copy-file-range", "copy"]
+
+_copy_counts = collections.Counter()  # type: Dict[str, int]
+
+# Snaps are identified by the first one, and downloads verified with the last.
+_DIGEST_ALGORITHMS = tuple(
+    algorithm for algorithm in ("sha3_384", "sha512") if hasattr(hashlib, algorithm)
+)
+_DIGESTS_CACHE_SIZE = 16
+# Files are hashed in blocks of this size.
+_DIGESTS_BLOCK_SIZE = 2 ** 20
+# Larger files are read rather than mapped, as they may not fit in the
+# address space of 32-bit hosts.
+_DIGESTS_MAX_MAPPED_SIZE = sys.maxsize // 2
+_digests_cache = collections.OrderedDict()  # type: Dict[Tuple, Dict[str, str]]
+
 
 def replace_in_file(
     directory: str, file_pattern: Pattern, search_pattern: Pattern, replacement: str
@@ -163,7 +187,11 @@ def copy(source: str, destination: str, *, follow_symlinks: bool = False) -> Non
         os.unlink(destination)
 
     try:
-        shutil.copy2(source, destination, follow_symlinks=follow_symlinks)
+        if os.path.isfile(source) and (follow_symlinks or not os.path.islink(source)):
+            _copy_file_contents(source, destination)
+            shutil.copystat(source, destination)
+        else:
+            shutil.copy2(source, destination, follow_symlinks=follow_symlinks)
     except FileNotFoundError:
         raise SnapcraftCopyFileNotFoundError(source)
     uid = os.stat(source, follow_symlinks=follow_symlinks).st_uid
@@ -178,6 +206,58 @@ def copy(source: str, destination: str, *, follow_symlinks: bool = False) -> Non
         )
 
 
+def get_copy_counts() -> Dict[str, int]:
+    """Return how many files were copied using each copy method.
+
+    Files are counted since the last call to reset_copy_counts.
+    """
+    return dict(_copy_counts)
+
+
+def reset_copy_counts() -> None:
+    """Start counting the files copied using each copy method over."""
+    _copy_counts.clear()
+
+
+def _get_copy_methods() -> List[str]:
+    copy_method = os.environ.get("SNAPCRAFT_COPY_METHOD", _COPY_METHODS[0])
+    if copy_method not in _COPY_METHODS:
+        raise SnapcraftEnvironmentError(
+            "SNAPCRAFT_COPY_METHOD is set to {!r}, valid values are: {}.".format(
+                copy_method, ", ".join(_COPY_METHODS)
+            )
+        )
+    return _COPY_METHODS[_COPY_METHODS.index(copy_method) :]
+
+
+def _copy_file_contents(source: str, destination: str) -> None:
+    # Copy-on-write clones and in kernel copies are only possible on some
+    # filesystems, SNAPCRAFT_COPY_METHOD selects the first method to try.
+    copy_methods = _get_copy_methods()
+    with open(source, "rb") as source_file, open(destination, "wb") as dest_file:
+        if "reflink" in copy_methods:
+            with suppress(OSError):
+                fcntl.ioctl(dest_file.fileno(), _FICLONE, source_file.fileno())
+                _copy_counts["reflink"] += 1
+                return
+        if "copy-file-range" in copy_methods and hasattr(os, "copy_file_range"):
+            try:
+                size = os.fstat(source_file.fileno()).st_size
+                while os.copy_file_range(
+                    source_file.fileno(), dest_file.fileno(), size
+                ):
+                    pass
+            except OSError:
+                dest_file.seek(0)
+                dest_file.truncate()
+            else:
+                _copy_counts["copy-file-range"] += 1
+                return
+        source_file.seek(0)
+        shutil.copyfileobj(source_file, dest_file)
+        _copy_counts["copy"] += 1
+
+
 def link_or_copy_tree(
     source_tree: str,
     destination_tree: str,
@@ -250,6 +330,94 @@ def link_or_copy_tree(
             copy_function(source, destination)
 
 
+def sync_tree(
+    source_tree: str,
+    destination_tree: str,
+    *,
+    synced_paths: Iterable[str] = (),
+    ignore: Callable[[str, List[str]], List[str]] = None,
+    copy_function: Callable[..., None] = copy
+) -> Set[str]:
+    """Update a copy of a source tree, only copying what changed.
+
+    Files are copied again if their type, size or modification time differ
+    from those of the copy. Unlike with link_or_copy_tree, paths removed from
+    the source tree are also removed from the destination, but only if they
+    were synced from it before: anything else in the destination is kept.
+
+    :param str source_tree: Source directory to be synced.
+    :param str destination_tree: Destination directory.
+    :param synced_paths: The paths returned by the previous sync.
+    :param callable ignore: If given, called with two params, source dir and
+                            dir contents, for every dir synced. Should return
+                            list of contents to NOT sync.
+    :param callable copy_function: Callable that actually copies.
+    :returns: The paths that were synced, relative to the trees.
+    """
+    if not os.path.isdir(source_tree):
+        raise NotADirectoryError("{!r} is not a directory".format(source_tree))
+
+    create_similar_directory(source_tree, destination_tree)
+
+    paths = set()  # type: Set[str]
+    for root, directories, files in os.walk(source_tree, topdown=True):
+        ignored = set()  # type: Set[str]
+        if ignore is not None:
+            ignored = set(ignore(root, directories + files))
+        # Symlinks to directories are synced as files.
+        files.extend(d for d in directories if os.path.islink(os.path.join(root, d)))
+        directories[:] = [
+            d
+            for d in directories
+            if d not in ignored and not os.path.islink(os.path.join(root, d))
+        ]
+
+        for directory in directories:
+            source = os.path.join(root, directory)
+            relpath = os.path.relpath(source, source_tree)
+            destination = os.path.join(destination_tree, relpath)
+            if os.path.islink(destination) or os.path.isfile(destination):
+                os.remove(destination)
+            create_similar_directory(source, destination)
+            paths.add(relpath)
+
+        for file_name in set(files) - ignored:
+            source = os.path.join(root, file_name)
+            relpath = os.path.relpath(source, source_tree)
+            destination = os.path.join(destination_tree, relpath)
+            paths.add(relpath)
+
+            source_stat = os.lstat(source)
+            try:
+                destination_stat = os.lstat(destination)
+            except FileNotFoundError:
+                pass
+            else:
+                if (
+                    stat.S_IFMT(source_stat.st_mode)
+                    == stat.S_IFMT(destination_stat.st_mode)
+                    and source_stat.st_size == destination_stat.st_size
+                    and source_stat.st_mtime_ns == destination_stat.st_mtime_ns
+                ):
+                    continue
+                if stat.S_ISDIR(destination_stat.st_mode):
+                    shutil.rmtree(destination)
+            copy_function(source, destination)
+
+    # Remove the deepest paths first, so directories are empty by the time
+    # they are removed. Those that are not only had files not synced.
+    for relpath in sorted(set(synced_paths) - paths, reverse=True):
+        destination = os.path.join(destination_tree, relpath)
+        if os.path.isdir(destination) and not os.path.islink(destination):
+            with suppress(OSError):
+                os.rmdir(destination)
+        else:
+            with suppress(FileNotFoundError):
+                os.remove(destination)
+
+    return paths
+
+
 def create_similar_directory(
     source: str, destination: str, follow_symlinks: bool = False
 ) -> None:
@@ -318,17 +486,79 @@ def calculate_sha3_384(path: str) -> str:
 
 def calculate_hash(path: str, *, algorithm: str) -> str:
     """Calculate the hash for path with algorithm."""
-    # This will raise an AttributeError if algorithm is unsupported
-    hasher = getattr(hashlib, algorithm)()
+    return calculate_digests(path, algorithms=[algorithm])[algorithm]
+
+
+def calculate_digests(
+    path: str, *, algorithms: Iterable[str] = _DIGEST_ALGORITHMS
+) -> Dict[str, str]:
+    """Calculate the digests of path with all of algorithms, in one read.
+
+    The digests are kept for as long as the file is unchanged, so files
+    such as snaps are only read again if a digest not computed yet is asked
+    for.
+
+    :param str path: the file to calculate the digests of.
+    :param list algorithms: the algorithms understood by hashlib to use
+                            (default: the ones snaps are identified with).
+    :returns: the digests by algorithm.
+    """
+    algorithms = list(algorithms)
+    file_stat = os.stat(path)
+    key = (
+        os.path.realpath(path),
+        file_stat.st_dev,
+        file_stat.st_ino,
+        file_stat.st_size,
+        file_stat.st_mtime_ns,
+    )
+    digests = _digests_cache.pop(key, dict())
+    missing = [algorithm for algorithm in algorithms if algorithm not in digests]
+    if missing:
+        digests.update(_calculate_digests(path, file_stat.st_size, missing))
+    # The least recently used entries are evicted first.
+    _digests_cache[key] = digests
+    while len(_digests_cache) > _DIGESTS_CACHE_SIZE:
+        del _digests_cache[next(iter(_digests_cache))]
+    return {algorithm: digests[algorithm] for algorithm in algorithms}
+
+
+def _calculate_digests(path: str, size: int, algorithms: List[str]) -> Dict[str, str]:
+    # This will raise an AttributeError if an algorithm is unsupported
+    hashers = [getattr(hashlib, algorithm)() for algorithm in algorithms]
 
-    blocksize = 2 ** 20
     with open(path, "rb") as f:
+        if not _update_hashers_mapped(f, size, hashers):
+            _update_hashers_read(f, hashers)
+    return {
+        algorithm: hasher.hexdigest() for algorithm, hasher in zip(algorithms, hashers)
+    }
+
+
+def _update_hashers_mapped(f, size: int, hashers: List) -> bool:
+    # Empty files cannot be mapped.
+    if not size or size > _DIGESTS_MAX_MAPPED_SIZE:
+        return False
+    try:
+        mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OverflowError, OSError):
+        return False
+    with mapped_file, memoryview(mapped_file) as view:
+        for offset in range(0, len(view), _DIGESTS_BLOCK_SIZE):
+            for hasher in hashers:
+                hasher.update(view[offset : offset + _DIGESTS_BLOCK_SIZE])
+    return True
+
+
+def _update_hashers_read(f, hashers: List) -> None:
+    buffer = bytearray(_DIGESTS_BLOCK_SIZE)
+    with memoryview(buffer) as view:
         while True:
-            buf = f.read(blocksize)
-            if not buf:
+            read = f.readinto(buffer)
+            if not read:
                 break
-            hasher.update(buf)
-    return hasher.hexdigest()
+            for hasher in hashers:
+                hasher.update(view[:read])
 
 
 def get_tool_path(command_name: str) -> str:
@@ -199,16 +199,23 @@ class Provider(abc.ABC):
         if not self._mount_prime_directory():
             self._run(command=["snapcraft", "clean", "--unprime"])
 
-    def execute_step(self, step: steps.Step) -> None:
-        self._run(command=["snapcraft", step.name])
+    def execute_step(self, step: steps.Step, *, jobs: Optional[int] = None) -> None:
+        command = ["snapcraft", step.name]
+        if jobs:
+            command.extend(["--jobs", str(jobs)])
+        self._run(command=command)
 
     def clean(self, part_names: Sequence[str]) -> None:
         self._run(command=["snapcraft", "clean"] + list(part_names))
 
-    def pack_project(self, *, output: Optional[str] = None) -> None:
+    def pack_project(
+        self, *, output: Optional[str] = None, jobs: Optional[int] = None
+    ) -> None:
         command = ["snapcraft", "snap"]
         if output:
             command.extend(["--output", output])
+        if jobs:
+            command.extend(["--jobs", str(jobs)])
         self._run(command=command)
 
     def clean_project(self) -> bool:
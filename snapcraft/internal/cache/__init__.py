@@ -14,7 +14,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from ._apt import AptStagePackageCache  # noqa
+from ._apt import AptStagePackageCache, AptStagePackageTreeCache  # noqa
+from ._build import BuildCache  # noqa
 from ._cache import SnapcraftCache  # noqa
 from ._file import FileCache  # noqa
 from ._snap import SnapCache  # noqa
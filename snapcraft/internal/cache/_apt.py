@@ -14,13 +14,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import contextlib
 import logging
 import os
+import shutil
+import tempfile
+from typing import Callable, List, Optional
 
-from ._cache import SnapcraftStagePackageCache
+from ._cache import SnapcraftStagePackageCache, prune_entries, record_entry_size
 
 logger = logging.getLogger(__name__)
 
+# 2 GiB
+_DEFAULT_TREE_CACHE_MAX_SIZE = 2 * 1024 ** 3
+
 
 class AptStagePackageCache(SnapcraftStagePackageCache):
     """Cache for stage-packages coming from apt."""
@@ -41,3 +48,80 @@ class AptStagePackageCache(SnapcraftStagePackageCache):
             self.base_dir, "var", "cache", "apt", "archives"
         )
         os.makedirs(self.packages_dir, exist_ok=True)
+
+
+class AptStagePackageTreeCache(SnapcraftStagePackageCache):
+    """Cache for the trees unpacked from stage-packages coming from apt.
+
+    Entries are used in least recently used order to evict them once the
+    cache grows over its maximum size.
+    """
+
+    def __init__(self, *, max_size: int = _DEFAULT_TREE_CACHE_MAX_SIZE) -> None:
+        """Create a new AptStagePackageTreeCache.
+
+        :param int max_size: the size in bytes to prune the cache to.
+        """
+        super().__init__()
+        self.tree_cache_root = os.path.join(self.stage_package_cache_root, "apt-trees")
+        self._max_size = max_size
+
+    def get(self, *, key: str) -> Optional[str]:
+        """Get the tree cached for key.
+
+        :param str key: key of the package the tree was unpacked from.
+        :returns: path to the tree.
+        """
+        entry = os.path.join(self.tree_cache_root, key)
+        # Entries are only complete once their size was recorded.
+        if not os.path.exists(os.path.join(entry, "size")):
+            return None
+
+        with contextlib.suppress(OSError):
+            os.utime(entry)
+        return os.path.join(entry, "tree")
+
+    def cache(self, *, key: str, unpack: Callable[[str], None]) -> Optional[str]:
+        """Cache the tree unpack creates under key, unless it already exists.
+
+        :param str key: key of the package the tree is unpacked from.
+        :param unpack: callable unpacking the package to the path it is given.
+        :returns: path to the tree, or None if it could not be cached.
+        """
+        entry = os.path.join(self.tree_cache_root, key)
+        if not os.path.exists(entry):
+            try:
+                os.makedirs(self.tree_cache_root, exist_ok=True)
+                # Entries are prepared aside and moved in place, so parts
+                # unpacking the same package never see incomplete ones.
+                temp_entry = tempfile.mkdtemp(prefix=".", dir=self.tree_cache_root)
+            except OSError as e:
+                logger.warning("Unable to cache package {!r}: {}".format(key, e))
+                return None
+            try:
+                unpack(os.path.join(temp_entry, "tree"))
+                record_entry_size(temp_entry)
+                try:
+                    os.rename(temp_entry, entry)
+                except OSError:
+                    # Another part cached the same package in the meantime.
+                    if not os.path.exists(entry):
+                        raise
+            except OSError as e:
+                logger.warning("Unable to cache package {!r}: {}".format(key, e))
+                return None
+            finally:
+                if os.path.exists(temp_entry):
+                    shutil.rmtree(temp_entry)
+
+        return os.path.join(entry, "tree")
+
+    def prune(self) -> List[str]:
+        """Remove the least recently used entries over the maximum size.
+
+        Trees are not pruned as they are cached, for those being unpacked
+        together to remain available.
+
+        :returns: pruned entry paths list.
+        """
+        return prune_entries(self.tree_cache_root, self._max_size)
@@ -0,0 +1,125 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import logging
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+
+from snapcraft import file_utils
+from ._cache import SnapcraftCache, prune_entries, record_entry_size
+
+logger = logging.getLogger(__name__)
+
+# 4 GiB
+_DEFAULT_MAX_SIZE = 4 * 1024 ** 3
+
+
+class BuildCache(SnapcraftCache):
+    """Cache for the results of building parts, by the key of their inputs.
+
+    Each entry holds the install directory and the build state of a part.
+    Entries are used in least recently used order to evict them once the
+    cache grows over its maximum size.
+    """
+
+    def __init__(
+        self, *, cache_dir: str = None, max_size: int = _DEFAULT_MAX_SIZE
+    ) -> None:
+        """Create a new BuildCache.
+
+        :param str cache_dir: the directory to cache builds in, which can be
+                              shared by builders (default: the "builds"
+                              directory in the XDG cache).
+        :param int max_size: the size in bytes to prune the cache to.
+        """
+        super().__init__()
+        if cache_dir is None:
+            cache_dir = os.path.join(self.cache_root, "builds")
+        self.build_cache_root = cache_dir
+        self._max_size = max_size
+
+    def get(self, *, key: str) -> Optional[str]:
+        """Get the entry cached for key.
+
+        :param str key: key of the inputs of the build.
+        :returns: path to the directory of the entry, with the install
+                  directory in "install" and the build state in "state".
+        """
+        entry = os.path.join(self.build_cache_root, key)
+        # Entries are only complete once their size was recorded.
+        if not os.path.exists(os.path.join(entry, "size")):
+            return None
+
+        logger.debug("Cache hit for build {!r}".format(key))
+        with contextlib.suppress(OSError):
+            os.utime(entry)
+        return entry
+
+    def cache(self, *, key: str, installdir: str, statedir: str) -> Optional[str]:
+        """Cache the results of a build under key, unless it already exists.
+
+        :param str key: key of the inputs of the build.
+        :param str installdir: install directory of the part.
+        :param str statedir: state directory of the part, only the build state
+                             in which is cached.
+        :returns: path to the directory of the entry.
+        """
+        entry = os.path.join(self.build_cache_root, key)
+        if os.path.exists(entry):
+            return entry
+
+        try:
+            os.makedirs(self.build_cache_root, exist_ok=True)
+            # Entries are prepared aside and moved in place, so other builders
+            # sharing the cache never see incomplete ones.
+            temp_entry = tempfile.mkdtemp(prefix=".", dir=self.build_cache_root)
+            try:
+                file_utils.link_or_copy_tree(
+                    installdir,
+                    os.path.join(temp_entry, "install"),
+                    copy_function=file_utils.copy,
+                )
+                os.mkdir(os.path.join(temp_entry, "state"))
+                shutil.copy2(
+                    os.path.join(statedir, "build"),
+                    os.path.join(temp_entry, "state", "build"),
+                )
+                record_entry_size(temp_entry)
+                try:
+                    os.rename(temp_entry, entry)
+                except OSError:
+                    # Another builder cached the same build in the meantime.
+                    if not os.path.exists(entry):
+                        raise
+            finally:
+                if os.path.exists(temp_entry):
+                    shutil.rmtree(temp_entry)
+        except OSError as e:
+            logger.warning("Unable to cache build {!r}: {}".format(key, e))
+            return None
+
+        self.prune()
+        return entry
+
+    def prune(self) -> List[str]:
+        """Remove the least recently used entries over the maximum size.
+
+        :returns: pruned entry paths list.
+        """
+        return prune_entries(self.build_cache_root, self._max_size)
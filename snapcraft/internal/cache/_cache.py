@@ -14,7 +14,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import contextlib
 import os
+import shutil
+from typing import List, Tuple  # noqa: F401
 
 from xdg import BaseDirectory
 
@@ -45,3 +48,50 @@ class SnapcraftStagePackageCache(SnapcraftCache):
     def __init__(self):
         super().__init__()
         self.stage_package_cache_root = os.path.join(self.cache_root, "stage-packages")
+
+
+def prune_entries(cache_dir: str, max_size: int) -> List[str]:
+    """Remove the least recently used entries of cache_dir over max_size.
+
+    Entries are directories recording their size in a "size" file once they
+    are complete, and marked as used by updating their modification time.
+
+    :param str cache_dir: the directory the entries are in.
+    :param int max_size: the size in bytes to prune the entries to.
+    :returns: pruned entry paths list.
+    """
+    entries = []  # type: List[Tuple[float, int, str]]
+    with contextlib.suppress(FileNotFoundError):
+        for name in os.listdir(cache_dir):
+            entry = os.path.join(cache_dir, name)
+            try:
+                with open(os.path.join(entry, "size")) as f:
+                    size = int(f.read())
+                last_used = os.stat(entry).st_mtime
+            except (OSError, ValueError):
+                continue
+            entries.append((last_used, size, entry))
+
+    pruned_entries = []
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total_size <= max_size:
+            break
+        # Entries are removed from their size down, so they are no longer
+        # used as soon as their removal starts.
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(entry, "size"))
+        shutil.rmtree(entry, ignore_errors=True)
+        total_size -= size
+        pruned_entries.append(entry)
+    return pruned_entries
+
+
+def record_entry_size(entry: str) -> None:
+    """Record the size of the contents of entry, completing it."""
+    size = 0
+    for root, directories, files in os.walk(entry):
+        for name in directories + files:
+            size += os.lstat(os.path.join(root, name)).st_size
+    with open(os.path.join(entry, "size"), "w") as f:
+        f.write(str(size))
@@ -16,12 +16,10 @@
 
 import logging
 import os
-import shutil
-import subprocess
-import tempfile
 
 from ._cache import SnapcraftProjectCache
 from snapcraft import file_utils, yaml_utils
+from snapcraft.internal import errors, squashfs
 
 logger = logging.getLogger(__name__)
 
@@ -39,23 +37,10 @@ class SnapCache(SnapcraftProjectCache):
         return snap_cache_root
 
     def _get_snap_deb_arch(self, snap_filename):
-        with tempfile.TemporaryDirectory() as temp_dir:
-            unsquashfs_path = file_utils.get_tool_path("unsquashfs")
-            output = subprocess.check_output(
-                [
-                    unsquashfs_path,
-                    "-d",
-                    os.path.join(temp_dir, "squashfs-root"),
-                    snap_filename,
-                    "-e",
-                    os.path.join("meta", "snap.yaml"),
-                ]
-            )
-            logger.debug(output)
-            with open(
-                os.path.join(temp_dir, "squashfs-root", "meta", "snap.yaml")
-            ) as yaml_file:
-                snap_yaml = yaml_utils.load(yaml_file)
+        contents = squashfs.read_snap_file(snap_filename, "meta/snap.yaml")
+        if contents is None:
+            raise errors.SnapDataExtractionError(os.path.basename(snap_filename))
+        snap_yaml = yaml_utils.load(contents)
         # XXX: add multiarch support later
         try:
             return snap_yaml["architectures"][0]
@@ -77,9 +62,10 @@ class SnapCache(SnapcraftProjectCache):
             if not os.path.isfile(cached_snap_path):
                 # this must not be hard-linked, as rebuilding a snap
                 # with changes should invalidate the cache, hence avoids
-                # using fileutils.link_or_copy.
-                shutil.copyfile(snap_filename, cached_snap_path)
-        except OSError:
+                # using fileutils.link_or_copy. Copies share the contents
+                # of the snap where the filesystem allows it.
+                file_utils.copy(snap_filename, cached_snap_path)
+        except (OSError, errors.SnapcraftCopyFileNotFoundError):
             logger.warning("Unable to cache snap {}.".format(snap_filename))
         return cached_snap_path
 
@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 # Data/methods shared between plugins and snapcraft
+import concurrent.futures
 import glob
 import logging
 import math
@@ -26,7 +27,7 @@ import sys
 import tempfile
 import urllib
 from contextlib import suppress
-from typing import Callable, List
+from typing import Any, Callable, Iterable, List
 
 from snapcraft.internal import errors
 
@@ -310,3 +311,24 @@ def get_pkg_config_paths(root, arch_triplet):
     ]
 
     return [p for p in paths if os.path.exists(p)]
+
+
+def map_concurrently(func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+    """Return the results of calling func on each of items, in order.
+
+    The calls are spread across a pool of worker threads, which is
+    worthwhile for tasks that spawn tools or read files. If one of the calls
+    raises, the exception for the first failing item in items is raised
+    once all the calls are done.
+
+    :param func: callable taking a single item.
+    :param items: the items to call func on.
+    :returns: a list with the result for each item in items.
+    """
+    items = list(items)
+    if len(items) < 2:
+        return [func(i) for i in items]
+
+    max_workers = min(len(items), os.cpu_count() or 1)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
@@ -15,14 +15,30 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import contextlib
 import glob
+import itertools
+import json
 import logging
 import os
 import re
 import shutil
 import subprocess
 import tempfile
-from typing import Dict, FrozenSet, List, Set, Sequence, Tuple, Union  # noqa
-
+import threading
+from typing import (  # noqa
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import elftools.common.exceptions
 import elftools.elf.elffile
 from pkg_resources import parse_version
 
@@ -46,9 +62,17 @@ class NeededLibrary:
 
 ElfArchitectureTuple = Tuple[str, str, str]
 ElfDataTuple = Tuple[
-    ElfArchitectureTuple, str, str, Dict[str, NeededLibrary], bool, bool
-]  # noqa: E501
+    ElfArchitectureTuple,
+    str,
+    str,
+    Dict[str, NeededLibrary],
+    bool,
+    bool,
+    List[str],
+    List[str],
+]
 SonameCacheDict = Dict[Tuple[ElfArchitectureTuple, str], str]
+_ResolvedSonameDict = Dict[Tuple[ElfArchitectureTuple, str, Tuple[str, ...]], str]
 
 
 # Old pyelftools uses byte strings for section names.  Some data is
@@ -63,6 +87,12 @@ else:
     _INTERP = b".interp"
 
 
+# The indexes of read-only roots, by real path, so that they are only built
+# once per process.
+_read_only_indexes = dict()  # type: Dict[str, SonameIndex]
+_index_lock = threading.Lock()
+
+
 class SonameCache:
     """A cache for sonames."""
 
@@ -89,9 +119,64 @@ class SonameCache:
     def __contains__(self, key):
         return key in self._soname_paths
 
-    def __init__(self):
-        """Initialize a cache for sonames"""
+    def __init__(self, *, index_dir: str = None) -> None:
+        """Initialize a cache for sonames
+
+        :param str index_dir: the directory to persist the soname indexes of
+                              base snaps to, if None they are only kept in
+                              memory.
+        """
         self._soname_paths = dict()  # type: SonameCacheDict
+        self._index_dir = index_dir
+        self._indexes = dict()  # type: Dict[str, SonameIndex]
+        # Libraries are looked up from concurrent workers, an index must
+        # only be built once.
+        self._index_lock = _index_lock
+
+    def get_index(self, root: str, *, persist: bool = False) -> "SonameIndex":
+        """Return the soname index for root, building it on first use.
+
+        :param str root: the directory to index.
+        :param bool persist: whether to load and save the index from
+                             index_dir, only suitable for read-only roots
+                             such as a mounted base snap revision. These
+                             indexes are also shared by every cache in
+                             the process.
+        """
+        if persist:
+            indexes = _read_only_indexes
+            key = os.path.realpath(root)
+        else:
+            indexes = self._indexes
+            key = root
+        with self._index_lock:
+            if key not in indexes:
+                indexes[key] = self._build_index(root, persist=persist)
+            return indexes[key]
+
+    def _build_index(self, root: str, *, persist: bool) -> "SonameIndex":
+        index = None
+        index_path = None
+        if persist and self._index_dir is not None:
+            index_path = os.path.join(
+                self._index_dir, _get_index_file_name(os.path.realpath(root))
+            )
+            index = SonameIndex.load(root=root, index_path=index_path)
+        if index is None:
+            logger.debug("Indexing sonames in {!r}".format(root))
+            index = SonameIndex(root=root)
+            index.add_files(_walk_files(root))
+            if index_path is not None:
+                index.save(index_path)
+        return index
+
+    def update_index(self, root: str, file_paths: Iterable[str]) -> None:
+        """Add file_paths to the index for root if it was already built.
+
+        An index that was not built yet picks the files up when scanning.
+        """
+        if root in self._indexes:
+            self._indexes[root].add_files(file_paths)
 
     def reset_except_root(self, root):
         """Reset the cache values that aren't contained within root."""
@@ -103,6 +188,221 @@ class SonameCache:
         self._soname_paths = new_soname_paths
 
 
+_SONAME_INDEX_VERSION = 1
+
+
+class SonameIndex:
+    """An index of the shared libraries found within a root.
+
+    Libraries are indexed by their file name, which is what the dynamic
+    linker looks for, only file names containing ".so" are considered.
+    The architecture of candidates is verified when looking them up.
+    """
+
+    def __init__(self, *, root: str) -> None:
+        self.root = root
+        self._paths = dict()  # type: Dict[str, List[str]]
+        self._archs = dict()  # type: Dict[str, ElfArchitectureTuple]
+
+    @classmethod
+    def load(cls, *, root: str, index_path: str) -> "SonameIndex":
+        """Return the index for root saved to index_path or None."""
+        try:
+            with open(index_path) as index_file:
+                index_data = json.load(index_file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if index_data.get("version") != _SONAME_INDEX_VERSION:
+            return None
+
+        index = cls(root=root)
+        for soname, relative_paths in index_data["entries"].items():
+            index._paths[soname] = [os.path.join(root, p) for p in relative_paths]
+        return index
+
+    def save(self, index_path: str) -> None:
+        entries = {
+            soname: [os.path.relpath(p, self.root) for p in paths]
+            for soname, paths in self._paths.items()
+        }
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        temp_path = "{}.partial".format(index_path)
+        with open(temp_path, "w") as index_file:
+            json.dump(
+                {"version": _SONAME_INDEX_VERSION, "entries": entries}, index_file
+            )
+        os.replace(temp_path, index_path)
+
+    def add_files(self, file_paths: Iterable[str]) -> None:
+        """Index file_paths, which are paths to files within root."""
+        for file_path in file_paths:
+            soname = os.path.basename(file_path)
+            if ".so" not in soname:
+                continue
+            paths = self._paths.setdefault(soname, [])
+            if file_path not in paths:
+                paths.append(file_path)
+            # The file may have been replaced.
+            self._archs.pop(file_path, None)
+
+    def find(
+        self, arch: ElfArchitectureTuple, soname: str, *, elf_cache: "ElfCache" = None
+    ) -> str:
+        """Return the path to soname for arch or None if not indexed.
+
+        :param ElfCache elf_cache: a cache of previously extracted ELF data.
+        """
+        for path in self._paths.get(soname, []):
+            if self._get_arch(path, elf_cache) == arch:
+                return path
+        return None
+
+    def _get_arch(self, path: str, elf_cache: "ElfCache") -> ElfArchitectureTuple:
+        if path not in self._archs:
+            arch = None
+            # Files may have been removed since they were indexed.
+            with contextlib.suppress(OSError, elftools.common.exceptions.ELFError):
+                if ElfFile.is_elf(path):
+                    arch = ElfFile(path=path, elf_cache=elf_cache).arch
+            self._archs[path] = arch
+        return self._archs[path]
+
+
+def _get_index_file_name(real_root: str) -> str:
+    # For a base snap the real path includes its revision,
+    # e.g.; /snap/core18/1066 results in snap_core18_1066.json
+    return "{}.json".format(real_root.strip(os.sep).replace(os.sep, "_"))
+
+
+def _walk_files(root: str) -> Iterator[str]:
+    for directory, directories, files in os.walk(root):
+        # Sort to prefer the same library on every run.
+        directories.sort()
+        for file_name in sorted(files):
+            yield os.path.join(directory, file_name)
+
+
+_ELF_CACHE_VERSION = 2
+
+
+class ElfCache:
+    """A persistent cache for the data extracted from ELF files.
+
+    Entries are keyed by the device, inode, size and modification time of the
+    files they were extracted from, so files that changed are parsed again.
+    """
+
+    def __init__(self, *, cache_path: str = None) -> None:
+        """Initialize a cache for ELF data.
+
+        :param str cache_path: the file to persist the cache to, if None the
+                               cache is only kept in memory.
+        """
+        self._cache_path = cache_path
+        self._entries = None  # type: Dict[str, Dict[str, Any]]
+        self._modified = False
+        self._load_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _get_key(file_stat: os.stat_result) -> str:
+        return "{}:{}:{}:{}".format(
+            file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns
+        )
+
+    def _load(self) -> None:
+        with self._load_lock:
+            if self._entries is not None:
+                return
+            self._entries = self._read_entries()
+
+    def _read_entries(self) -> Dict[str, Dict[str, Any]]:
+        if self._cache_path is None:
+            return dict()
+        with contextlib.suppress(FileNotFoundError, ValueError):
+            with open(self._cache_path) as cache_file:
+                cache_data = json.load(cache_file)
+            # Entries written with a different layout are discarded.
+            if cache_data.get("version") == _ELF_CACHE_VERSION:
+                return cache_data["entries"]
+        return dict()
+
+    def get_elf_data(self, path: str, extract) -> ElfDataTuple:
+        """Return the ELF data for path, using extract to obtain it on a miss.
+
+        :param str path: path to the ELF file.
+        :param extract: callable taking path and returning an ElfDataTuple.
+        """
+        self._load()
+        key = self._get_key(os.stat(path))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            entry["path"] = path
+            return _elf_data_from_entry(entry)
+
+        self.misses += 1
+        elf_data = extract(path)
+        self._entries[key] = _elf_data_to_entry(path, elf_data)
+        self._modified = True
+        return elf_data
+
+    def save(self) -> None:
+        """Persist the cache, dropping entries for files that changed."""
+        logger.debug("ELF cache: {} hits, {} misses".format(self.hits, self.misses))
+        if self._cache_path is None or not self._modified:
+            return
+
+        entries = dict()
+        for key, entry in self._entries.items():
+            with contextlib.suppress(FileNotFoundError):
+                if self._get_key(os.stat(entry["path"])) == key:
+                    entries[key] = entry
+        self._entries = entries
+
+        os.makedirs(os.path.dirname(self._cache_path), exist_ok=True)
+        temp_path = "{}.partial".format(self._cache_path)
+        with open(temp_path, "w") as cache_file:
+            json.dump({"version": _ELF_CACHE_VERSION, "entries": entries}, cache_file)
+        os.replace(temp_path, self._cache_path)
+        self._modified = False
+
+
+def _elf_data_to_entry(path: str, elf_data: ElfDataTuple) -> Dict[str, Any]:
+    arch, interp, soname, needed, execstack_set, is_dynamic, rpath, runpath = elf_data
+    return {
+        "path": path,
+        "arch": list(arch),
+        "interp": interp,
+        "soname": soname,
+        "needed": {name: sorted(lib.versions) for name, lib in needed.items()},
+        "execstack-set": execstack_set,
+        "is-dynamic": is_dynamic,
+        "rpath": rpath,
+        "runpath": runpath,
+    }
+
+
+def _elf_data_from_entry(entry: Dict[str, Any]) -> ElfDataTuple:
+    needed = dict()  # type: Dict[str, NeededLibrary]
+    for name, versions in entry["needed"].items():
+        needed[name] = NeededLibrary(name=name)
+        for version in versions:
+            needed[name].add_version(version)
+
+    return (
+        tuple(entry["arch"]),
+        entry["interp"],
+        entry["soname"],
+        needed,
+        entry["execstack-set"],
+        entry["is-dynamic"],
+        entry["rpath"],
+        entry["runpath"],
+    )
+
+
 class Library:
     """Represents the SONAME and path to the library."""
 
@@ -114,7 +414,8 @@ class Library:
         root_path: str,
         core_base_path: str,
         arch: ElfArchitectureTuple,
-        soname_cache: SonameCache
+        soname_cache: SonameCache,
+        elf_cache: ElfCache = None
     ) -> None:
         self.soname = soname
 
@@ -129,6 +430,7 @@ class Library:
                 core_base_path=core_base_path,
                 arch=arch,
                 soname_cache=soname_cache,
+                elf_cache=elf_cache,
             )
 
         if not self.path and path.startswith(core_base_path):
@@ -160,27 +462,21 @@ def _crawl_for_path(
     root_path: str,
     core_base_path: str,
     arch: ElfArchitectureTuple,
-    soname_cache: SonameCache
+    soname_cache: SonameCache,
+    elf_cache: ElfCache = None
 ) -> str:
     # Speed things up and return what was already found once.
     if (arch, soname) in soname_cache:
         return soname_cache[arch, soname]
 
-    logger.debug("Crawling to find soname {!r}".format(soname))
     for path in (root_path, core_base_path):
         if not os.path.exists(path):
             continue
-        for root, directories, files in os.walk(path):
-            for file_name in files:
-                if file_name == soname:
-                    file_path = os.path.join(root, file_name)
-                    if ElfFile.is_elf(file_path):
-                        # We found a match by name, anyway. Let's verify that
-                        # the architecture is the one we want.
-                        elf_file = ElfFile(path=file_path)
-                        if elf_file.arch == arch:
-                            soname_cache[arch, soname] = file_path
-                            return file_path
+        index = soname_cache.get_index(path, persist=path == core_base_path)
+        file_path = index.find(arch, soname, elf_cache=elf_cache)
+        if file_path is not None:
+            soname_cache[arch, soname] = file_path
+            return file_path
 
     # If not found we cache it too
     soname_cache[arch, soname] = None
@@ -208,20 +504,26 @@ class ElfFile:
         with open(path, "rb") as bin_file:
             return bin_file.read(4) == b"\x7fELF"
 
-    def __init__(self, *, path: str) -> None:
+    def __init__(self, *, path: str, elf_cache: ElfCache = None) -> None:
         """Initialize an ElfFile instance.
 
         :param str path: path to an elf_file within a snapcraft project.
+        :param ElfCache elf_cache: a cache of previously extracted ELF data.
         """
         self.path = path
         self.dependencies = set()  # type: Set[Library]
-        elf_data = self._extract(path)
+        if elf_cache is None:
+            elf_data = self._extract(path)
+        else:
+            elf_data = elf_cache.get_elf_data(path, self._extract)
         self.arch = elf_data[0]
         self.interp = elf_data[1]
         self.soname = elf_data[2]
         self.needed = elf_data[3]
         self.execstack_set = elf_data[4]
         self.is_dynamic = elf_data[5]
+        self.rpath = elf_data[6]
+        self.runpath = elf_data[7]
 
     def _extract(self, path: str) -> ElfDataTuple:  # noqa: C901
         arch = None  # type: ElfArchitectureTuple
@@ -229,6 +531,8 @@ class ElfFile:
         soname = str()
         libs = dict()
         execstack_set = False
+        rpath = []  # type: List[str]
+        runpath = []  # type: List[str]
 
         with open(path, "rb") as fp:
             elf = elftools.elf.elffile.ELFFile(fp)
@@ -264,6 +568,10 @@ class ElfFile:
                     libs[needed] = NeededLibrary(name=needed)
                 for tag in dynamic_section.iter_tags("DT_SONAME"):
                     soname = _ensure_str(tag.soname)
+                for tag in dynamic_section.iter_tags("DT_RPATH"):
+                    rpath.extend(p for p in _ensure_str(tag.rpath).split(":") if p)
+                for tag in dynamic_section.iter_tags("DT_RUNPATH"):
+                    runpath.extend(p for p in _ensure_str(tag.runpath).split(":") if p)
 
             verneed_section = elf.get_section_by_name(_GNU_VERSION_R)
             if (
@@ -290,7 +598,7 @@ class ElfFile:
                     if mode & elftools.elf.constants.P_FLAGS.PF_X:
                         execstack_set = True
 
-        return arch, interp, soname, libs, execstack_set, is_dynamic
+        return arch, interp, soname, libs, execstack_set, is_dynamic, rpath, runpath
 
     def is_linker_compatible(self, *, linker_version: str) -> bool:
         """Determines if linker will work given the required glibc version."""
@@ -322,7 +630,12 @@ class ElfFile:
         return version_required
 
     def load_dependencies(
-        self, root_path: str, core_base_path: str, soname_cache: SonameCache = None
+        self,
+        root_path: str,
+        core_base_path: str,
+        soname_cache: SonameCache = None,
+        elf_cache: ElfCache = None,
+        library_resolver: "LibraryResolver" = None,
     ) -> Set[str]:
         """Load the set of libraries that are needed to satisfy elf's runtime.
 
@@ -334,6 +647,10 @@ class ElfFile:
                                    dependencies.
         :param SonameCache soname_cache: a cache of previously search
                                          dependencies.
+        :param ElfCache elf_cache: a cache of previously extracted ELF data.
+        :param LibraryResolver library_resolver: the resolver used to find
+                                                 the libraries, ldd is used
+                                                 if None.
         :returns: a set of string with paths to the library dependencies of
                   elf.
         """
@@ -341,31 +658,32 @@ class ElfFile:
             soname_cache = SonameCache()
 
         logger.debug("Getting dependencies for {!r}".format(self.path))
-        ldd_out = []  # type: List[str]
-        try:
-            # ldd output sample:
-            # /lib64/ld-linux-x86-64.so.2 (0x00007fb3c5298000)
-            # libm.so.6 => /lib/x86_64-linux-gnu/libm.so.6 (0x00007fb3bef03000)
-            ldd_out = common.run_output(["ldd", self.path]).split("\n")
-        except subprocess.CalledProcessError:
-            logger.warning(
-                "Unable to determine library dependencies for {!r}".format(self.path)
-            )
-            return set()
-        ldd_out_split = [l.split() for l in ldd_out]
-        libs = set()
-        for ldd_line in ldd_out_split:
-            if len(ldd_line) > 2:
-                libs.add(
-                    Library(
-                        soname=ldd_line[0],
-                        path=ldd_line[2],
-                        root_path=root_path,
-                        core_base_path=core_base_path,
-                        arch=self.arch,
-                        soname_cache=soname_cache,
+        if library_resolver is None:
+            try:
+                resolved = self._run_ldd()
+            except subprocess.CalledProcessError:
+                logger.warning(
+                    "Unable to determine library dependencies for {!r}".format(
+                        self.path
                     )
                 )
+                return set()
+        else:
+            resolved = library_resolver.resolve(self)
+
+        libs = set()
+        for soname, path in resolved:
+            libs.add(
+                Library(
+                    soname=soname,
+                    path=path,
+                    root_path=root_path,
+                    core_base_path=core_base_path,
+                    arch=self.arch,
+                    soname_cache=soname_cache,
+                    elf_cache=elf_cache,
+                )
+            )
 
         self.dependencies = libs
 
@@ -376,6 +694,141 @@ class ElfFile:
                 library_paths.add(l.path)
         return library_paths
 
+    def _run_ldd(self) -> List[Tuple[str, str]]:
+        # ldd output sample:
+        # /lib64/ld-linux-x86-64.so.2 (0x00007fb3c5298000)
+        # libm.so.6 => /lib/x86_64-linux-gnu/libm.so.6 (0x00007fb3bef03000)
+        ldd_out = common.run_output(["ldd", self.path]).split("\n")
+        ldd_out_split = [l.split() for l in ldd_out]
+        return [(l[0], l[2]) for l in ldd_out_split if len(l) > 2]
+
+
+class LibraryResolver:
+    """Resolve the libraries ELF files need, as the dynamic linker would.
+
+    DT_NEEDED entries are looked up, recursively, in the DT_RPATH of the
+    loading objects (unless they have a DT_RUNPATH), library_paths (in the
+    same way as LD_LIBRARY_PATH), the DT_RUNPATH of the loading object and
+    finally the system library directories.
+
+    Directory listings, parsed ELF files and resolved sonames are memoized
+    so the same resolver can be used for all the ELF files of a part.
+    """
+
+    def __init__(
+        self, *, library_paths: Sequence[str], elf_cache: ElfCache = None
+    ) -> None:
+        """Initialize a LibraryResolver.
+
+        :param library_paths: the directories to search before the ones from
+                              DT_RUNPATH and the system ones.
+        :param ElfCache elf_cache: a cache of previously extracted ELF data.
+        """
+        self._library_paths = list(library_paths)
+        self._elf_cache = elf_cache
+        self._system_library_paths = None  # type: List[str]
+        self._directory_entries = dict()  # type: Dict[str, Set[str]]
+        self._elf_files = dict()  # type: Dict[str, ElfFile]
+        self._resolved = dict()  # type: _ResolvedSonameDict
+
+    def resolve(self, elf_file: ElfFile) -> List[Tuple[str, str]]:
+        """Return the (soname, path) of every library needed by elf_file.
+
+        Libraries that cannot be found have an empty path.
+        """
+        resolved = []  # type: List[Tuple[str, str]]
+        seen = set()  # type: Set[str]
+        # Loading objects are processed breadth first, each with the
+        # DT_RPATH entries inherited from the objects that loaded it.
+        to_load = [(elf_file, [])]  # type: List[Tuple[ElfFile, List[str]]]
+        while to_load:
+            loader, inherited_rpath = to_load.pop(0)
+            origin = os.path.dirname(loader.path)
+            if loader.runpath:
+                rpath = []  # type: List[str]
+            else:
+                rpath = [_expand_origin(p, origin) for p in loader.rpath]
+                rpath += inherited_rpath
+            runpath = [_expand_origin(p, origin) for p in loader.runpath]
+            search_paths = tuple(rpath + self._library_paths + runpath)
+
+            for soname in loader.needed:
+                if soname in seen:
+                    continue
+                seen.add(soname)
+
+                path = self._find(soname, elf_file.arch, search_paths)
+                resolved.append((soname, path))
+                if path:
+                    library = self._get_elf_file(path)
+                    if library is not None:
+                        to_load.append((library, rpath))
+
+        return resolved
+
+    def _find(
+        self, soname: str, arch: ElfArchitectureTuple, search_paths: Tuple[str, ...]
+    ) -> str:
+        key = (arch, soname, search_paths)
+        with contextlib.suppress(KeyError):
+            return self._resolved[key]
+
+        if "/" in soname:
+            candidates = [soname]  # type: Sequence[str]
+        else:
+            candidates = (
+                os.path.normpath(os.path.join(d, soname))
+                for d in itertools.chain(search_paths, self._get_system_paths())
+                if soname in self._list_directory(d)
+            )
+
+        path = ""
+        for candidate in candidates:
+            library = self._get_elf_file(candidate)
+            if library is not None and library.arch == arch:
+                path = candidate
+                break
+
+        self._resolved[key] = path
+        return path
+
+    def _get_elf_file(self, path: str) -> ElfFile:
+        if path not in self._elf_files:
+            elf_file = None
+            with contextlib.suppress(OSError, elftools.common.exceptions.ELFError):
+                if ElfFile.is_elf(path):
+                    elf_file = ElfFile(path=path, elf_cache=self._elf_cache)
+            self._elf_files[path] = elf_file
+        return self._elf_files[path]
+
+    def _list_directory(self, directory: str) -> Set[str]:
+        if directory not in self._directory_entries:
+            try:
+                self._directory_entries[directory] = set(os.listdir(directory))
+            except OSError:
+                self._directory_entries[directory] = set()
+        return self._directory_entries[directory]
+
+    def _get_system_paths(self) -> List[str]:
+        if self._system_library_paths is None:
+            paths = []  # type: List[str]
+            for ld_conf_file in ["/etc/ld.so.conf"] + sorted(
+                glob.glob("/etc/ld.so.conf.d/*.conf")
+            ):
+                with contextlib.suppress(OSError):
+                    paths.extend(
+                        p
+                        for p in _extract_ld_library_paths(ld_conf_file)
+                        if p.startswith("/") and "*" not in p
+                    )
+            paths.extend(["/lib64", "/usr/lib64", "/lib", "/usr/lib"])
+            self._system_library_paths = paths
+        return self._system_library_paths
+
+
+def _expand_origin(path: str, origin: str) -> str:
+    return path.replace("${ORIGIN}", origin).replace("$ORIGIN", origin)
+
 
 class Patcher:
     """Patcher holds the necessary logic to patch elf files."""
@@ -547,33 +1000,38 @@ def _extract_ld_library_paths(ld_conf_file: str) -> List[str]:
 _libraries = None
 
 
-def get_elf_files(root: str, file_list: Sequence[str]) -> FrozenSet[ElfFile]:
+def get_elf_files(
+    root: str, file_list: Sequence[str], elf_cache: ElfCache = None
+) -> FrozenSet[ElfFile]:
     """Return a frozenset of elf files from file_list prepended with root.
 
+    The files are inspected concurrently.
+
     :param str root: the root directory from where the file_list is generated.
     :param file_list: a list of file in root.
+    :param ElfCache elf_cache: a cache of previously extracted ELF data.
     :returns: a frozentset of ElfFile objects.
     """
-    elf_files = set()  # type: Set[ElfFile]
-
-    for part_file in file_list:
-        # Filter out object (*.o) files-- we only care about binaries.
-        if part_file.endswith(".o"):
-            continue
 
+    def _get_elf_file(part_file: str) -> ElfFile:
         # No need to crawl links-- the original should be here, too.
         path = os.path.join(root, part_file)  # type: str
         if os.path.islink(path):
             logger.debug("Skipped link {!r} while finding dependencies".format(path))
-            continue
+            return None
         # Finally, make sure this is actually an ELF file
         if ElfFile.is_elf(path):
-            elf_file = ElfFile(path=path)
+            elf_file = ElfFile(path=path, elf_cache=elf_cache)
             # if we have dyn symbols we are dynamic
             if elf_file.needed:
-                elf_files.add(elf_file)
+                return elf_file
+        return None
+
+    # Filter out object (*.o) files-- we only care about binaries.
+    part_files = [f for f in file_list if not f.endswith(".o")]
+    elf_files = common.map_concurrently(_get_elf_file, part_files)
 
-    return frozenset(elf_files)
+    return frozenset(e for e in elf_files if e is not None)
 
 
 def _get_dynamic_linker(library_list: List[str]) -> str:
@@ -684,3 +684,17 @@ class SnapDataExtractionError(SnapcraftError):
 
     def __init__(self, snap):
         super().__init__(snap=snap)
+
+
+class InvalidSquashfsError(SnapcraftError):
+    fmt = "{path!r} does not hold a valid squashfs filesystem."
+
+    def __init__(self, *, path: str) -> None:
+        super().__init__(path=path)
+
+
+class SquashfsCompressionNotSupportedError(SnapcraftError):
+    fmt = "Reading {path!r} compressed with {compression} is not supported."
+
+    def __init__(self, *, path: str, compression: str) -> None:
+        super().__init__(path=path, compression=compression)
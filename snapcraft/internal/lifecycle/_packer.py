@@ -13,21 +13,38 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import contextlib
+import json
 import logging
 import os
+import re
+import struct
 import time
-from subprocess import check_call, CalledProcessError, Popen, PIPE, STDOUT
+from subprocess import check_call, check_output, CalledProcessError, Popen, PIPE, STDOUT
+from typing import Any, Dict, List, Optional
 
-from progressbar import AnimatedMarker, ProgressBar
+from progressbar import Bar, Percentage, ProgressBar
 
 from . import errors
 from snapcraft import file_utils, yaml_utils
 from snapcraft.internal import common
+from snapcraft.internal.errors import SnapcraftEnvironmentError
 from snapcraft.internal.indicators import is_dumb_terminal
+from snapcraft.internal.pluginhandler import ContentDigests
 
 
 _SNAP_PATH = os.path.join(os.path.sep, "snap", "core", "current", "usr", "bin", "snap")
 
+# The store only accepts snaps compressed with the first one.
+_COMPRESSIONS = ["xz", "lzo", "zstd"]
+_PROGRESS_PATTERN = re.compile(rb"\d+/\d+\s+(\d+)%")
+# The filesystem creation time is held in the superblock, after the magic
+# and the inode count.
+_SQUASHFS_MAGIC = b"hsqs"
+_SQUASHFS_MKFS_TIME_OFFSET = 8
+# Bumped whenever what goes into a pack manifest changes.
+_PACK_MANIFEST_VERSION = 1
+
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +80,20 @@ def pack(directory, output=None):
         )
 
     output_snap_name = output or common.format_snap_name(snap)
+    mksquashfs_args = _get_mksquashfs_args(mksquashfs_path, snap_type=snap["type"])
+
+    # The snap is only packed again if what went into it changed.
+    digests = ContentDigests(
+        directory, _get_sidecar_path(output_snap_name, "prime_digests")
+    )
+    manifest = _get_pack_manifest(digests, mksquashfs_args)
+    digests.save()
+    if manifest == _load_pack_manifest(output_snap_name):
+        logger.info(
+            "The prime directory is unchanged, reusing {!r}.".format(output_snap_name)
+        )
+        return output_snap_name
+
     # If a .snap-build exists at this point, when we are about to override
     # the snap blob, it is stale. We rename it so user have a chance to
     # recover accidentally lost assertions.
@@ -76,13 +107,67 @@ def pack(directory, output=None):
         mksquashfs_path,
         directory=directory,
         snap_name=snap["name"],
-        snap_type=snap["type"],
+        mksquashfs_args=mksquashfs_args,
         output_snap_name=output_snap_name,
     )
+    _save_pack_manifest(output_snap_name, manifest)
 
     return output_snap_name
 
 
+def _get_sidecar_path(snap_path: str, name: str) -> str:
+    return os.path.join(
+        os.path.dirname(snap_path),
+        ".{}.snapcraft_{}".format(os.path.basename(snap_path), name),
+    )
+
+
+def _get_pack_manifest(
+    digests: ContentDigests, mksquashfs_args: List[str]
+) -> Dict[str, Any]:
+    # The times of the files are left out, the metadata is written every time
+    # the snap is primed.
+    return {
+        "version": _PACK_MANIFEST_VERSION,
+        "prime": digests.get_tree_digest(),
+        "mksquashfs-args": mksquashfs_args,
+        "source-date-epoch": os.getenv("SOURCE_DATE_EPOCH"),
+    }
+
+
+def _get_snap_key(snap_path: str) -> Optional[List[int]]:
+    try:
+        snap_stat = os.stat(snap_path)
+    except FileNotFoundError:
+        return None
+    return [snap_stat.st_size, snap_stat.st_mtime_ns]
+
+
+def _load_pack_manifest(snap_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_get_sidecar_path(snap_path, "pack")) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(manifest, dict):
+        return None
+    # A snap that was removed, replaced or modified since is not reused.
+    snap_key = _get_snap_key(snap_path)
+    if snap_key is None or manifest.pop("snap", None) != snap_key:
+        return None
+    return manifest
+
+
+def _save_pack_manifest(snap_path: str, manifest: Dict[str, Any]) -> None:
+    snap_key = _get_snap_key(snap_path)
+    if snap_key is None:
+        return
+    manifest = dict(manifest, snap=snap_key)
+    with contextlib.suppress(OSError):
+        with open(_get_sidecar_path(snap_path, "pack"), "w") as f:
+            json.dump(manifest, f)
+
+
 def _run_snap_pack_verification(*, directory: str) -> None:
     try:
         check_call([_SNAP_PATH, "pack", "--check-skeleton", directory])
@@ -90,15 +175,72 @@ def _run_snap_pack_verification(*, directory: str) -> None:
         raise errors.PackVerificationError()
 
 
-def _run_mksquashfs(
-    mksquashfs_command, *, directory, snap_name, snap_type, output_snap_name
-):
+def _get_compression(mksquashfs_command: str) -> str:
+    compression = os.getenv("SNAPCRAFT_PACK_COMPRESSION", _COMPRESSIONS[0])
+    if compression not in _COMPRESSIONS:
+        raise SnapcraftEnvironmentError(
+            "SNAPCRAFT_PACK_COMPRESSION is set to {!r}, valid values are: "
+            "{}.".format(compression, ", ".join(_COMPRESSIONS))
+        )
+    if compression == "zstd" and not _is_compressor_available(
+        mksquashfs_command, compression
+    ):
+        logger.warning(
+            "{!r} does not support zstd compression, using lzo.".format(
+                mksquashfs_command
+            )
+        )
+        compression = "lzo"
+    if compression != _COMPRESSIONS[0]:
+        logger.warning(
+            "Snaps packed with {} compression cannot be pushed to the "
+            "store.".format(compression)
+        )
+    return compression
+
+
+def _is_compressor_available(mksquashfs_command: str, compressor: str) -> bool:
+    # The compressors available are listed along with the usage, which is
+    # shown with an error when no arguments are given.
+    try:
+        output = check_output([mksquashfs_command], stderr=STDOUT)
+    except CalledProcessError as e:
+        output = e.output
+    pattern = re.compile(r"^\t{}\b".format(compressor), re.MULTILINE)
+    return pattern.search(output.decode(errors="replace")) is not None
+
+
+def _get_processors() -> List[str]:
+    processors = os.getenv("SNAPCRAFT_PACK_PROCESSORS")
+    if processors is None:
+        return []
+    if not processors.isdigit() or int(processors) < 1:
+        raise SnapcraftEnvironmentError(
+            "SNAPCRAFT_PACK_PROCESSORS is set to {!r}, it must be a positive "
+            "number.".format(processors)
+        )
+    return ["-processors", processors]
+
+
+def _get_mksquashfs_args(mksquashfs_command: str, *, snap_type: str) -> List[str]:
     # These options need to match the review tools:
     # http://bazaar.launchpad.net/~click-reviewers/click-reviewers-tools/trunk/view/head:/clickreviews/common.py#L38
-    mksquashfs_args = ["-noappend", "-comp", "xz", "-no-xattrs", "-no-fragments"]
+    mksquashfs_args = [
+        "-noappend",
+        "-comp",
+        _get_compression(mksquashfs_command),
+        "-no-xattrs",
+        "-no-fragments",
+    ]
     if snap_type not in ("os", "base"):
         mksquashfs_args.append("-all-root")
+    mksquashfs_args.extend(_get_processors())
+    return mksquashfs_args
+
 
+def _run_mksquashfs(
+    mksquashfs_command, *, directory, snap_name, mksquashfs_args, output_snap_name
+):
     complete_command = [
         mksquashfs_command,
         directory,
@@ -106,31 +248,52 @@ def _run_mksquashfs(
     ] + mksquashfs_args
 
     with Popen(complete_command, stdout=PIPE, stderr=STDOUT) as proc:
-        ret = None
+        output = b""
         if is_dumb_terminal():
             logger.info("Snapping {!r} ...".format(snap_name))
-            ret = proc.wait()
+            output = proc.stdout.read()
         else:
             message = "\033[0;32m\rSnapping {!r}\033[0;32m ".format(snap_name)
             progress_indicator = ProgressBar(
-                widgets=[message, AnimatedMarker()], maxval=7
+                widgets=[
+                    message,
+                    Bar(marker="=", left="[", right="]"),
+                    " ",
+                    Percentage(),
+                ],
+                maxval=100,
             )
             progress_indicator.start()
-
-            ret = proc.poll()
-            count = 0
-
-            while ret is None:
-                if count >= 7:
-                    progress_indicator.start()
-                    count = 0
-                progress_indicator.update(count)
-                count += 1
-                time.sleep(.2)
-                ret = proc.poll()
+            # mksquashfs draws its own progress bar as it goes, which is
+            # followed here rather than polling for it to be done.
+            for chunk in iter(lambda: os.read(proc.stdout.fileno(), 4096), b""):
+                output += chunk
+                progress = _PROGRESS_PATTERN.findall(chunk)
+                if progress:
+                    progress_indicator.update(min(int(progress[-1]), 100))
+        ret = proc.wait()
         print("")
         if ret != 0:
-            logger.error(proc.stdout.read().decode("utf-8"))
+            logger.error(output.decode("utf-8"))
             raise RuntimeError("Failed to create snap {!r}".format(output_snap_name))
 
-        logger.debug(proc.stdout.read().decode("utf-8"))
+        logger.debug(output.decode("utf-8"))
+
+    _set_mkfs_time(output_snap_name, _get_mkfs_time(directory))
+
+
+def _get_mkfs_time(directory: str) -> int:
+    with contextlib.suppress(KeyError, ValueError):
+        return int(os.environ["SOURCE_DATE_EPOCH"])
+    # The metadata is written every time the snap is primed.
+    return int(os.stat(os.path.join(directory, "meta", "snap.yaml")).st_mtime)
+
+
+def _set_mkfs_time(snap_path: str, mkfs_time: int) -> None:
+    # mksquashfs records when the snap was packed, which is the only thing
+    # that would differ from packing the same directory again.
+    with open(snap_path, "r+b") as snap_file:
+        if snap_file.read(len(_SQUASHFS_MAGIC)) != _SQUASHFS_MAGIC:
+            return
+        snap_file.seek(_SQUASHFS_MKFS_TIME_OFFSET)
+        snap_file.write(struct.pack("<I", mkfs_time))
@@ -15,10 +15,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from typing import List  # noqa: F401
-from typing import Sequence
-
-from snapcraft import config
+import os
+import pickle
+import sys
+import tempfile
+from typing import Dict, List  # noqa: F401
+from typing import Optional, Sequence
+
+from snapcraft import config, file_utils
 from snapcraft.internal import (
     common,
     errors,
@@ -30,6 +34,7 @@ from snapcraft.internal import (
     steps,
 )
 from ._status_cache import StatusCache
+from . import errors as lifecycle_errors
 
 
 logger = logging.getLogger(__name__)
@@ -39,6 +44,8 @@ def execute(
     step: steps.Step,
     project_config: "project_loader._config.Config",
     part_names: Sequence[str] = None,
+    *,
+    jobs: int = 1
 ):
     """Execute until step in the lifecycle for part_names or all parts.
 
@@ -54,11 +61,14 @@ def execute(
     :param project_config: Fully loaded project (old logic moving either to
                            Project or the PluginHandler).
     :param list part_names: A list of parts to execute the lifecycle on.
+    :param int jobs: The maximum number of parts to pull or build
+                     concurrently, parts are processed one at a time if 1.
     :raises RuntimeError: If a prerequesite of the part needs to be staged
                           and such part is not in the list of parts to iterate
                           over.
     :returns: A dict with the snap name, version, type and architectures.
     """
+    file_utils.reset_copy_counts()
     installed_packages = repo.Repo.install_build_packages(project_config.build_tools)
     if installed_packages is None:
         raise ValueError(
@@ -90,8 +100,11 @@ def execute(
     global_state.append_build_snaps(installed_snaps)
     global_state.save(filepath=project_config.project._get_global_state_file_path())
 
-    executor = _Executor(project_config)
-    executor.run(step, part_names)
+    executor = _Executor(project_config, jobs=jobs)
+    try:
+        executor.run(step, part_names)
+    finally:
+        executor.save_status()
     if not executor.steps_were_run:
         logger.warn(
             "The requested action has already been taken. Consider\n"
@@ -118,15 +131,100 @@ def _replace_in_part(part):
     return part
 
 
+class _Job:
+    """A step for a part running in a forked child process.
+
+    Output from the child is captured in a log file that is replayed in one
+    go once the job is over, so the output of parts running concurrently does
+    not interleave.
+    """
+
+    def __init__(self, *, part, jobs_dir: str) -> None:
+        self.part = part
+        self.pid = None  # type: int
+        self._log_path = os.path.join(jobs_dir, "{}.log".format(part.name))
+        self._error_path = os.path.join(jobs_dir, "{}.error".format(part.name))
+
+    def start(self, function) -> None:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        pid = os.fork()
+        if pid:
+            self.pid = pid
+            return
+
+        exit_code = 0
+        try:
+            with open(self._log_path, "w") as log_file:
+                # Redirect the file descriptors, sys.stdout and sys.stderr
+                # may be replaced by objects which have none.
+                os.dup2(log_file.fileno(), 1)
+                os.dup2(log_file.fileno(), 2)
+            function()
+        except BaseException as e:
+            exit_code = 1
+            self._save_error(e)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
+
+    def _save_error(self, error: BaseException) -> None:
+        # Exceptions are rebuilt from their type, args and attributes as most
+        # SnapcraftError subclasses cannot be initialized without arguments,
+        # those that cannot be pickled at all are reported by message.
+        try:
+            data = pickle.dumps((type(error), error.args, error.__dict__))
+            pickle.loads(data)
+        except Exception:
+            error = lifecycle_errors.StepJobError(part_name=self.part.name, error=error)
+            data = pickle.dumps((type(error), error.args, error.__dict__))
+        with open(self._error_path, "wb") as error_file:
+            error_file.write(data)
+
+    def finish(self, status: int) -> BaseException:
+        """Replay the output of the job and return its error, if any."""
+        with open(self._log_path, errors="replace") as log_file:
+            sys.stdout.write(log_file.read())
+            sys.stdout.flush()
+
+        if os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+            return None
+
+        try:
+            with open(self._error_path, "rb") as error_file:
+                error_type, args, attributes = pickle.load(error_file)
+        except FileNotFoundError:
+            return lifecycle_errors.StepJobError(
+                part_name=self.part.name,
+                error="the process exited with status {}".format(status),
+            )
+
+        error = error_type.__new__(error_type)
+        error.args = args
+        error.__dict__.update(attributes)
+        return error
+
+
 class _Executor:
-    def __init__(self, project_config):
+    def __init__(self, project_config, *, jobs: int = 1) -> None:
         self.config = project_config
         self.project = project_config.project
         self.parts_config = project_config.parts
         self.steps_were_run = False
 
+        # Forking is required to safely run steps concurrently, as the build
+        # environment in common.env is global.
+        if not hasattr(os, "fork"):
+            jobs = 1
+        self._jobs = jobs
+
         self._cache = StatusCache(project_config)
 
+    def save_status(self) -> None:
+        self._cache.save()
+
     def run(self, step: steps.Step, part_names=None):
         if part_names:
             self.parts_config.validate(part_names)
@@ -144,11 +242,155 @@ class _Executor:
                     # XXX check only for collisions on the parts that have
                     # already been built --elopio - 20170713
                     pluginhandler.check_for_collisions(self.config.all_parts)
+                if self._jobs > 1 and current_step <= steps.BUILD:
+                    self._handle_step_concurrently(
+                        part_names, parts, step, current_step, cli_config
+                    )
+                    continue
                 for part in parts:
                     self._handle_step(part_names, part, step, current_step, cli_config)
 
         self._create_meta(step, processed_part_names)
 
+    def _handle_step_concurrently(
+        self,
+        requested_part_names: Sequence[str],
+        parts: List[pluginhandler.PluginHandler],
+        requested_step: steps.Step,
+        current_step: steps.Step,
+        cli_config,
+    ) -> None:
+        """Handle current_step for parts, running up to self._jobs at a time.
+
+        A part is only scheduled once all of its (recursive) dependencies in
+        this batch are done with the step. Dependencies that need to reach the
+        prerequisite step (i.e. be staged) are taken care of in this process
+        while no job is running, which keeps staging and its collision checks
+        serialized.
+        """
+        pending = list(parts)
+        running = dict()  # type: Dict[int, _Job]
+        error = None  # type: BaseException
+
+        with tempfile.TemporaryDirectory(prefix="snapcraft-jobs-") as jobs_dir:
+            while pending or running:
+                if error:
+                    pending.clear()
+                else:
+                    self._start_ready_jobs(
+                        pending,
+                        running,
+                        jobs_dir,
+                        requested_part_names,
+                        requested_step,
+                        current_step,
+                        cli_config,
+                    )
+                if running:
+                    job_error = self._wait_for_job(running, current_step)
+                    error = error or job_error
+
+        if error:
+            raise error
+
+    def _start_ready_jobs(
+        self,
+        pending: List[pluginhandler.PluginHandler],
+        running: Dict[int, _Job],
+        jobs_dir: str,
+        requested_part_names: Sequence[str],
+        requested_step: steps.Step,
+        current_step: steps.Step,
+        cli_config,
+    ) -> None:
+        prerequisite_step = steps.get_dependency_prerequisite_step(current_step)
+        for part in list(pending):
+            if len(running) >= self._jobs:
+                break
+            if self._is_waiting_on_others(part, pending, running.values()):
+                continue
+
+            if not self._step_needs_work(
+                requested_part_names, part, requested_step, current_step
+            ):
+                pending.remove(part)
+                self._handle_step(
+                    requested_part_names, part, requested_step, current_step, cli_config
+                )
+                continue
+
+            dependency_names = {
+                p.name
+                for p in self.parts_config.get_dependencies(part.name)
+                if self._cache.should_step_run(p, prerequisite_step)
+            }
+            if dependency_names:
+                if running:
+                    continue
+                logger.info(
+                    "{!r} has dependencies that need to be {}d: {}".format(
+                        part.name, prerequisite_step.name, " ".join(dependency_names)
+                    )
+                )
+                self.run(prerequisite_step, dependency_names)
+
+            pending.remove(part)
+            job = _Job(part=part, jobs_dir=jobs_dir)
+            job.start(
+                lambda: self._handle_step(
+                    requested_part_names, part, requested_step, current_step, cli_config
+                )
+            )
+            running[job.pid] = job
+
+    def _wait_for_job(
+        self, running: Dict[int, _Job], current_step: steps.Step
+    ) -> Optional[BaseException]:
+        pid, status = os.wait()
+        job = running.pop(pid, None)
+        if job is None:
+            return None
+        error = job.finish(status)
+        if not error:
+            self._complete_concurrent_step(job.part, current_step)
+        return error
+
+    def _is_waiting_on_others(self, part, pending, running_jobs) -> bool:
+        busy_part_names = {p.name for p in pending if p is not part}
+        busy_part_names |= {j.part.name for j in running_jobs}
+        return any(
+            p.name in busy_part_names
+            for p in self.parts_config.get_dependencies(part.name, recursive=True)
+        )
+
+    def _step_needs_work(
+        self,
+        requested_part_names: Sequence[str],
+        part: pluginhandler.PluginHandler,
+        requested_step: steps.Step,
+        current_step: steps.Step,
+    ) -> bool:
+        # This mirrors the decisions taken in _handle_step
+        if not self._cache.has_step_run(part, current_step):
+            return True
+        if (
+            requested_part_names
+            and current_step == requested_step
+            and part.name in requested_part_names
+        ):
+            return True
+        return bool(
+            self._cache.get_dirty_report(part, current_step)
+            or self._cache.get_outdated_report(part, current_step)
+        )
+
+    def _complete_concurrent_step(self, part, step):
+        # The job might have cleaned later steps, and none of the changes it
+        # made to the cache made it back to this process.
+        for current_step in [step] + step.next_steps():
+            self._cache.clear_step(part, current_step)
+        self._complete_step(part, step)
+
     def _handle_step(
         self,
         requested_part_names: Sequence[str],
@@ -335,7 +577,11 @@ class _Executor:
                 "Updating {} step for".format(step.name),
                 "({})".format(outdated_report.get_summary()),
             )
-            update_function()
+            if step >= steps.STAGE:
+                # Files shared with other parts are left in place.
+                update_function(self.config.get_project_state(step))
+            else:
+                update_function()
 
             # We know we just ran this step, so rather than check, manually
             # twiddle the cache
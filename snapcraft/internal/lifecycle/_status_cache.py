@@ -16,17 +16,27 @@
 
 import collections
 import contextlib
-from typing import Any, Dict, List, Set  # noqa: F401
+import json
+import os
+from typing import Any, Dict, List, Optional, Set  # noqa: F401
 
-from snapcraft.internal import errors, pluginhandler, steps
+from snapcraft.internal import errors, pluginhandler, states, steps
 import snapcraft.internal.project_loader._config as _config
 
 _DirtyReport = Dict[str, Dict[steps.Step, pluginhandler.DirtyReport]]
 _OutdatedReport = Dict[str, Dict[steps.Step, pluginhandler.OutdatedReport]]
 
+_STATUS_VERSION = 1
+
 
 class StatusCache:
-    """The StatusCache is a lazy caching interface for the status of parts."""
+    """The StatusCache is a lazy caching interface for the status of parts.
+
+    Which steps were found not to be dirty is also persisted in the parts
+    directory by save(), along with the state and properties they were
+    checked against, so following invocations only need to check them again
+    once either changes.
+    """
 
     def __init__(self, config: _config.Config) -> None:
         """Create a new StatusCache.
@@ -37,6 +47,11 @@ class StatusCache:
         self._steps_run = dict()  # type: Dict[str, Set[steps.Step]]
         self._outdated_reports = collections.defaultdict(dict)  # type: _OutdatedReport
         self._dirty_reports = collections.defaultdict(dict)  # type: _DirtyReport
+        self._status_file = os.path.join(
+            config.project.parts_dir, ".snapcraft_status_cache"
+        )
+        self._status = _load_status(self._status_file)
+        self._status_changed = False
 
     def should_step_run(
         self, part: pluginhandler.PluginHandler, step: steps.Step
@@ -131,6 +146,16 @@ class StatusCache:
         if not self._dirty_reports[part.name]:
             _del_key(self._dirty_reports, part.name)
 
+    def save(self) -> None:
+        """Persist the status computed so far for following invocations."""
+        if not self._status_changed:
+            return
+        # Nothing has run if there is no parts directory yet.
+        with contextlib.suppress(FileNotFoundError):
+            with open(self._status_file, "w") as f:
+                json.dump({"version": _STATUS_VERSION, "parts": self._status}, f)
+            self._status_changed = False
+
     def _ensure_steps_run(self, part: pluginhandler.PluginHandler) -> None:
         if part.name not in self._steps_run:
             self._steps_run[part.name] = _get_steps_run(part)
@@ -150,7 +175,7 @@ class StatusCache:
 
         # Get the dirty report from the PluginHandler. If it's dirty, we can
         # stop here
-        self._dirty_reports[part.name][step] = part.get_dirty_report(step)
+        self._dirty_reports[part.name][step] = self._get_part_dirty_report(part, step)
         if self._dirty_reports[part.name][step]:
             return
 
@@ -190,6 +215,48 @@ class StatusCache:
                     changed_dependencies=changed_dependencies
                 )
 
+    def _get_part_dirty_report(
+        self, part: pluginhandler.PluginHandler, step: steps.Step
+    ) -> pluginhandler.DirtyReport:
+        stamp = _get_state_stamp(part, step)
+        digest = part.get_properties_digest()
+        part_status = self._status.get(part.name)
+        if part_status is None or part_status["properties"] != digest:
+            part_status = self._status[part.name] = {"properties": digest, "clean": {}}
+            self._status_changed = True
+        elif stamp is not None and part_status["clean"].get(step.name) == stamp:
+            return None
+
+        dirty_report = part.get_dirty_report(step)
+        if dirty_report is None and stamp is not None:
+            part_status["clean"][step.name] = stamp
+            self._status_changed = True
+        elif part_status["clean"].pop(step.name, None) is not None:
+            self._status_changed = True
+        return dirty_report
+
+
+def _load_status(status_file: str) -> Dict[str, Any]:
+    try:
+        with open(status_file) as f:
+            status = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return dict()
+    if not isinstance(status, dict) or status.get("version") != _STATUS_VERSION:
+        return dict()
+    return status["parts"]
+
+
+def _get_state_stamp(
+    part: pluginhandler.PluginHandler, step: steps.Step
+) -> Optional[List[int]]:
+    state_file = states.get_step_state_file(part.plugin.statedir, step)
+    try:
+        state_stat = os.stat(state_file)
+    except FileNotFoundError:
+        return None
+    return [state_stat.st_ino, state_stat.st_mtime_ns, state_stat.st_size]
+
 
 def _get_steps_run(part: pluginhandler.PluginHandler) -> Set[steps.Step]:
     steps_run = set()  # type: Set[steps.Step]
@@ -22,3 +22,11 @@ class PackVerificationError(_SnapcraftError):
         # snap pack will show information on what went wrong.
         self.fmt = "Failed to verify directory to pack."
         super().__init__()
+
+
+class StepJobError(_SnapcraftError):
+
+    fmt = "Failed to run a job for part {part_name!r}: {error}"
+
+    def __init__(self, *, part_name: str, error) -> None:
+        super().__init__(part_name=part_name, error=str(error))
@@ -19,12 +19,28 @@ import subprocess
 from typing import FrozenSet
 
 from snapcraft import file_utils
-from snapcraft.internal import elf
-
+from snapcraft.internal import common, elf
 
 logger = logging.getLogger(__name__)
 
 
+_ARGLESS_SHEBANG_PATTERN = re.compile(r"\A#!.*(python\S*)$", re.MULTILINE)
+_SHEBANG_WITH_ARGS_PATTERN = re.compile(
+    r"\A#!.*(python\S*)[ \t\f\v]+(\S+)$", re.MULTILINE
+)
+_ARGLESS_SHEBANG_REPLACEMENT = r"#!/usr/bin/env \1"
+# The argless rewrite will barf if the shebang includes any args to python.
+# For example, if the shebang was `#!/usr/bin/python3 -Es`, just replacing
+# that with `#!/usr/bin/env python3 -Es` isn't going to work as `env`
+# doesn't support arguments like that.
+#
+# The solution is to replace the shebang with one pointing to /bin/sh, and
+# then exec the original shebang with included arguments. This requires
+# some quoting hacks to ensure the file can be interpreted by both sh as
+# well as python, but it's better than shipping our own `env`.
+_SHEBANG_WITH_ARGS_REPLACEMENT = r"""#!/bin/sh\n''''exec \1 \2 -- "$0" "$@" # '''"""
+
+
 def rewrite_python_shebangs(root_dir):
     """Recursively change #!/usr/bin/pythonX shebangs to #!/usr/bin/env pythonX
 
@@ -32,32 +48,28 @@ def rewrite_python_shebangs(root_dir):
     """
 
     file_pattern = re.compile(r"")
-    argless_shebang_pattern = re.compile(r"\A#!.*(python\S*)$", re.MULTILINE)
-    shebang_pattern_with_args = re.compile(
-        r"\A#!.*(python\S*)[ \t\f\v]+(\S+)$", re.MULTILINE
-    )
 
     file_utils.replace_in_file(
-        root_dir, file_pattern, argless_shebang_pattern, r"#!/usr/bin/env \1"
+        root_dir, file_pattern, _ARGLESS_SHEBANG_PATTERN, _ARGLESS_SHEBANG_REPLACEMENT
     )
-
-    # The above rewrite will barf if the shebang includes any args to python.
-    # For example, if the shebang was `#!/usr/bin/python3 -Es`, just replacing
-    # that with `#!/usr/bin/env python3 -Es` isn't going to work as `env`
-    # doesn't support arguments like that.
-    #
-    # The solution is to replace the shebang with one pointing to /bin/sh, and
-    # then exec the original shebang with included arguments. This requires
-    # some quoting hacks to ensure the file can be interpreted by both sh as
-    # well as python, but it's better than shipping our own `env`.
     file_utils.replace_in_file(
         root_dir,
         file_pattern,
-        shebang_pattern_with_args,
-        r"""#!/bin/sh\n''''exec \1 \2 -- "$0" "$@" # '''""",
+        _SHEBANG_WITH_ARGS_PATTERN,
+        _SHEBANG_WITH_ARGS_REPLACEMENT,
     )
 
 
+def rewrite_python_shebang(contents: str) -> str:
+    """Return contents with a #!/usr/bin/pythonX shebang changed to use env.
+
+    :param str contents: the contents of a file, which may start with a
+                         shebang.
+    """
+    contents = _ARGLESS_SHEBANG_PATTERN.sub(_ARGLESS_SHEBANG_REPLACEMENT, contents)
+    return _SHEBANG_WITH_ARGS_PATTERN.sub(_SHEBANG_WITH_ARGS_REPLACEMENT, contents)
+
+
 def clear_execstack(*, elf_files: FrozenSet[elf.ElfFile]) -> None:
     """Clears the execstack for the relevant elf_files
 
@@ -77,8 +89,12 @@ def clear_execstack(*, elf_files: FrozenSet[elf.ElfFile]) -> None:
             "for the part.".format("\n".join(formatted_items))
         )
 
-    for elf_file in elf_files_with_execstack:
+    def _clear_execstack(elf_file: elf.ElfFile) -> None:
         try:
             subprocess.check_call([execstack_path, "--clear-execstack", elf_file.path])
         except subprocess.CalledProcessError:
             logger.warning("Failed to clear execstack for {!r}".format(elf_file.path))
+
+    common.map_concurrently(
+        _clear_execstack, sorted(elf_files_with_execstack, key=lambda e: e.path)
+    )
@@ -17,30 +17,48 @@
 import collections
 import contextlib
 import copy
+import distutils.util
 import filecmp
+import hashlib
+import json
 import logging
 import os
 import shutil
+import string
 import subprocess
 import sys
 from glob import glob, iglob
-from typing import cast, Dict, List, Set, Sequence
+from typing import cast, Any, Dict, List, Optional, Set, Sequence, Tuple
 
 import snapcraft.extractors
-from snapcraft import file_utils, yaml_utils
-from snapcraft.internal import common, elf, errors, repo, sources, states, steps
+from snapcraft import file_utils
+from snapcraft.internal import (
+    cache,
+    common,
+    elf,
+    errors,
+    repo,
+    sources,
+    states,
+    steps,
+)
 from snapcraft.internal.mangling import clear_execstack
 
 from ._build_attributes import BuildAttributes
+from ._content_digests import ContentDigests
 from ._metadata_extraction import extract_metadata
 from ._plugin_loader import load_plugin  # noqa
 from ._runner import Runner
 from ._patchelf import PartPatcher
 from ._dirty_report import Dependency, DirtyReport  # noqa
+from ._fileset_matcher import FilesetMatcher
 from ._outdated_report import OutdatedReport
 
 logger = logging.getLogger(__name__)
 
+# The steps whose migrated paths are kept in the project's path index.
+_INDEXED_STEPS = (steps.STAGE, steps.PRIME)
+
 
 class PluginHandler:
     @property
@@ -61,7 +79,8 @@ class PluginHandler:
         base,
         confinement,
         snap_type,
-        soname_cache
+        soname_cache,
+        elf_cache
     ):
         self.valid = False
         self.plugin = plugin
@@ -74,6 +93,7 @@ class PluginHandler:
         self._confinement = confinement
         self._snap_type = snap_type
         self._soname_cache = soname_cache
+        self._elf_cache = elf_cache
         self._source = grammar_processor.get_source()
         if not self._source:
             self._source = part_schema["source"].get("default")
@@ -83,11 +103,16 @@ class PluginHandler:
         self._stage_state = None  # type: states.StageState
         self._prime_state = None  # type: states.PrimeState
 
+        # The states of all the parts in the project, set when updating the
+        # stage or prime steps to leave the files shared with them in place.
+        self._project_states = dict()  # type: Dict[steps.Step, Dict[str, Any]]
+
         self._project_options = project_options
         self.deps = []
 
         self.stagedir = project_options.stage_dir
         self.primedir = project_options.prime_dir
+        self._path_index = states.PathIndex(os.path.dirname(self.plugin.partdir))
 
         # We don't need to set the source_handler on systems where we do not
         # build
@@ -356,6 +381,19 @@ class PluginHandler:
 
         return None
 
+    def get_properties_digest(self) -> str:
+        """Return a digest of the properties and options steps depend on.
+
+        Whenever this digest is unchanged, so is any dirty report obtained
+        from get_dirty_report() for an unchanged state.
+        """
+        data = json.dumps(
+            [self._part_properties, getattr(self._project_options, "deb_arch", None)],
+            sort_keys=True,
+            default=repr,
+        )
+        return hashlib.sha256(data.encode()).hexdigest()
+
     def should_step_run(self, step, force=False):
         return force or self.is_clean(step)
 
@@ -371,13 +409,24 @@ class PluginHandler:
         if not state:
             state = {}
 
-        with open(states.get_step_state_file(self.plugin.statedir, step), "w") as f:
-            f.write(yaml_utils.dump(state))
+        states.save_state(self.plugin.statedir, step, state)
+        if step in _INDEXED_STEPS:
+            self._path_index.update(step, self.name, state)
 
     def mark_cleaned(self, step):
         state_file = states.get_step_state_file(self.plugin.statedir, step)
         if os.path.exists(state_file):
             os.remove(state_file)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._get_snapshot_file(step))
+        if step in _INDEXED_STEPS:
+            self._path_index.remove(step, self.name)
+        if step == steps.PULL:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._get_source_digests_file())
+        if step == steps.BUILD:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.get_digests_file())
 
         if os.path.isdir(self.plugin.statedir) and not os.listdir(self.plugin.statedir):
             os.rmdir(self.plugin.statedir)
@@ -526,34 +575,100 @@ class PluginHandler:
         self.makedirs()
 
         if not self.plugin.out_of_source_build:
-            if os.path.exists(self.plugin.build_basedir):
-                shutil.rmtree(self.plugin.build_basedir)
+            file_utils.reset_copy_counts()
+            if self._build_attributes.incremental_sync():
+                self._sync_build_basedir()
+            else:
+                if os.path.exists(self.plugin.build_basedir):
+                    shutil.rmtree(self.plugin.build_basedir)
+
+                # No hard-links being used here in case the build process
+                # modifies these files, file_utils.copy clones them where
+                # possible.
+                shutil.copytree(
+                    self.plugin.sourcedir,
+                    self.plugin.build_basedir,
+                    symlinks=True,
+                    ignore=self._ignore_in_sourcedir,
+                    copy_function=file_utils.copy,
+                )
+            logger.debug(
+                "Files copied by method: {!r}".format(file_utils.get_copy_counts())
+            )
 
-            # FIXME: It's not necessary to ignore here anymore since it's now
-            # done in the Local source. However, it's left here so that it
-            # continues to work on old snapcraft trees that still have src
-            # symlinks.
-            def ignore(directory, files):
-                if directory == self.plugin.sourcedir:
-                    snaps = glob(os.path.join(directory, "*.snap"))
-                    if snaps:
-                        snaps = [os.path.basename(s) for s in snaps]
-                        return common.SNAPCRAFT_FILES + snaps
-                    else:
-                        return common.SNAPCRAFT_FILES
-                else:
-                    return []
+        build_cache = _get_build_cache()
+        if build_cache is None:
+            self._do_build()
+            return
 
-            # No hard-links being used here in case the build process modifies
-            # these files.
-            shutil.copytree(
-                self.plugin.sourcedir,
-                self.plugin.build_basedir,
-                symlinks=True,
-                ignore=ignore,
+        build_cache_key = self._get_build_cache_key()
+        if not self._restore_build(build_cache, build_cache_key):
+            self._do_build()
+            build_cache.cache(
+                key=build_cache_key,
+                installdir=self.plugin.installdir,
+                statedir=self.plugin.statedir,
             )
 
-        self._do_build()
+    def _get_build_cache_key(self) -> str:
+        # Builds commonly embed the paths they were built in, so parts are
+        # only ever restored to the same location.
+        inputs = {
+            "snapcraft": snapcraft.__version__,
+            "partdir": os.path.abspath(self.plugin.partdir),
+            "part-properties": self._part_properties,
+            "base": self._base,
+            "deb-arch": getattr(self._project_options, "deb_arch", None),
+            "machine": os.uname().machine,
+            # Local plugins change without snapcraft changing.
+            "plugin": _get_plugin_digests(self.plugin),
+        }  # type: Dict[str, Any]
+
+        pull_state = states.get_state(self.plugin.statedir, steps.PULL)
+        if pull_state:
+            inputs["pull-assets"] = pull_state.assets
+
+        source_digests = ContentDigests(
+            self.plugin.sourcedir, self._get_source_digests_file()
+        )
+        inputs["source"] = source_digests.get_tree_digest()
+        source_digests.save()
+
+        # Parts built after others build against what those staged.
+        if self._part_properties.get("after"):
+            stage_digests = ContentDigests(
+                self.stagedir,
+                os.path.join(
+                    os.path.dirname(self.plugin.partdir), ".snapcraft_stage_digests"
+                ),
+            )
+            inputs["stage"] = stage_digests.get_tree_digest()
+            stage_digests.save()
+
+        data = json.dumps(inputs, sort_keys=True, default=repr)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _get_source_digests_file(self) -> str:
+        return os.path.join(self.plugin.partdir, ".snapcraft_source_digests")
+
+    def _restore_build(self, build_cache: cache.BuildCache, key: str) -> bool:
+        entry = build_cache.get(key=key)
+        if entry is None:
+            return False
+        state = states.get_state(os.path.join(entry, "state"), steps.BUILD)
+        if not state:
+            return False
+
+        logger.info("Using the cached build of {!r}".format(self.name))
+        if os.path.exists(self.plugin.installdir):
+            shutil.rmtree(self.plugin.installdir)
+        file_utils.link_or_copy_tree(
+            os.path.join(entry, "install"),
+            self.plugin.installdir,
+            copy_function=file_utils.copy,
+        )
+        self.mark_done(steps.BUILD, state)
+        return True
 
     def update_build(self):
         if not self.plugin.out_of_source_build:
@@ -569,10 +684,50 @@ class PluginHandler:
                 states.get_step_state_file(self.plugin.statedir, steps.BUILD)
             ):
                 return
-            source.update()
+            if self._build_attributes.incremental_sync():
+                # Unlike updating from the source, this also removes the
+                # files that were removed from it.
+                self._sync_build_basedir()
+            else:
+                source.update()
 
         self._do_build(update=True)
 
+    # FIXME: It's not necessary to ignore here anymore since it's now done in
+    # the Local source. However, it's left here so that it continues to work
+    # on old snapcraft trees that still have src symlinks.
+    def _ignore_in_sourcedir(self, directory, files):
+        if directory == self.plugin.sourcedir:
+            snaps = glob(os.path.join(directory, "*.snap"))
+            if snaps:
+                snaps = [os.path.basename(s) for s in snaps]
+                return common.SNAPCRAFT_FILES + snaps
+            else:
+                return common.SNAPCRAFT_FILES
+        else:
+            return []
+
+    def _sync_build_basedir(self) -> None:
+        # The build directory is kept around, build artifacts and all, and
+        # only the files that changed in the source directory are copied.
+        sync_file = self._get_sync_file()
+        previous_paths = []  # type: List[str]
+        with contextlib.suppress(FileNotFoundError, ValueError):
+            with open(sync_file) as f:
+                previous_paths = json.load(f)
+        synced_paths = file_utils.sync_tree(
+            self.plugin.sourcedir,
+            self.plugin.build_basedir,
+            synced_paths=previous_paths,
+            ignore=self._ignore_in_sourcedir,
+            copy_function=file_utils.copy,
+        )
+        with open(sync_file, "w") as f:
+            json.dump(sorted(synced_paths), f)
+
+    def _get_sync_file(self) -> str:
+        return os.path.join(self.plugin.partdir, ".snapcraft_build_sync")
+
     def _do_build(self, *, update=False):
         self._runner.build()
 
@@ -678,12 +833,15 @@ class PluginHandler:
             "installed-snaps": repo.snaps.get_installed_snaps(),
         }
 
-    def clean_build(self):
+    def clean_build(self, *, keep_build_basedir=False):
         if self.is_clean(steps.BUILD):
             return
 
-        if os.path.exists(self.plugin.build_basedir):
-            shutil.rmtree(self.plugin.build_basedir)
+        if not (keep_build_basedir and self._build_attributes.incremental_sync()):
+            if os.path.exists(self.plugin.build_basedir):
+                shutil.rmtree(self.plugin.build_basedir)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._get_sync_file())
 
         if os.path.exists(self.plugin.installdir):
             shutil.rmtree(self.plugin.installdir)
@@ -726,6 +884,9 @@ class PluginHandler:
         if self.is_clean(steps.STAGE):
             self.mark_stage_done(set(), set())
 
+    def update_stage(self, project_staged_state=None):
+        self._update_step(steps.STAGE, project_staged_state)
+
     def _do_stage(self):
         snap_files, snap_dirs = self.migratable_fileset_for(steps.STAGE)
 
@@ -736,7 +897,8 @@ class PluginHandler:
                 return
             repo.fix_pkg_config(self.stagedir, file_path, self.plugin.installdir)
 
-        _migrate_files(
+        self._migrate_changed_files(
+            steps.STAGE,
             snap_files,
             snap_dirs,
             self.plugin.installdir,
@@ -767,7 +929,7 @@ class PluginHandler:
         state = states.get_state(self.plugin.statedir, steps.STAGE)
 
         try:
-            self._clean_shared_area(self.stagedir, state, project_staged_state)
+            self._clean_shared_area(steps.STAGE, state, project_staged_state)
         except AttributeError:
             raise errors.MissingStateCleanError(steps.STAGE)
 
@@ -782,9 +944,14 @@ class PluginHandler:
         if self.is_clean(steps.PRIME):
             self.mark_prime_done(set(), set(), set())
 
+    def update_prime(self, project_primed_state=None) -> None:
+        self._update_step(steps.PRIME, project_primed_state)
+
     def _do_prime(self) -> None:
         snap_files, snap_dirs = self.migratable_fileset_for(steps.PRIME)
-        _migrate_files(snap_files, snap_dirs, self.stagedir, self.primedir)
+        self._migrate_changed_files(
+            steps.PRIME, snap_files, snap_dirs, self.stagedir, self.primedir
+        )
 
         if self._snap_type == "app":
             dependency_paths = self._handle_elf(snap_files)
@@ -794,20 +961,38 @@ class PluginHandler:
         self.mark_prime_done(snap_files, snap_dirs, dependency_paths)
 
     def _handle_elf(self, snap_files: Sequence[str]) -> Set[str]:
-        elf_files = elf.get_elf_files(self.primedir, snap_files)
+        elf_files = elf.get_elf_files(
+            self.primedir, snap_files, elf_cache=self._elf_cache
+        )
         all_dependencies = set()
         core_path = common.get_core_path(self._base)
 
+        if self._build_attributes.use_ldd():
+            library_resolver = None
+        else:
+            library_resolver = elf.LibraryResolver(
+                library_paths=self._get_library_paths(), elf_cache=self._elf_cache
+            )
+
         # Clear the cache of all libs that aren't already in the primedir
+        # and make the libraries primed by this part known to the index.
         self._soname_cache.reset_except_root(self.primedir)
-        for elf_file in elf_files:
-            all_dependencies.update(
-                elf_file.load_dependencies(
-                    root_path=self.primedir,
-                    core_base_path=core_path,
-                    soname_cache=self._soname_cache,
-                )
-            )
+        self._soname_cache.update_index(
+            self.primedir, (os.path.join(self.primedir, f) for f in snap_files)
+        )
+        dependencies = common.map_concurrently(
+            lambda elf_file: elf_file.load_dependencies(
+                root_path=self.primedir,
+                core_base_path=core_path,
+                soname_cache=self._soname_cache,
+                elf_cache=self._elf_cache,
+                library_resolver=library_resolver,
+            ),
+            sorted(elf_files, key=lambda e: e.path),
+        )
+        for elf_file_dependencies in dependencies:
+            all_dependencies.update(elf_file_dependencies)
+        self._elf_cache.save()
 
         dependency_paths = self._handle_dependencies(all_dependencies)
 
@@ -836,6 +1021,47 @@ class PluginHandler:
 
         return dependency_paths
 
+    def _get_library_paths(self) -> List[str]:
+        # The same paths the LD_LIBRARY_PATH in the environment of the part
+        # starts with, see project_loader.runtime_env.
+        library_paths = []  # type: List[str]
+        for root in (self.plugin.installdir, self.stagedir):
+            library_paths.extend(
+                common.get_library_paths(root, self._project_options.arch_triplet)
+            )
+            library_paths.extend(elf.determine_ld_library_path(root))
+
+        # Followed by what the plugin and the build-environment of the part
+        # set it to, which usually extend it.
+        replacements = {
+            "SNAPCRAFT_PART_SRC": self.plugin.sourcedir,
+            "SNAPCRAFT_PART_BUILD": self.plugin.builddir,
+            "SNAPCRAFT_PART_INSTALL": self.plugin.installdir,
+            "SNAPCRAFT_STAGE": self.stagedir,
+            "SNAPCRAFT_PRIME": self.primedir,
+        }
+        ld_library_path = ":".join(library_paths)
+        environment = self.plugin.env(self.plugin.installdir) + self.build_environment
+        for variable in environment:
+            name, _, value = variable.partition("=")
+            if name.strip() != "LD_LIBRARY_PATH":
+                continue
+            if len(value) > 1 and value[0] == value[-1] and value[0] in "'\"":
+                value = value[1:-1]
+            ld_library_path = string.Template(value).safe_substitute(
+                replacements, LD_LIBRARY_PATH=ld_library_path
+            )
+
+        library_paths = []
+        for path in ld_library_path.split(":"):
+            if os.path.isabs(path) and "$" not in path:
+                library_paths.append(path)
+            elif path:
+                logger.debug(
+                    "Not resolving libraries from {!r} in LD_LIBRARY_PATH".format(path)
+                )
+        return library_paths
+
     def mark_prime_done(self, snap_files, snap_dirs, dependency_paths):
         self.mark_done(
             steps.PRIME,
@@ -856,28 +1082,125 @@ class PluginHandler:
         state = self.get_prime_state()
 
         try:
-            self._clean_shared_area(self.primedir, state, project_primed_state)
+            self._clean_shared_area(steps.PRIME, state, project_primed_state)
         except AttributeError:
             raise errors.MissingStateCleanError(steps.PRIME)
 
         self.mark_cleaned(steps.PRIME)
 
-    def _clean_shared_area(self, shared_directory, part_state, project_state):
+    def _update_step(self, step, project_state):
+        state = self.get_state(step)
+        self._project_states[step] = project_state or {}
+        try:
+            getattr(self._runner, step.name)()
+        finally:
+            skipped = self._project_states.pop(step, None) is not None
+
+        # A scriptlet may have skipped migrating the files, those previously
+        # migrated are still in place.
+        if skipped:
+            self.mark_done(step, state)
+
+    def _migrate_changed_files(
+        self,
+        step,
+        snap_files,
+        snap_dirs,
+        srcdir,
+        dstdir,
+        fixup_func=lambda *args: None,
+    ):
+        """Migrate the files that changed since step was last run.
+
+        Files that were migrated and whose source did not change since are
+        left alone, those no longer migrated are removed unless other parts
+        share them. Everything is migrated if the step is clean.
+        """
+        snapshot_file = self._get_snapshot_file(step)
+        previous_snapshot = dict()  # type: Dict[str, List[int]]
+        previous_dirs = set()  # type: Set[str]
+
+        project_state = self._project_states.pop(step, None)
+        state = self.get_state(step)
+        if project_state is not None and state is not None:
+            previous_snapshot = _load_migration_snapshot(snapshot_file)
+            previous_dirs = state.directories
+            removed_state = copy.copy(state)
+            removed_state.files = state.files - snap_files
+            removed_state.directories = state.directories - snap_dirs
+            self._clean_shared_area(step, removed_state, project_state)
+
+        snapshot = _get_migration_snapshot(snap_files, srcdir)
+        changed_files = {
+            f
+            for f in snap_files
+            if previous_snapshot.get(f) != snapshot[f]
+            or not os.path.lexists(os.path.join(dstdir, f))
+        }
+        new_dirs = {
+            d
+            for d in snap_dirs
+            if d not in previous_dirs or not os.path.isdir(os.path.join(dstdir, d))
+        }
+        logger.debug(
+            "Migrating {} of {} files for the {} step".format(
+                len(changed_files), len(snap_files), step.name
+            )
+        )
+
+        # Files migrated before are replaced, as _migrate_files leaves symlinks
+        # already in place alone.
+        for changed_file in changed_files & previous_snapshot.keys():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(dstdir, changed_file))
+
+        _migrate_files(changed_files, new_dirs, srcdir, dstdir, fixup_func=fixup_func)
+        _save_migration_snapshot(snapshot_file, snapshot)
+
+    def get_digests_file(self) -> str:
+        """Return the file caching the digests of the files in installdir."""
+        return os.path.join(self.plugin.partdir, ".snapcraft_install_digests")
+
+    def _get_snapshot_file(self, step):
+        # Not kept in the state directory, which only holds step states.
+        return os.path.join(
+            self.plugin.partdir, ".snapcraft_{}_snapshot".format(step.name)
+        )
+
+    def _clean_shared_area(self, step, part_state, project_state):
         primed_files = part_state.files
         primed_directories = part_state.directories
 
         # We want to make sure we don't remove a file or directory that's
         # being used by another part. So we'll examine the state for all parts
         # in the project and leave any files or directories found to be in
-        # common.
-        for other_name, other_state in project_state.items():
-            if other_state and (other_name != self.name):
-                primed_files -= other_state.files
-                primed_directories -= other_state.directories
+        # common. The path index knows the paths of the parts whose state is
+        # saved, the other states are examined directly.
+        other_names = {
+            other_name
+            for other_name, other_state in project_state.items()
+            if other_state and (other_name != self.name)
+        }
+        indexed_names = self._path_index.refresh(step, other_names)
+        shared_files = self._path_index.get_shared_paths(
+            step, primed_files, directory=False, part_names=indexed_names
+        )
+        shared_directories = self._path_index.get_shared_paths(
+            step, primed_directories, directory=True, part_names=indexed_names
+        )
+        primed_files = {f for f in primed_files if f not in shared_files}
+        primed_directories = {
+            d for d in primed_directories if d not in shared_directories
+        }
+        for other_name in other_names - indexed_names:
+            primed_files -= project_state[other_name].files
+            primed_directories -= project_state[other_name].directories
 
         # Finally, clean the files and directories that are specific to this
         # part.
-        _clean_migrated_files(primed_files, primed_directories, shared_directory)
+        _clean_migrated_files(
+            primed_files, primed_directories, self.working_directory_for_step(step)
+        )
 
     def _handle_dependencies(self, all_dependencies: Set[str]):
         # Split the necessary dependencies into their corresponding location.
@@ -956,7 +1279,9 @@ class PluginHandler:
             self.clean_stage(project_staged_state)
 
         if not step or step <= steps.BUILD:
-            self.clean_build()
+            # Parts synced incrementally keep their build artifacts around,
+            # unless the whole part is cleaned.
+            self.clean_build(keep_build_basedir=step is not None)
 
         if not step or step <= steps.PULL:
             self.clean_pull()
@@ -1032,24 +1357,7 @@ def _expand_part_properties(part_properties, part_schema):
 def _migratable_filesets(fileset, srcdir):
     includes, excludes = _get_file_list(fileset)
 
-    include_files = _generate_include_set(srcdir, includes)
-    exclude_files, exclude_dirs = _generate_exclude_set(srcdir, excludes)
-
-    # And chop files, including whole trees if any dirs are mentioned
-    snap_files = include_files - exclude_files
-    for exclude_dir in exclude_dirs:
-        snap_files = set([x for x in snap_files if not x.startswith(exclude_dir + "/")])
-
-    # Separate dirs from files
-    snap_dirs = set(
-        [
-            x
-            for x in snap_files
-            if os.path.isdir(os.path.join(srcdir, x))
-            and not os.path.islink(os.path.join(srcdir, x))
-        ]
-    )
-    snap_files = snap_files - snap_dirs
+    snap_files, snap_dirs = FilesetMatcher(includes, excludes).match(srcdir)
 
     # Make sure we also obtain the parent directories of files
     for snap_file in snap_files:
@@ -1061,6 +1369,48 @@ def _migratable_filesets(fileset, srcdir):
     return snap_files, snap_dirs
 
 
+def _get_migration_snapshot(snap_files, srcdir):
+    snapshot = dict()
+    for snap_file in snap_files:
+        try:
+            file_stat = os.lstat(os.path.join(srcdir, snap_file))
+        except FileNotFoundError:
+            snapshot[snap_file] = None
+        else:
+            snapshot[snap_file] = [
+                file_stat.st_ino,
+                file_stat.st_mode,
+                file_stat.st_size,
+                file_stat.st_mtime_ns,
+            ]
+    return snapshot
+
+
+def _load_migration_snapshot(snapshot_file):
+    with contextlib.suppress(FileNotFoundError, ValueError):
+        with open(snapshot_file) as f:
+            return json.load(f)
+    return dict()
+
+
+def _get_plugin_digests(plugin) -> Dict[str, str]:
+    """Return the digests of the modules defining plugin and its bases."""
+    digests = dict()  # type: Dict[str, str]
+    for plugin_class in type(plugin).__mro__:
+        module = sys.modules.get(plugin_class.__module__)
+        module_file = getattr(module, "__file__", None)
+        if module_file and plugin_class.__module__ not in digests:
+            digests[plugin_class.__module__] = file_utils.calculate_hash(
+                module_file, algorithm="sha256"
+            )
+    return digests
+
+
+def _save_migration_snapshot(snapshot_file, snapshot):
+    with open(snapshot_file, "w") as f:
+        json.dump(snapshot, f)
+
+
 def _migrate_files(
     snap_files,
     snap_dirs,
@@ -1202,56 +1552,22 @@ def _get_file_list(stage_set):
     return includes, excludes
 
 
-def _generate_include_set(directory, includes):
-    include_files = set()
-    for include in includes:
-        if "*" in include:
-            pattern = os.path.join(directory, include)
-            matches = iglob(pattern, recursive=True)
-            include_files |= set(matches)
-        else:
-            include_files |= set([os.path.join(directory, include)])
-
-    include_dirs = [x for x in include_files if os.path.isdir(x)]
-    include_files = set([os.path.relpath(x, directory) for x in include_files])
-
-    # Expand includeFiles, so that an exclude like '*/*.so' will still match
-    # files from an include like 'lib'
-    for include_dir in include_dirs:
-        for root, dirs, files in os.walk(include_dir):
-            include_files |= set(
-                [os.path.relpath(os.path.join(root, d), directory) for d in dirs]
-            )
-            include_files |= set(
-                [os.path.relpath(os.path.join(root, f), directory) for f in files]
-            )
-
-    return include_files
-
-
-def _generate_exclude_set(directory, excludes):
-    exclude_files = set()
-
-    for exclude in excludes:
-        pattern = os.path.join(directory, exclude)
-        matches = iglob(pattern, recursive=True)
-        exclude_files |= set(matches)
-
-    exclude_dirs = [
-        os.path.relpath(x, directory) for x in exclude_files if os.path.isdir(x)
-    ]
-    exclude_files = set([os.path.relpath(x, directory) for x in exclude_files])
-
-    return exclude_files, exclude_dirs
-
-
 def _validate_relative_paths(files):
     for d in files:
         if os.path.isabs(d):
             raise errors.PluginError('path "{}" must be relative'.format(d))
 
 
-def _file_collides(file_this, file_other):
+def _file_collides(file_this, file_other, *, digests=None):
+    # Files with the same digest have the same contents, those with different
+    # digests only do not collide if they are .pc files with different
+    # prefixes. Without digests, the files are compared.
+    if digests is not None and None not in digests:
+        if digests[0] == digests[1]:
+            return False
+        if not file_this.endswith(".pc"):
+            return True
+
     if not file_this.endswith(".pc"):
         return not filecmp.cmp(file_this, file_other, shallow=False)
 
@@ -1273,23 +1589,60 @@ def _file_collides(file_this, file_other):
     return False
 
 
+def _get_build_cache() -> Optional[cache.BuildCache]:
+    if not distutils.util.strtobool(os.getenv("SNAPCRAFT_ENABLE_BUILD_CACHE", "n")):
+        return None
+    return cache.BuildCache(cache_dir=os.getenv("SNAPCRAFT_BUILD_CACHE_DIR"))
+
+
 def check_for_collisions(parts):
     """Raises a SnapcraftPartConflictError if conflicts are found."""
+    parts = list(parts)
+    digests = {
+        part.name: ContentDigests(part.plugin.installdir, part.get_digests_file())
+        for part in parts
+    }
+    try:
+        _check_for_collisions(parts, digests)
+    finally:
+        for part_digests in digests.values():
+            part_digests.save()
+
+
+def _check_for_collisions(parts, digests):
     parts_files = {}
+    # The names of the previous parts with each path, so only those sharing
+    # paths with a part are compared to it.
+    path_owners = collections.defaultdict(list)  # type: Dict[str, List[str]]
     for part in parts:
         # Gather our own files up
         part_files, part_directories = part.migratable_fileset_for(steps.STAGE)
         part_contents = part_files | part_directories
 
         # Scan previous parts for collisions
+        common_paths = collections.defaultdict(list)  # type: Dict[str, List[str]]
+        for f in part_contents:
+            for other_part_name in path_owners.get(f, []):
+                common_paths[other_part_name].append(f)
+
+        # Shared files are compared by the digests of their contents, each
+        # file is only read once (and not again until it changes).
+        part_digests = digests[part.name]
+        part_digests.update(set().union(*common_paths.values()))
+        for other_part_name, common in common_paths.items():
+            digests[other_part_name].update(common)
+
         for other_part_name in parts_files:
-            common = part_contents & parts_files[other_part_name]["files"]
+            common = common_paths.get(other_part_name, [])
+            other_digests = digests[other_part_name]
             conflict_files = []
             for f in common:
                 this = os.path.join(part.plugin.installdir, f)
                 other = os.path.join(parts_files[other_part_name]["installdir"], f)
 
-                if _paths_collide(this, other):
+                if _paths_collide(
+                    this, other, digests=(part_digests.get(f), other_digests.get(f))
+                ):
                     conflict_files.append(f)
 
             if conflict_files:
@@ -1304,9 +1657,13 @@ def check_for_collisions(parts):
             "files": part_contents,
             "installdir": part.plugin.installdir,
         }
+        for f in part_contents:
+            path_owners[f].append(part.name)
 
 
-def _paths_collide(path1: str, path2: str) -> bool:
+def _paths_collide(
+    path1: str, path2: str, *, digests: Tuple[Optional[str], Optional[str]] = None
+) -> bool:
     if not (os.path.lexists(path1) and os.path.lexists(path2)):
         return False
 
@@ -1329,7 +1686,9 @@ def _paths_collide(path1: str, path2: str) -> bool:
 
     # Paths collide if neither path is a directory, and the files have
     # different contents
-    elif not (path1_is_dir and path2_is_dir) and _file_collides(path1, path2):
+    elif not (path1_is_dir and path2_is_dir) and _file_collides(
+        path1, path2, digests=digests
+    ):
         return True
 
     # Otherwise, paths do not conflict
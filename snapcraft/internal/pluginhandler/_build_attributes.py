@@ -24,3 +24,9 @@ class BuildAttributes:
 
     def keep_execstack(self):
         return "keep-execstack" in self._attributes
+
+    def use_ldd(self):
+        return "use-ldd" in self._attributes
+
+    def incremental_sync(self):
+        return "incremental-sync" in self._attributes
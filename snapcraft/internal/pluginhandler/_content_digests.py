@@ -0,0 +1,145 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import hashlib
+import json
+import os
+import stat
+from typing import Dict, Iterable, List, Optional  # noqa: F401
+
+from snapcraft.internal import common
+
+
+class ContentDigests:
+    """The digests of the contents of the regular files in a directory.
+
+    Digests are computed on demand and cached in a file along with the status
+    of the file they were computed for, so they are only computed again once
+    the file changes.
+    """
+
+    def __init__(self, directory: str, cache_file: str) -> None:
+        """Create a new ContentDigests.
+
+        :param str directory: the directory the paths are relative to.
+        :param str cache_file: the file to cache the digests in.
+        """
+        self._directory = directory
+        self._cache_file = cache_file
+        self._digests = dict()  # type: Dict[str, List]
+        with contextlib.suppress(FileNotFoundError, ValueError):
+            with open(cache_file) as f:
+                self._digests = json.load(f)
+        self._changed = False
+
+    def get(self, path: str) -> Optional[str]:
+        """Return the digest of path, or None if it is not a regular file."""
+        self.update([path])
+        entry = self._digests.get(path)
+        return entry[-1] if entry else None
+
+    def update(self, paths: Iterable[str]) -> None:
+        """Compute the digests of those of paths that changed, concurrently."""
+        outdated = []
+        for path in paths:
+            key = self._get_key(path)
+            entry = self._digests.get(path)
+            if key is None:
+                if entry is not None:
+                    del self._digests[path]
+                    self._changed = True
+            elif entry is None or entry[:-1] != key:
+                outdated.append((path, key))
+        if not outdated:
+            return
+
+        digests = common.map_concurrently(
+            lambda item: _get_digest(os.path.join(self._directory, item[0]), item[1]),
+            outdated,
+        )
+        for (path, key), digest in zip(outdated, digests):
+            self._digests[path] = key + [digest]
+        self._changed = True
+
+    def get_tree_digest(self) -> str:
+        """Return a digest of the paths, types and contents of the directory."""
+        paths = []  # type: List[str]
+        for root, directories, files in os.walk(self._directory):
+            for name in directories + files:
+                paths.append(os.path.relpath(os.path.join(root, name), self._directory))
+        self.update(paths)
+        # The whole directory was walked, anything else is gone.
+        for path in self._digests.keys() - set(paths):
+            del self._digests[path]
+            self._changed = True
+
+        tree_digest = hashlib.sha256()
+        for path in sorted(paths):
+            entry = self._digests.get(path)
+            if entry is None:
+                continue
+            mode = entry[1]
+            if stat.S_ISLNK(mode):
+                contents = os.readlink(os.path.join(self._directory, path))
+            else:
+                contents = entry[-1] or ""
+            tree_digest.update(
+                "{}\0{:o}\0{}\0".format(path, mode, contents).encode(
+                    "utf-8", "surrogateescape"
+                )
+            )
+        return tree_digest.hexdigest()
+
+    def save(self) -> None:
+        """Write the digests computed since they were loaded to the cache."""
+        if not self._changed:
+            return
+        # There is nowhere to cache them for parts that were not set up.
+        with contextlib.suppress(FileNotFoundError):
+            # Parts built concurrently can share a cache, so it is replaced
+            # rather than written to.
+            temp_file = "{}.{}".format(self._cache_file, os.getpid())
+            with open(temp_file, "w") as f:
+                json.dump(self._digests, f)
+            os.replace(temp_file, self._cache_file)
+            self._changed = False
+
+    def _get_key(self, path: str) -> Optional[List]:
+        try:
+            file_stat = os.lstat(os.path.join(self._directory, path))
+        except FileNotFoundError:
+            return None
+        return [
+            file_stat.st_ino,
+            file_stat.st_mode,
+            file_stat.st_size,
+            file_stat.st_mtime_ns,
+        ]
+
+
+def _get_digest(path: str, key: List) -> Optional[str]:
+    if not stat.S_ISREG(key[1]):
+        return None
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    except OSError:
+        # Left for the comparison of the files to deal with.
+        return None
+    return digest.hexdigest()
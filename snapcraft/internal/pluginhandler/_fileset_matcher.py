@@ -0,0 +1,284 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import fnmatch
+import os
+import re
+from typing import Dict, FrozenSet, List, Sequence, Set, Tuple  # noqa: F401
+
+_MAGIC_CHECK = re.compile("[*?[]")
+
+# The kinds of pattern components.
+_LITERAL = 0
+_MAGIC = 1
+_RECURSIVE = 2
+
+# How the last component of a path was matched.
+_BY_COMPONENT = 0
+_BY_RECURSIVE = 1
+# The path was not consumed by a trailing "**", which glob only yields for
+# directories (or when everything before it is literal).
+_BEFORE_RECURSIVE = 2
+
+# A state is the index of a pattern, of its next component to match and how
+# the last component of the path was matched.
+_State = Tuple[int, int, int]
+
+
+class _Component:
+    def __init__(self, component: str, *, literal: bool) -> None:
+        self.value = component
+        if literal or not _MAGIC_CHECK.search(component):
+            self.kind = _LITERAL
+        elif component == "**":
+            self.kind = _RECURSIVE
+        else:
+            self.kind = _MAGIC
+            self.regex = re.compile(fnmatch.translate(component))
+            # Like glob, wildcards only match hidden names if asked to.
+            self.matches_hidden = component.startswith(".")
+
+    def matches(self, name: str) -> bool:
+        if self.kind == _LITERAL:
+            return name == self.value
+        if name.startswith(".") and (
+            self.kind == _RECURSIVE or not self.matches_hidden
+        ):
+            return False
+        return self.kind == _RECURSIVE or self.regex.match(name) is not None
+
+
+class _Pattern:
+    def __init__(self, pattern: str, *, literal: bool) -> None:
+        parts = pattern.split("/")
+        # A trailing slash or "." only matches directories.
+        self.dir_only = parts[-1] in ("", ".") and pattern != ""
+        self.components = [
+            _Component(c, literal=literal) for c in parts if c not in ("", ".")
+        ]
+        # glob yields the path before a trailing "**" without looking it up
+        # when it is literal, e.g.; "usr/share/**" matches "usr/share".
+        self.literal_prefix = None  # type: str
+        if (
+            not self.dir_only
+            and self.components
+            and self.components[-1].kind == _RECURSIVE
+            and all(c.kind == _LITERAL for c in self.components[:-1])
+        ):
+            self.literal_prefix = os.path.normpath(
+                "/".join(c.value for c in self.components[:-1]) or "."
+            )
+
+
+class _Patterns:
+    """A set of patterns matched one path component at a time."""
+
+    def __init__(self, patterns: List[_Pattern]) -> None:
+        self._patterns = patterns
+        # Traversals go through the same few sets of states over and over.
+        self._closures = dict()  # type: Dict[FrozenSet[_State], FrozenSet[_State]]
+        self.initial_states = self._close(
+            {(i, 0, _BY_COMPONENT) for i in range(len(self._patterns))}
+        )
+        self.literal_prefixes = {
+            p.literal_prefix for p in patterns if p.literal_prefix is not None
+        }
+
+    def _close(self, states: Set[_State]) -> FrozenSet[_State]:
+        # "**" also matches no directories at all.
+        pending = list(states)
+        while pending:
+            index, position, matched_by = pending.pop()
+            components = self._patterns[index].components
+            if position < len(components) and components[position].kind == _RECURSIVE:
+                if position + 1 < len(components):
+                    state = (index, position + 1, _BY_COMPONENT)
+                elif matched_by == _BY_RECURSIVE:
+                    state = (index, position + 1, _BY_RECURSIVE)
+                else:
+                    state = (index, position + 1, _BEFORE_RECURSIVE)
+                if state not in states:
+                    states.add(state)
+                    pending.append(state)
+        return frozenset(states)
+
+    def advance(self, states: FrozenSet[_State], name: str) -> FrozenSet[_State]:
+        """Return the states after matching name against states."""
+        if not states:
+            return states
+        next_states = set()  # type: Set[_State]
+        for index, position, _ in states:
+            components = self._patterns[index].components
+            if position == len(components):
+                continue
+            component = components[position]
+            if component.matches(name):
+                if component.kind == _RECURSIVE:
+                    next_states.add((index, position, _BY_RECURSIVE))
+                else:
+                    next_states.add((index, position + 1, _BY_COMPONENT))
+        key = frozenset(next_states)
+        if key not in self._closures:
+            self._closures[key] = self._close(next_states)
+        return self._closures[key]
+
+    def is_match(self, states: FrozenSet[_State], is_dir: bool) -> bool:
+        """Return True if a path in states matches one of the patterns."""
+        for index, position, matched_by in states:
+            pattern = self._patterns[index]
+            if position < len(pattern.components):
+                continue
+            if is_dir:
+                return True
+            if matched_by == _BEFORE_RECURSIVE:
+                if pattern.literal_prefix is not None:
+                    return True
+            elif not pattern.dir_only:
+                return True
+        return False
+
+    def is_alive(self, states: FrozenSet[_State]) -> bool:
+        """Return True if paths below one in states could still match."""
+        return any(
+            position < len(self._patterns[index].components)
+            for index, position, _ in states
+        )
+
+
+class FilesetMatcher:
+    """Match the include and exclude entries of a fileset against a tree.
+
+    The patterns are compiled once and evaluated in a single traversal of the
+    tree, which only descends into the directories that can contain matches.
+    The results are those of the previous implementation, which globbed every
+    pattern (so wildcards do not match hidden names and "**" matches any
+    number of directories) and then walked the included directories.
+    """
+
+    def __init__(self, includes: Sequence[str], excludes: Sequence[str]) -> None:
+        """Initialize a FilesetMatcher.
+
+        :param includes: the entries to include, those without a "*" are
+                         taken as paths rather than patterns.
+        :param excludes: the patterns to exclude.
+        """
+        # Paths are normalized, as os.path.relpath would.
+        self._literal_includes = [os.path.normpath(i) for i in includes if "*" not in i]
+        self._includes = _Patterns(
+            [_Pattern(i, literal=False) for i in includes if "*" in i]
+            + [_Pattern(i, literal=True) for i in self._literal_includes]
+        )
+        self._excludes = _Patterns([_Pattern(e, literal=False) for e in excludes])
+
+    def match(self, directory: str) -> Tuple[Set[str], Set[str]]:
+        """Return the files and directories in directory matching the fileset.
+
+        Paths are relative to directory, included directories bring in
+        everything below them and excluded directories take everything below
+        them out. Directories are real directories, not links to them.
+        Included paths that are not patterns are returned even if they do not
+        exist.
+        """
+        snap_files = set()  # type: Set[str]
+        # The paths that were found, mapped to whether they are directories.
+        found = dict()  # type: Dict[str, bool]
+        exclude_dirs = set()  # type: Set[str]
+
+        root_include_states = self._includes.initial_states
+        root_exclude_states = self._excludes.initial_states
+        if self._includes.is_match(root_include_states, True):
+            if not self._excludes.is_match(root_exclude_states, True):
+                snap_files.add(".")
+            found["."] = True
+            expand = True
+        else:
+            expand = False
+
+        pending = [(directory, "", root_include_states, root_exclude_states, expand)]
+        while pending:
+            path, relpath, include_states, exclude_states, expand = pending.pop()
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+
+            for entry in entries:
+                entry_relpath = relpath + entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                is_link = entry.is_symlink()
+                found[entry_relpath] = is_dir and not is_link
+
+                entry_include_states = self._includes.advance(
+                    include_states, entry.name
+                )
+                entry_exclude_states = self._excludes.advance(
+                    exclude_states, entry.name
+                )
+                is_included = self._includes.is_match(entry_include_states, is_dir)
+                is_excluded = self._excludes.is_match(entry_exclude_states, is_dir)
+                if is_excluded:
+                    if is_dir:
+                        exclude_dirs.add(entry_relpath)
+                    # Nothing below an excluded directory can be included.
+                    continue
+                if expand or is_included:
+                    snap_files.add(entry_relpath)
+
+                if not is_dir:
+                    continue
+                # Included directories bring in everything below them, but
+                # links to directories within them are not followed.
+                entry_expand = is_included or (expand and not is_link)
+                if entry_expand or self._includes.is_alive(entry_include_states):
+                    pending.append(
+                        (
+                            entry.path,
+                            entry_relpath + "/",
+                            entry_include_states,
+                            entry_exclude_states,
+                            entry_expand,
+                        )
+                    )
+
+        # Literal paths are matched whether or not they exist.
+        literal_includes = self._literal_includes + sorted(
+            self._includes.literal_prefixes
+        )
+        for include in literal_includes:
+            if (
+                include in found
+                or include in self._excludes.literal_prefixes
+                or _is_excluded(include, exclude_dirs)
+            ):
+                continue
+            snap_files.add(include)
+            path = os.path.join(directory, include)
+            found[include] = os.path.isdir(path) and not os.path.islink(path)
+
+        snap_dirs = {f for f in snap_files if found[f]}
+        return snap_files - snap_dirs, snap_dirs
+
+
+def _is_excluded(relpath: str, exclude_dirs: Set[str]) -> bool:
+    parent = os.path.dirname(relpath)
+    while parent:
+        if parent in exclude_dirs:
+            return True
+        parent = os.path.dirname(parent)
+    return False
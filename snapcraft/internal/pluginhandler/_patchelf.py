@@ -14,15 +14,16 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
 import contextlib
 import logging
 import os
-from typing import FrozenSet, List
+from typing import FrozenSet, List, Optional, Tuple
 from typing import Dict  # noqa: F401
 
 import snapcraft.plugins
 from snapcraft import ProjectOptions
-from snapcraft.internal import elf
+from snapcraft.internal import common, elf
 from snapcraft.internal import errors
 
 
@@ -116,23 +117,51 @@ class PartPatcher:
             preferred_patchelf_path=preferred_patchelf_path,
         )
 
+        def _patch_elf_files(
+            elf_files: List[elf.ElfFile]
+        ) -> List[Optional[errors.PatcherError]]:
+            patch_errors = []  # type: List[Optional[errors.PatcherError]]
+            for elf_file in elf_files:
+                try:
+                    elf_patcher.patch(elf_file=elf_file)
+                except errors.PatcherError as patch_error:
+                    patch_errors.append(patch_error)
+                else:
+                    patch_errors.append(None)
+            return patch_errors
+
         # Patching all files instead of a subset of them to ensure the
         # environment is consistent and the chain of dlopens that may
-        # happen remains sane.
-        for elf_file in self._elf_files:
-            try:
-                elf_patcher.patch(elf_file=elf_file)
-            except errors.PatcherError as patch_error:
-                logger.warning(
-                    "An attempt to patch {!r} so that it would work "
-                    "correctly in diverse environments was made and failed. "
-                    "To disable this behavior set "
-                    "`build-attributes: [no-patchelf]` for the part.".format(
-                        elf_file.path
-                    )
-                )
-                if not self._is_go_based_plugin:
-                    raise patch_error
+        # happen remains sane. Files are patched concurrently, failures
+        # are reported in path order once all of them are done. Paths
+        # hard linked to the same file are patched one after the other, as
+        # patching rewrites the file in place.
+        elf_files = sorted(self._elf_files, key=lambda e: e.path)
+        inodes = collections.OrderedDict()  # type: Dict[Tuple[int, int], List]
+        for elf_file in elf_files:
+            file_stat = os.stat(elf_file.path)
+            inodes.setdefault((file_stat.st_dev, file_stat.st_ino), []).append(
+                elf_file
+            )
+        patch_errors = dict()  # type: Dict[str, Optional[errors.PatcherError]]
+        for inode_elf_files, inode_patch_errors in zip(
+            inodes.values(),
+            common.map_concurrently(_patch_elf_files, inodes.values()),
+        ):
+            for elf_file, patch_error in zip(inode_elf_files, inode_patch_errors):
+                patch_errors[elf_file.path] = patch_error
+        for elf_file in elf_files:
+            patch_error = patch_errors[elf_file.path]
+            if patch_error is None:
+                continue
+            logger.warning(
+                "An attempt to patch {!r} so that it would work "
+                "correctly in diverse environments was made and failed. "
+                "To disable this behavior set "
+                "`build-attributes: [no-patchelf]` for the part.".format(elf_file.path)
+            )
+            if not self._is_go_based_plugin:
+                raise patch_error
 
     def _verify_compat(self) -> None:
         linker_version = self._project._get_linker_version_for_base(self._core_base)
@@ -17,11 +17,12 @@
 import contextlib
 import json
 import os
+import selectors
 import subprocess
 import sys
 import tempfile
 import textwrap
-import time
+import threading
 from typing import Any, Callable, Dict  # noqa
 
 from snapcraft.internal import common, errors
@@ -122,27 +123,38 @@ class Runner:
 
                 process = subprocess.Popen(["/bin/sh"], stdin=script_file, cwd=workdir)
 
+            # Wake up as soon as a function is called or the scriptlet exits
+            # instead of polling for either.
+            exit_reader, exit_writer = os.pipe()
+            waiter = threading.Thread(
+                target=_wait_for_process, args=(process, exit_writer), daemon=True
+            )
+            waiter.start()
             status = None
             try:
-                while status is None:
-                    function_call = call_fifo.read()
-                    if function_call:
-                        # Handle the function and let caller know that function
-                        # call has been handled (must contain at least a
-                        # newline, anything beyond is considered an error by
-                        # snapcraftctl)
-                        feedback_fifo.write(
-                            "{}\n".format(
-                                self._handle_builtin_function(
-                                    scriptlet_name, function_call.strip()
+                with selectors.DefaultSelector() as selector:
+                    selector.register(call_fifo, selectors.EVENT_READ)
+                    selector.register(exit_reader, selectors.EVENT_READ)
+                    while status is None:
+                        events = selector.select()
+                        function_call = call_fifo.read()
+                        if function_call:
+                            # Handle the function and let caller know that
+                            # function call has been handled (must contain at
+                            # least a newline, anything beyond is considered an
+                            # error by snapcraftctl)
+                            feedback_fifo.write(
+                                "{}\n".format(
+                                    self._handle_builtin_function(
+                                        scriptlet_name, function_call.strip()
+                                    )
                                 )
                             )
-                        )
-                    status = process.poll()
-
-                    # Don't loop TOO busily
-                    time.sleep(0.1)
+                        if any(key.fileobj == exit_reader for key, _ in events):
+                            waiter.join()
+                            status = process.returncode
             finally:
+                os.close(exit_reader)
                 call_fifo.close()
                 feedback_fifo.close()
 
@@ -218,9 +230,23 @@ class _NonBlockingRWFifo:
     def write(self, data: str) -> int:
         return os.write(self._fd, data.encode(sys.getfilesystemencoding()))
 
+    def fileno(self) -> int:
+        return self._fd
+
     def close(self) -> None:
         if self._fd is not None:
             os.close(self._fd)
+            self._fd = None
+
+
+def _wait_for_process(process: subprocess.Popen, exit_writer: int) -> None:
+    try:
+        process.wait()
+        # The runner may have given up on the process already.
+        with contextlib.suppress(BrokenPipeError):
+            os.write(exit_writer, b"\0")
+    finally:
+        os.close(exit_writer)
 
 
 def _get_env():
@@ -14,14 +14,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import bisect
 from collections import ChainMap
 import logging
 from os import path
-from typing import List
+from typing import Dict, List  # noqa: F401
 from typing import Set  # noqa: F401
 
 import snapcraft
-from snapcraft.internal import elf, pluginhandler, repo
+from snapcraft.internal import cache, elf, pluginhandler, repo
 from ._env import (
     build_env,
     build_env_for_stage,
@@ -36,7 +37,12 @@ logger = logging.getLogger(__name__)
 
 class PartsConfig:
     def __init__(self, *, parts, project, validator, build_snaps, build_tools):
-        self._soname_cache = elf.SonameCache()
+        self._soname_cache = elf.SonameCache(
+            index_dir=path.join(cache.SnapcraftCache().cache_root, "soname-index")
+        )
+        self._elf_cache = elf.ElfCache(
+            cache_path=path.join(project.parts_dir, ".snapcraft_elf_cache")
+        )
         self._parts_data = parts.get("parts", {})
         self._snap_type = parts.get("type", "app")
         self._project = project
@@ -47,6 +53,7 @@ class PartsConfig:
         self.all_parts = []
         self._part_names = []
         self.after_requests = {}
+        self._parts_by_name = dict()  # type: Dict[str, pluginhandler.PluginHandler]
 
         self._process_parts()
 
@@ -75,6 +82,14 @@ class PartsConfig:
     def _compute_dependencies(self):
         """Gather the lists of dependencies and adds to all_parts."""
 
+        self._parts_by_name = {p.name: p for p in self.all_parts}
+        self._dependency_names = dict()  # type: Dict[str, Set[str]]
+        self._reverse_dependency_names = dict()  # type: Dict[str, Set[str]]
+
+        for part in self.all_parts:
+            self._dependency_names.setdefault(part.name, set())
+            self._reverse_dependency_names.setdefault(part.name, set())
+
         for part in self.all_parts:
             dep_names = self.after_requests.get(part.name, [])
             for dep_name in dep_names:
@@ -83,83 +98,59 @@ class PartsConfig:
                     raise errors.SnapcraftAfterPartMissingError(part.name, dep_name)
 
                 part.deps.append(dep)
+                self._dependency_names[part.name].add(dep_name)
+                self._reverse_dependency_names[dep_name].add(part.name)
 
     def _sort_parts(self):
-        """Performs an inneficient but easy to follow sorting of parts."""
-        sorted_parts = []
-
-        # We want to process parts in a consistent order between runs. The
-        # simplest way to do this is to sort them by name.
-        self.all_parts = sorted(
-            self.all_parts, key=lambda part: part.name, reverse=True
+        """Sort parts so that every part comes after its dependencies.
+
+        Parts are taken starting from the ones nothing depends upon, picking
+        the one with the highest name when several are available, and are
+        prepended to the result so the order is consistent between runs.
+        """
+        remaining_dependents = {
+            name: len(dependents)
+            for name, dependents in self._reverse_dependency_names.items()
+        }
+        # Kept sorted by name, the next part to take is the last one.
+        available = sorted(
+            name for name, count in remaining_dependents.items() if count == 0
         )
 
-        while self.all_parts:
-            top_part = None
-            for part in self.all_parts:
-                mentioned = False
-                for other in self.all_parts:
-                    if part in other.deps:
-                        mentioned = True
-                        break
-                if not mentioned:
-                    top_part = part
-                    break
-            if not top_part:
-                raise errors.SnapcraftLogicError(
-                    "circular dependency chain found in parts definition"
-                )
-            sorted_parts = [top_part] + sorted_parts
-            self.all_parts.remove(top_part)
+        sorted_part_names = []  # type: List[str]
+        while available:
+            part_name = available.pop()
+            sorted_part_names.append(part_name)
+            for dep_name in self._dependency_names[part_name]:
+                remaining_dependents[dep_name] -= 1
+                if remaining_dependents[dep_name] == 0:
+                    bisect.insort(available, dep_name)
+
+        if len(sorted_part_names) != len(self.all_parts):
+            raise errors.SnapcraftLogicError(
+                "circular dependency chain found in parts definition"
+            )
 
-        return sorted_parts
+        return [self._parts_by_name[name] for name in reversed(sorted_part_names)]
 
     def get_dependencies(self, part_name, *, recursive=False):
         # type: (str, bool) -> Set[pluginhandler.PluginHandler]
         """Returns a set of all the parts upon which part_name depends."""
 
-        dependency_names = set(self.after_requests.get(part_name, []))
-        dependencies = {p for p in self.all_parts if p.name in dependency_names}
-
-        if recursive:
-            # No need to worry about infinite recursion due to circular
-            # dependencies since the YAML validation won't allow it.
-            for dependency_name in dependency_names:
-                dependencies |= self.get_dependencies(
-                    dependency_name, recursive=recursive
-                )
-
-        return dependencies
+        dependency_names = _walk(self._dependency_names, part_name, recursive)
+        return {self._parts_by_name[name] for name in dependency_names}
 
     def get_reverse_dependencies(self, part_name, *, recursive=False):
         # type: (str, bool) -> Set[pluginhandler.PluginHandler]
         """Returns a set of all the parts that depend upon part_name."""
 
-        reverse_dependency_names = set()
-        for part, dependencies in self.after_requests.items():
-            if part_name in dependencies:
-                reverse_dependency_names.add(part)
-
-        reverse_dependencies = {
-            p for p in self.all_parts if p.name in reverse_dependency_names
-        }
-
-        if recursive:
-            # No need to worry about infinite recursion due to circular
-            # dependencies since the YAML validation won't allow it.
-            for reverse_dependency_name in reverse_dependency_names:
-                reverse_dependencies |= self.get_reverse_dependencies(
-                    reverse_dependency_name, recursive=recursive
-                )
-
-        return reverse_dependencies
+        reverse_dependency_names = _walk(
+            self._reverse_dependency_names, part_name, recursive
+        )
+        return {self._parts_by_name[name] for name in reverse_dependency_names}
 
     def get_part(self, part_name):
-        for part in self.all_parts:
-            if part.name == part_name:
-                return part
-
-        return None
+        return self._parts_by_name.get(part_name)
 
     def clean_part(self, part_name, staged_state, primed_state, step):
         part = self.get_part(part_name)
@@ -219,6 +210,7 @@ class PartsConfig:
             confinement=self._project.info.confinement,
             snap_type=self._snap_type,
             soname_cache=self._soname_cache,
+            elf_cache=self._elf_cache,
         )
 
         self.build_snaps |= grammar_processor.get_build_snaps()
@@ -233,6 +225,7 @@ class PartsConfig:
                 part.source_handler.command
             )
         self.all_parts.append(part)
+        self._parts_by_name[part_name] = part
 
         return part
 
@@ -282,3 +275,20 @@ class PartsConfig:
                 seen.add(e)
 
         return deduped_env
+
+
+def _walk(graph: Dict[str, Set[str]], name: str, recursive: bool) -> Set[str]:
+    """Return the names reachable from name in graph, itself excluded."""
+    if not recursive:
+        return set(graph.get(name, set()))
+
+    # No need to worry about infinite loops due to circular dependencies
+    # since the YAML validation won't allow it.
+    found = set()  # type: Set[str]
+    to_visit = list(graph.get(name, set()))
+    while to_visit:
+        current = to_visit.pop()
+        if current not in found:
+            found.add(current)
+            to_visit.extend(graph.get(current, set()))
+    return found
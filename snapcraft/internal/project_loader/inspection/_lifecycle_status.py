@@ -50,4 +50,5 @@ def lifecycle_status(config: _config.Config) -> List[Dict[str, str]]:
                 )
         summary.append(part_summary)
 
+    cache.save()
     return summary
@@ -15,7 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-from typing import Callable, Iterable, Set, Tuple, Union  # noqa: F401
+from typing import Iterable, Set  # noqa: F401
 
 from snapcraft import project
 from snapcraft.internal import pluginhandler, states, steps
@@ -57,38 +57,16 @@ def provides(
     is_dir = os.path.isdir(absolute_file_path)
     is_file = os.path.isfile(absolute_file_path)
 
+    # The path index answers without loading the state of every part.
+    parts = list(parts)
+    path_index = states.PathIndex(project.parts_dir)
+    path_index.refresh(step, [part.name for part in parts])
     providing_parts = set()  # type: Set[pluginhandler.PluginHandler]
-    for part, state in _part_states_for_step(step, parts):
-        if is_dir and relative_file_path in state.directories:
-            providing_parts.add(part)
-        elif is_file and relative_file_path in state.files:
-            providing_parts.add(part)
+    if is_dir or is_file:
+        owners = path_index.get_owners(step, relative_file_path, directory=is_dir)
+        providing_parts = {part for part in parts if part.name in owners}
 
     if not providing_parts:
         raise errors.UntrackedFileError(path)
 
     return providing_parts
-
-
-# Implemented as a generator since loading up the state could be heavy
-def _part_states_for_step(
-    step: steps.Step, parts: Iterable[pluginhandler.PluginHandler]
-) -> Iterable[
-    Tuple[pluginhandler.PluginHandler, Union[states.StageState, states.PrimeState]]
-]:
-    state_getter = (
-        None
-    )  # type: Callable[[pluginhandler.PluginHandler], Union[states.StageState, states.PrimeState]]
-
-    if step == steps.STAGE:
-        state_getter = pluginhandler.PluginHandler.get_stage_state
-    elif step == steps.PRIME:
-        state_getter = pluginhandler.PluginHandler.get_prime_state
-    else:
-        # This is programmer error
-        raise RuntimeError("Only the stage or prime step is supported!")
-
-    for part in parts:
-        state = state_getter(part)
-        if state:
-            yield (part, state)
@@ -25,21 +25,22 @@ import stat
 import string
 import subprocess
 import sys
+import tarfile
+import tempfile
 import urllib
 import urllib.request
-from typing import Dict, Set, List, Tuple  # noqa: F401
+from typing import Callable, Dict, Set, List, Optional, Tuple  # noqa: F401
 
 import apt
 from xml.etree import ElementTree
 
 import snapcraft
 from snapcraft import file_utils
-from snapcraft.internal import cache, repo, common, os_release
+from snapcraft.internal import cache, repo, common, mangling, os_release
 from snapcraft.internal.indicators import is_dumb_terminal
 from ._base import BaseRepo
 from . import errors
 
-
 logger = logging.getLogger(__name__)
 
 _DEFAULT_SOURCES = """deb http://${prefix}.ubuntu.com/${suffix}/ ${release} main restricted
@@ -55,6 +56,7 @@ deb http://${security}.ubuntu.com/${suffix} ${release}-security multiverse
 _GEOIP_SERVER = "http://geoip.ubuntu.com/lookup"
 _library_list = dict()  # type: Dict[str, Set[str]]
 _HASHSUM_MISMATCH_PATTERN = re.compile(r"(E:Failed to fetch.+Hash Sum mismatch)+")
+_PKG_CONFIG_PREFIX_PATTERN = re.compile(rb"^prefix=", re.MULTILINE)
 
 
 class _AptCache:
@@ -220,37 +222,48 @@ class _AptCache:
 
         return _get_local_sources_list()
 
-    def fetch_binary(self, *, package_candidate, destination: str) -> None:
+    def fetch_binaries(self, *, package_candidates, destination: str) -> List[str]:
         # This is a workaround for the overly verbose python-apt we use.
         # There is an unreleased patch which once released could replace
         # this code https://salsa.debian.org/apt-team/python-apt/commit/d122f9142df614dbb5f7644112280140dc155ecc  # noqa
         # What follows is almost a tit for tat implementation of upstream's
-        # fetch_binary logic.
-        base = os.path.basename(package_candidate._records.filename)
-        destfile = os.path.join(destination, base)
-        if apt.package._file_is_same(
-            destfile, package_candidate.size, package_candidate._records.md5_hash
-        ):
-            logging.debug("Ignoring already existing file: {}".format(destfile))
-            return os.path.abspath(destfile)
+        # fetch_binary logic, queueing all the candidates into a single
+        # acquire so they are downloaded concurrently, with one progress.
+        destfiles = []  # type: List[str]
         acq = apt.apt_pkg.Acquire(self.progress)
-        acqfile = apt.apt_pkg.AcquireFile(
-            acq,
-            package_candidate.uri,
-            package_candidate._records.md5_hash,
-            package_candidate.size,
-            base,
-            destfile=destfile,
-        )
+        acqfiles = []
+        for package_candidate in package_candidates:
+            base = os.path.basename(package_candidate._records.filename)
+            destfile = os.path.join(destination, base)
+            destfiles.append(os.path.abspath(destfile))
+            if apt.package._file_is_same(
+                destfile, package_candidate.size, package_candidate._records.md5_hash
+            ):
+                logging.debug("Ignoring already existing file: {}".format(destfile))
+                continue
+            acqfiles.append(
+                apt.apt_pkg.AcquireFile(
+                    acq,
+                    package_candidate.uri,
+                    package_candidate._records.md5_hash,
+                    package_candidate.size,
+                    base,
+                    destfile=destfile,
+                )
+            )
+        if not acqfiles:
+            return destfiles
+
         acq.run()
 
-        if acqfile.status != acqfile.STAT_DONE:
-            raise apt.package.FetchError(
-                "The item %r could not be fetched: %s"
-                % (acqfile.destfile, acqfile.error_text)
-            )
+        for acqfile in acqfiles:
+            if acqfile.status != acqfile.STAT_DONE:
+                raise apt.package.FetchError(
+                    "The item %r could not be fetched: %s"
+                    % (acqfile.destfile, acqfile.error_text)
+                )
 
-        return os.path.abspath(destfile)
+        return destfiles
 
 
 class Ubuntu(BaseRepo):
@@ -432,6 +445,7 @@ class Ubuntu(BaseRepo):
         self._cache = cache.AptStagePackageCache(
             sources_digest=self._apt.sources_digest()
         )
+        self._tree_cache = cache.AptStagePackageTreeCache()
 
     def is_valid(self, package_name):
         with self._apt.archive(self._cache.base_dir) as apt_cache:
@@ -493,20 +507,19 @@ class Ubuntu(BaseRepo):
         # 2. Download packages in a different manner.
         #
         # In the end, (2) was chosen for minimal overhead and a simpler cache
-        # implementation. So we're using fetch_binary() here instead.
-        # Downloading each package individually has the drawback of witholding
-        # any clue of how long the whole pulling process will take, but that's
-        # something we'll have to live with.
-        pkg_list = []
-        for package in apt_cache.get_changes():
-            pkg_list.append(str(package.candidate))
-            try:
-                source = self._apt.fetch_binary(
-                    package_candidate=package.candidate,
-                    destination=self._cache.packages_dir,
-                )
-            except apt.package.FetchError as e:
-                raise errors.PackageFetchError(str(e))
+        # implementation. So we're using fetch_binaries() here instead.
+        # All the packages are fetched at once, so that they are downloaded
+        # concurrently and the progress covers the whole pulling process.
+        package_candidates = [package.candidate for package in apt_cache.get_changes()]
+        pkg_list = [str(package_candidate) for package_candidate in package_candidates]
+        try:
+            sources = self._apt.fetch_binaries(
+                package_candidates=package_candidates,
+                destination=self._cache.packages_dir,
+            )
+        except apt.package.FetchError as e:
+            raise errors.PackageFetchError(str(e))
+        for source in sources:
             destination = os.path.join(self._downloaddir, os.path.basename(source))
             with contextlib.suppress(FileNotFoundError):
                 os.remove(destination)
@@ -515,14 +528,54 @@ class Ubuntu(BaseRepo):
         return pkg_list
 
     def unpack(self, unpackdir) -> None:
-        pkgs_abs_path = glob.glob(os.path.join(self._downloaddir, "*.deb"))
-        for pkg in pkgs_abs_path:
-            # TODO needs elegance and error control
-            try:
-                subprocess.check_call(["dpkg-deb", "--extract", pkg, unpackdir])
-            except subprocess.CalledProcessError:
-                raise errors.UnpackError(pkg)
-        self.normalize(unpackdir)
+        pkgs_abs_path = sorted(glob.glob(os.path.join(self._downloaddir, "*.deb")))
+        # The packages are extracted to trees of their own concurrently and
+        # their members are normalized on the way. The trees are then merged
+        # one after the other, so that paths shipped by several packages are
+        # left as the last of them in order ships them.
+        os.makedirs(unpackdir, exist_ok=True)
+        with tempfile.TemporaryDirectory(
+            prefix=".", dir=os.path.dirname(os.path.abspath(unpackdir))
+        ) as temp_dir:
+            trees = common.map_concurrently(
+                lambda item: self._get_unpacked_tree(
+                    item[1], os.path.join(temp_dir, str(item[0]))
+                ),
+                enumerate(pkgs_abs_path),
+            )
+            absolute_symlinks = []  # type: List[str]
+            for tree in trees:
+                # Trees extracted for this unpack only can be linked from,
+                # cached ones are cloned where the filesystem allows it, as
+                # hard links would let changes made to the part reach them.
+                if tree.startswith(temp_dir):
+                    copy_function = file_utils.link_or_copy
+                else:
+                    copy_function = file_utils.copy
+                absolute_symlinks.extend(
+                    _copy_unpacked_tree(tree, unpackdir, copy_function=copy_function)
+                )
+        self._tree_cache.prune()
+        self._remove_useless_files(unpackdir)
+        # Symlinks are fixed last, as their targets may come from any package.
+        for path in absolute_symlinks:
+            if os.path.islink(path) and os.path.isabs(os.readlink(path)):
+                self._fix_symlink(path, unpackdir, os.path.dirname(path))
+        self._fix_xml_tools(unpackdir)
+
+    def _get_unpacked_tree(self, pkg: str, temp_tree: str) -> str:
+        # Trees are cached without the fixes depending on where they are
+        # unpacked to, which are made as they are merged.
+        key = _get_tree_cache_key(pkg)
+        tree = self._tree_cache.get(key=key)
+        if tree is None:
+            tree = self._tree_cache.cache(
+                key=key, unpack=lambda path: _extract_deb(pkg, path)
+            )
+        if tree is None:
+            _extract_deb(pkg, temp_tree)
+            tree = temp_tree
+        return tree
 
     def _manifest_dep_names(self, apt_cache):
         manifest_dep_names = set()
@@ -584,6 +637,191 @@ def _format_sources_list(sources_list, *, deb_arch, use_geoip=False, release="xe
     )
 
 
+def _get_tree_cache_key(pkg: str) -> str:
+    # Packages are identified by their contents, as builds of the same name,
+    # version and architecture may differ across archives. Trees also depend
+    # on how they are normalized, which may change with snapcraft.
+    data = "{}\0{}".format(
+        snapcraft.__version__, file_utils.calculate_hash(pkg, algorithm="sha256")
+    )
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _extract_deb(pkg: str, tree: str) -> None:
+    """Extract the contents of pkg into tree, normalizing them.
+
+    Modes are stripped of suid and sgid bits and python shebangs rewritten
+    as members are extracted.
+    """
+    with subprocess.Popen(
+        ["dpkg-deb", "--fsys-tarfile", pkg], stdout=subprocess.PIPE
+    ) as proc:
+        try:
+            with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+                for member in tar:
+                    _extract_deb_member(tar, member, tree)
+            # Read up to the end, for dpkg-deb not to fail writing the padding.
+            proc.stdout.read()
+        except (tarfile.TarError, OSError) as e:
+            logger.debug("Failed to extract {!r}: {}".format(pkg, e))
+            proc.kill()
+            raise errors.UnpackError(pkg)
+    if proc.returncode != 0:
+        raise errors.UnpackError(pkg)
+
+
+def _extract_deb_member(
+    tar: tarfile.TarFile, member: tarfile.TarInfo, tree: str
+) -> None:
+    name = os.path.normpath(member.name)
+    if os.path.isabs(name) or name.split(os.sep)[0] == os.pardir:
+        raise tarfile.ExtractError("Member {!r} is outside of the package".format(name))
+    path = os.path.join(tree, name)
+    if name == os.curdir:
+        os.makedirs(path, exist_ok=True)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    mode = member.mode & 0o7777
+    if mode & 0o4000 or mode & 0o2000:
+        logger.warning("Removing suid/guid from {}".format(path))
+        mode &= 0o1777
+
+    if member.isdir():
+        os.makedirs(path, exist_ok=True)
+        os.chmod(path, mode)
+    elif member.issym():
+        _replace_path(path, lambda temp_path: os.symlink(member.linkname, temp_path))
+    elif member.islnk():
+        target = os.path.join(tree, os.path.normpath(member.linkname))
+        _replace_path(path, lambda temp_path: os.link(target, temp_path))
+    elif member.isfile():
+        _replace_path(
+            path,
+            lambda temp_path: _extract_deb_file(
+                tar.extractfile(member), temp_path, mode=mode
+            ),
+        )
+        os.utime(path, (member.mtime, member.mtime))
+    else:
+        logger.debug("Skipping special file {!r}".format(path))
+
+
+def _extract_deb_file(fileobj, path: str, *, mode: int) -> None:
+    with open(path, "wb") as f:
+        head = fileobj.read(2)
+        if head == b"#!":
+            contents = head + fileobj.read()
+            with contextlib.suppress(UnicodeDecodeError):
+                contents = mangling.rewrite_python_shebang(contents.decode()).encode()
+            f.write(contents)
+        else:
+            f.write(head)
+            shutil.copyfileobj(fileobj, f)
+    os.chmod(path, mode)
+
+
+def _prefix_pkg_config(contents: bytes, root: str) -> bytes:
+    """Return the contents of a pkg-config file with its prefix under root.
+
+    This does the same as fix_pkg_config, without rewriting the file in
+    place with fileinput.
+    """
+    prefix = "prefix={}".format(root).encode()
+    return _PKG_CONFIG_PREFIX_PATTERN.sub(lambda match: prefix, contents)
+
+
+def _copy_unpacked_tree(
+    tree: str, unpackdir: str, *, copy_function: Callable[[str, str], None]
+) -> List[str]:
+    """Merge a tree extracted by _extract_deb into unpackdir.
+
+    Paths already in unpackdir are replaced by those in tree, except for
+    directories, which are merged and may be symlinks to directories.
+    pkg-config files are prefixed with unpackdir as they are copied, other
+    files are copied with copy_function.
+
+    :returns: the paths of the absolute symlinks copied, left for the caller
+              to fix once all the packages are unpacked.
+    """
+    absolute_symlinks = []  # type: List[str]
+    for root, directories, files in os.walk(tree):
+        destination_root = os.path.normpath(
+            os.path.join(unpackdir, os.path.relpath(root, tree))
+        )
+        # Directories may be symlinks to directories shipped by other
+        # packages, absolute ones are only fixed once all are merged.
+        if os.path.lexists(destination_root) and not _is_directory_within(
+            destination_root, unpackdir
+        ):
+            os.remove(destination_root)
+        os.makedirs(destination_root, exist_ok=True)
+        if not os.path.islink(destination_root):
+            shutil.copymode(root, destination_root)
+        for name in directories + files:
+            source = os.path.join(root, name)
+            destination = os.path.join(destination_root, name)
+            if not os.path.islink(source) and os.path.isdir(source):
+                continue
+            if os.path.isdir(destination) and not os.path.islink(destination):
+                shutil.rmtree(destination)
+            if os.path.islink(source):
+                target = os.readlink(source)
+                _replace_path(
+                    destination, lambda temp_path: os.symlink(target, temp_path)
+                )
+                if os.path.isabs(target):
+                    absolute_symlinks.append(destination)
+            else:
+                _replace_path(
+                    destination,
+                    lambda temp_path: _copy_unpacked_file(
+                        source,
+                        temp_path,
+                        pkg_config_root=unpackdir if name.endswith(".pc") else None,
+                        copy_function=copy_function,
+                    ),
+                )
+    return absolute_symlinks
+
+
+def _is_directory_within(path: str, root: str) -> bool:
+    real_path = os.path.realpath(path)
+    real_root = os.path.realpath(root)
+    return (
+        os.path.isdir(real_path)
+        and os.path.commonpath([real_path, real_root]) == real_root
+    )
+
+
+def _copy_unpacked_file(
+    source: str,
+    destination: str,
+    *,
+    pkg_config_root: Optional[str],
+    copy_function: Callable[[str, str], None]
+) -> None:
+    if pkg_config_root is not None:
+        with open(source, "rb") as f:
+            contents = _prefix_pkg_config(f.read(), pkg_config_root)
+        with open(destination, "wb") as f:
+            f.write(contents)
+        shutil.copystat(source, destination)
+    else:
+        copy_function(source, destination)
+
+
+def _replace_path(path: str, create: Callable[[str], None]) -> None:
+    # Paths are created aside and moved in place, replacing what is there.
+    temp_path = os.path.join(
+        os.path.dirname(path), ".{}.snapcraft".format(os.path.basename(path))
+    )
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(temp_path)
+    create(temp_path)
+    os.replace(temp_path, path)
+
+
 def _fix_filemode(path):
     mode = stat.S_IMODE(os.stat(path, follow_symlinks=False).st_mode)
     if mode & 0o4000 or mode & 0o2000:
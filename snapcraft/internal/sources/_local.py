@@ -18,6 +18,7 @@ import copy
 import functools
 import glob
 import os
+import stat
 
 from snapcraft import file_utils
 from snapcraft.internal import common
@@ -49,7 +50,9 @@ class Local(Base):
         self._updated_files = set()
         self._updated_directories = set()
 
-        for (root, directories, files) in os.walk(self.source_abspath, topdown=True):
+        # Entries are checked relative to the descriptor of their directory,
+        # which saves resolving their whole path for each of them.
+        for (root, directories, files, root_fd) in os.fwalk(self.source_abspath):
             ignored = set(self._ignore(root, directories + files, check=True))
             if ignored:
                 # Prune our search appropriately given an ignore list, i.e.
@@ -57,21 +60,22 @@ class Local(Base):
                 directories[:] = [d for d in directories if d not in ignored]
 
             for file_name in set(files) - ignored:
-                path = os.path.join(root, file_name)
-                if os.lstat(path).st_mtime >= target_mtime:
+                if _lstat(file_name, root_fd).st_mtime >= target_mtime:
+                    path = os.path.join(root, file_name)
                     self._updated_files.add(os.path.relpath(path, self.source))
 
-            for directory in directories:
-                path = os.path.join(root, directory)
-                if os.lstat(path).st_mtime >= target_mtime:
+            for directory in list(directories):
+                directory_stat = _lstat(directory, root_fd)
+                if directory_stat.st_mtime >= target_mtime:
                     # Don't decend into this directory-- we'll just copy it
                     # entirely.
                     directories.remove(directory)
 
-                    # os.walk will include symlinks to directories here, but we
-                    # want to treat those as files
+                    # os.fwalk will include symlinks to directories here, but
+                    # we want to treat those as files
+                    path = os.path.join(root, directory)
                     relpath = os.path.relpath(path, self.source)
-                    if os.path.islink(path):
+                    if stat.S_ISLNK(directory_stat.st_mode):
                         self._updated_files.add(relpath)
                     else:
                         self._updated_directories.add(relpath)
@@ -96,6 +100,10 @@ class Local(Base):
             )
 
 
+def _lstat(name, dir_fd):
+    return os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+
+
 def _ignore(source, current_directory, directory, files, check=False):
     if directory == source or directory == current_directory:
         ignored = copy.copy(common.SNAPCRAFT_FILES)
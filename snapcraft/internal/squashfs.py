@@ -0,0 +1,361 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import functools
+import logging
+import lzma
+import mmap
+import os
+import struct
+import subprocess
+import tempfile
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple  # noqa
+
+from snapcraft import file_utils
+from snapcraft.internal import errors
+
+logger = logging.getLogger(__name__)
+
+_SUPERBLOCK = struct.Struct("<4sIIIIHHHHHHQQQQQQQQ")
+_Superblock = collections.namedtuple(
+    "_Superblock",
+    [
+        "magic",
+        "inode_count",
+        "modification_time",
+        "block_size",
+        "fragment_count",
+        "compression",
+        "block_log",
+        "flags",
+        "id_count",
+        "major_version",
+        "minor_version",
+        "root_inode",
+        "bytes_used",
+        "id_table",
+        "xattr_id_table",
+        "inode_table",
+        "directory_table",
+        "fragment_table",
+        "export_table",
+    ],
+)
+_SQUASHFS_MAGIC = b"hsqs"
+_SQUASHFS_MAJOR_VERSION = 4
+
+_INODE_HEADER = struct.Struct("<HHHHII")
+_BASIC_DIRECTORY = struct.Struct("<IIHHI")
+_EXTENDED_DIRECTORY = struct.Struct("<IIIIHHI")
+_BASIC_FILE = struct.Struct("<IIII")
+_EXTENDED_FILE = struct.Struct("<QQQIIII")
+_DIRECTORY_HEADER = struct.Struct("<III")
+_DIRECTORY_ENTRY = struct.Struct("<HhHH")
+_FRAGMENT_ENTRY = struct.Struct("<QII")
+
+_BASIC_DIRECTORY_TYPE = 1
+_BASIC_FILE_TYPE = 2
+_EXTENDED_DIRECTORY_TYPE = 8
+_EXTENDED_FILE_TYPE = 9
+
+_METADATA_UNCOMPRESSED = 0x8000
+_DATA_UNCOMPRESSED = 0x1000000
+_DATA_SIZE_MASK = 0xFFFFFF
+_FRAGMENTS_PER_BLOCK = 512
+_NO_FRAGMENT = 0xFFFFFFFF
+
+# The compressions that can be read without depending on anything but the
+# standard library, by their id in the superblock.
+_DECOMPRESSORS = {
+    1: zlib.decompress,
+    2: functools.partial(lzma.decompress, format=lzma.FORMAT_ALONE),
+    4: functools.partial(lzma.decompress, format=lzma.FORMAT_XZ),
+}  # type: Dict[int, Callable[[bytes], bytes]]
+_COMPRESSION_NAMES = {3: "lzo", 5: "lz4", 6: "zstd"}
+
+_SQUASHFS_ERRORS = (struct.error, ValueError, zlib.error, lzma.LZMAError)
+
+
+class SquashfsFile:
+    """A squashfs filesystem, read in place from the file holding it.
+
+    Only what is needed to read files by path is supported, without having
+    to unpack the filesystem.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open a squashfs filesystem.
+
+        :param str path: path to the file holding the filesystem.
+        :raises errors.InvalidSquashfsError: if it does not hold one.
+        :raises errors.SquashfsCompressionNotSupportedError: if it is
+            compressed in a way that cannot be read.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _SUPERBLOCK.size:
+                raise errors.InvalidSquashfsError(path=path)
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._metadata_blocks = dict()  # type: Dict[int, Tuple[bytes, int]]
+
+        superblock = _Superblock._make(_SUPERBLOCK.unpack_from(self._data))
+        if (
+            superblock.magic != _SQUASHFS_MAGIC
+            or superblock.major_version != _SQUASHFS_MAJOR_VERSION
+        ):
+            self.close()
+            raise errors.InvalidSquashfsError(path=path)
+        if superblock.compression not in _DECOMPRESSORS:
+            self.close()
+            raise errors.SquashfsCompressionNotSupportedError(
+                path=path,
+                compression=_COMPRESSION_NAMES.get(
+                    superblock.compression, str(superblock.compression)
+                ),
+            )
+        self._decompress = _DECOMPRESSORS[superblock.compression]
+        self._superblock = superblock
+
+    def __enter__(self) -> "SquashfsFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._data.close()
+
+    def read(self, path: str) -> Optional[bytes]:
+        """Read a regular file.
+
+        :param str path: path to the file in the filesystem, symbolic links
+                         along which are not followed.
+        :returns: the contents of the file, or None if there is no regular
+                  file at path.
+        :raises errors.InvalidSquashfsError: if the filesystem is corrupt.
+        """
+        try:
+            inode_type, inode = self._lookup(path)
+            if inode_type not in (_BASIC_FILE_TYPE, _EXTENDED_FILE_TYPE):
+                return None
+            return self._read_file(inode_type, inode)
+        except _SQUASHFS_ERRORS as e:
+            raise errors.InvalidSquashfsError(path=self.path) from e
+
+    def _lookup(self, path: str) -> Tuple[Optional[int], "_MetadataReader"]:
+        inode_type, inode = self._read_inode(self._superblock.root_inode)
+        for name in path.split("/"):
+            if not name:
+                continue
+            if inode_type not in (_BASIC_DIRECTORY_TYPE, _EXTENDED_DIRECTORY_TYPE):
+                return None, inode
+            reference = self._find_entry(inode_type, inode, name.encode())
+            if reference is None:
+                return None, inode
+            inode_type, inode = self._read_inode(reference)
+        return inode_type, inode
+
+    def _read_inode(self, reference: int) -> Tuple[int, "_MetadataReader"]:
+        # References hold the location of the metadata block the inode
+        # starts in, relative to the table, and the offset into it.
+        inode = _MetadataReader(
+            self, self._superblock.inode_table + (reference >> 16), reference & 0xFFFF
+        )
+        inode_type = inode.unpack(_INODE_HEADER)[0]
+        return inode_type, inode
+
+    def _find_entry(
+        self, inode_type: int, inode: "_MetadataReader", name: bytes
+    ) -> Optional[int]:
+        if inode_type == _BASIC_DIRECTORY_TYPE:
+            block, _, size, offset, _ = inode.unpack(_BASIC_DIRECTORY)
+        else:
+            _, size, block, _, _, offset, _ = inode.unpack(_EXTENDED_DIRECTORY)
+        # The size accounts for the "." and ".." entries, which are implied.
+        listing = _MetadataReader(
+            self, self._superblock.directory_table + block, offset
+        )
+        remaining = size - 3
+        while remaining > 0:
+            count, start, _ = listing.unpack(_DIRECTORY_HEADER)
+            remaining -= _DIRECTORY_HEADER.size
+            for _ in range(count + 1):
+                offset, _, _, name_size = listing.unpack(_DIRECTORY_ENTRY)
+                entry_name = listing.read(name_size + 1)
+                remaining -= _DIRECTORY_ENTRY.size + name_size + 1
+                if entry_name == name:
+                    return (start << 16) | offset
+        return None
+
+    def _read_file(self, inode_type: int, inode: "_MetadataReader") -> bytes:
+        if inode_type == _BASIC_FILE_TYPE:
+            location, fragment, fragment_offset, size = inode.unpack(_BASIC_FILE)
+        else:
+            location, size, _, _, fragment, fragment_offset, _ = inode.unpack(
+                _EXTENDED_FILE
+            )
+        # The tail of the file is kept in a fragment, if not in a block.
+        block_count = size // self._superblock.block_size
+        if fragment == _NO_FRAGMENT and size % self._superblock.block_size:
+            block_count += 1
+        block_sizes = struct.unpack(
+            "<{}I".format(block_count), inode.read(4 * block_count)
+        )
+
+        blocks = []  # type: List[bytes]
+        remaining = size
+        for block_size in block_sizes:
+            if block_size & _DATA_SIZE_MASK:
+                block = self._read_block(location, block_size)
+                location += block_size & _DATA_SIZE_MASK
+            else:
+                # Blocks of zeros are not stored.
+                block = bytes(min(remaining, self._superblock.block_size))
+            blocks.append(block)
+            remaining -= len(block)
+        if fragment != _NO_FRAGMENT:
+            block = self._read_fragment(fragment)
+            blocks.append(block[fragment_offset : fragment_offset + remaining])
+            remaining -= len(blocks[-1])
+
+        if remaining != 0:
+            raise ValueError("{!r} is truncated".format(self.path))
+        return b"".join(blocks)
+
+    def _read_fragment(self, fragment: int) -> bytes:
+        # The fragment table is indexed by the locations of the metadata
+        # blocks holding the entries.
+        index_location = self._superblock.fragment_table + 8 * (
+            fragment // _FRAGMENTS_PER_BLOCK
+        )
+        (block_location,) = struct.unpack_from("<Q", self._data, index_location)
+        entry = _MetadataReader(
+            self,
+            block_location,
+            _FRAGMENT_ENTRY.size * (fragment % _FRAGMENTS_PER_BLOCK),
+        )
+        location, block_size, _ = entry.unpack(_FRAGMENT_ENTRY)
+        return self._read_block(location, block_size)
+
+    def _read_block(self, location: int, block_size: int) -> bytes:
+        block = self._data[location : location + (block_size & _DATA_SIZE_MASK)]
+        if block_size & _DATA_UNCOMPRESSED:
+            return block
+        return self._decompress(block)
+
+    def _read_metadata_block(self, location: int) -> Tuple[bytes, int]:
+        """Return a metadata block and the location of the next one."""
+        with_next = self._metadata_blocks.get(location)
+        if with_next is None:
+            (header,) = struct.unpack_from("<H", self._data, location)
+            size = header & ~_METADATA_UNCOMPRESSED
+            block = self._data[location + 2 : location + 2 + size]
+            if not header & _METADATA_UNCOMPRESSED:
+                block = self._decompress(block)
+            with_next = (block, location + 2 + size)
+            self._metadata_blocks[location] = with_next
+        return with_next
+
+
+class _MetadataReader:
+    """Read metadata sequentially, across the blocks it is split in."""
+
+    def __init__(self, squashfs: SquashfsFile, location: int, offset: int) -> None:
+        self._squashfs = squashfs
+        self._block, self._next_location = squashfs._read_metadata_block(location)
+        self._offset = offset
+
+    def read(self, size: int) -> bytes:
+        chunks = []  # type: List[bytes]
+        while size > 0:
+            if self._offset >= len(self._block):
+                self._block, self._next_location = self._squashfs._read_metadata_block(
+                    self._next_location
+                )
+                self._offset = 0
+                if not self._block:
+                    raise ValueError("Unexpected end of metadata")
+            chunk = self._block[self._offset : self._offset + size]
+            chunks.append(chunk)
+            self._offset += len(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def unpack(self, struct_format: struct.Struct) -> Tuple:
+        return struct_format.unpack(self.read(struct_format.size))
+
+
+def read_snap_file(snap_path: str, path: str) -> Optional[bytes]:
+    """Read a regular file from a snap.
+
+    Files are read in place when possible, or extracted with unsquashfs
+    otherwise. What is read is kept for as long as the snap is unchanged.
+
+    :param str snap_path: path to the snap.
+    :param str path: path to the file in the snap.
+    :returns: the contents of the file, or None if there is no regular file
+              at path.
+    :raises errors.SnapDataExtractionError: if the snap cannot be read.
+    """
+    try:
+        snap_stat = os.stat(snap_path)
+    except OSError as e:
+        raise errors.SnapDataExtractionError(os.path.basename(snap_path)) from e
+    snap_key = (
+        snap_stat.st_dev,
+        snap_stat.st_ino,
+        snap_stat.st_size,
+        snap_stat.st_mtime_ns,
+    )
+    return _read_snap_file(snap_path, snap_key, path)
+
+
+@functools.lru_cache(maxsize=32)
+def _read_snap_file(snap_path: str, snap_key: Tuple, path: str) -> Optional[bytes]:
+    try:
+        with SquashfsFile(snap_path) as snap:
+            return snap.read(path)
+    except errors.SquashfsCompressionNotSupportedError as e:
+        logger.debug("{}, extracting {!r} instead.".format(e, path))
+        return _extract_snap_file(snap_path, path)
+    except (OSError, errors.InvalidSquashfsError) as e:
+        raise errors.SnapDataExtractionError(os.path.basename(snap_path)) from e
+
+
+def _extract_snap_file(snap_path: str, path: str) -> Optional[bytes]:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        unsquashfs_path = file_utils.get_tool_path("unsquashfs")
+        try:
+            output = subprocess.check_output(
+                [
+                    unsquashfs_path,
+                    "-d",
+                    os.path.join(temp_dir, "squashfs-root"),
+                    snap_path,
+                    "-e",
+                    path,
+                ]
+            )
+        except subprocess.CalledProcessError:
+            raise errors.SnapDataExtractionError(os.path.basename(snap_path))
+        logger.debug(output)
+        file_path = os.path.join(temp_dir, "squashfs-root", path)
+        if os.path.islink(file_path) or not os.path.isfile(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            return f.read()
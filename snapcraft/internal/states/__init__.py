@@ -17,8 +17,10 @@
 from snapcraft.internal.states._state import PartState  # noqa
 from snapcraft.internal.states._build_state import BuildState  # noqa
 from snapcraft.internal.states._global_state import GlobalState  # noqa
+from snapcraft.internal.states._path_index import PathIndex  # noqa
 from snapcraft.internal.states._prime_state import PrimeState  # noqa
 from snapcraft.internal.states._pull_state import PullState  # noqa
 from snapcraft.internal.states._stage_state import StageState  # noqa
 from snapcraft.internal.states._state import get_state  # noqa
 from snapcraft.internal.states._state import get_step_state_file  # noqa
+from snapcraft.internal.states._state import save_state  # noqa
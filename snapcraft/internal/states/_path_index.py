@@ -0,0 +1,226 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import logging
+import os
+import sqlite3
+from typing import Iterable, Iterator, Optional, Set  # noqa: F401
+
+from snapcraft.internal import steps
+from snapcraft.internal.states._state import get_state, get_step_state_file
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+DROP TABLE IF EXISTS parts;
+DROP TABLE IF EXISTS paths;
+CREATE TABLE parts (
+    step TEXT,
+    part TEXT,
+    mtime INTEGER,
+    size INTEGER,
+    PRIMARY KEY (step, part)
+) WITHOUT ROWID;
+CREATE TABLE paths (
+    step TEXT,
+    path BLOB,
+    directory INTEGER,
+    part TEXT,
+    PRIMARY KEY (step, path, directory, part)
+) WITHOUT ROWID;
+CREATE INDEX paths_by_part ON paths (step, part);
+PRAGMA user_version = {};
+""".format(_SCHEMA_VERSION)
+
+
+class PathIndex:
+    """Index of the paths migrated by the parts of a project to each step.
+
+    The index maps the files and directories in the stage and prime
+    directories to the parts that migrated them. It is updated as steps are
+    marked done or cleaned, and checked against the state files of the parts
+    it is queried for so it is never out of date, even if they were written
+    by a version of snapcraft that did not maintain it.
+    """
+
+    def __init__(self, parts_dir: str) -> None:
+        self._parts_dir = parts_dir
+        self._path = os.path.join(parts_dir, ".snapcraft_path_index")
+
+    def update(self, step: steps.Step, part_name: str, state) -> None:
+        """Index the paths in the state of part_name for step."""
+        state_file = get_step_state_file(self._get_state_dir(part_name), step)
+        with self._connect(create=True) as connection:
+            self._update(connection, step, part_name, state, os.stat(state_file))
+
+    def remove(self, step: steps.Step, part_name: str) -> None:
+        """Remove the paths of part_name for step from the index."""
+        with self._connect(create=False) as connection:
+            if connection is not None:
+                self._remove(connection, step, part_name)
+
+    def refresh(self, step: steps.Step, part_names: Iterable[str]) -> Set[str]:
+        """Bring the index up to date with the states of part_names for step.
+
+        :returns: the names of the parts that have a state for step.
+        """
+        part_names = set(part_names)
+        part_stats = dict()
+        for part_name in part_names:
+            state_file = get_step_state_file(self._get_state_dir(part_name), step)
+            with contextlib.suppress(FileNotFoundError):
+                part_stats[part_name] = os.stat(state_file)
+
+        with self._connect(create=bool(part_stats)) as connection:
+            if connection is None:
+                return set()
+
+            indexed = {
+                part_name: (mtime, size)
+                for part_name, mtime, size in connection.execute(
+                    "SELECT part, mtime, size FROM parts WHERE step = ?", (step.name,)
+                )
+            }
+            for part_name, stat in part_stats.items():
+                if indexed.get(part_name) != (stat.st_mtime_ns, stat.st_size):
+                    logger.debug(
+                        "Indexing {} state of {!r}".format(step.name, part_name)
+                    )
+                    state = get_state(self._get_state_dir(part_name), step)
+                    self._update(connection, step, part_name, state, stat)
+            for part_name in indexed.keys() - part_stats.keys():
+                if part_name in part_names:
+                    self._remove(connection, step, part_name)
+
+        return set(part_stats)
+
+    def get_owners(self, step: steps.Step, path: str, *, directory: bool) -> Set[str]:
+        """Return the names of the parts that migrated path to step."""
+        with self._connect(create=False) as connection:
+            if connection is None:
+                return set()
+            return {
+                part_name
+                for (part_name,) in connection.execute(
+                    "SELECT part FROM paths "
+                    "WHERE step = ? AND path = ? AND directory = ?",
+                    (step.name, _encode(path), directory),
+                )
+            }
+
+    def get_shared_paths(
+        self,
+        step: steps.Step,
+        paths: Iterable[str],
+        *,
+        directory: bool,
+        part_names: Set[str]
+    ) -> Set[str]:
+        """Return those of paths that any of part_names migrated to step."""
+        with self._connect(create=False) as connection:
+            if connection is None or not part_names:
+                return set()
+            connection.execute(
+                "CREATE TEMP TABLE candidates (path BLOB PRIMARY KEY) WITHOUT ROWID"
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO candidates VALUES (?)",
+                ((_encode(p),) for p in paths),
+            )
+            return {
+                _decode(path)
+                for path, part_name in connection.execute(
+                    "SELECT candidates.path, paths.part FROM candidates "
+                    "JOIN paths ON paths.step = ? AND paths.path = candidates.path "
+                    "AND paths.directory = ?",
+                    (step.name, directory),
+                )
+                if part_name in part_names
+            }
+
+    def _get_state_dir(self, part_name: str) -> str:
+        return os.path.join(self._parts_dir, part_name, "state")
+
+    @contextlib.contextmanager
+    def _connect(self, *, create: bool) -> Iterator[Optional[sqlite3.Connection]]:
+        if not create and not os.path.exists(self._path):
+            yield None
+            return
+
+        connection = _open_index(self._path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _update(
+        self,
+        connection: sqlite3.Connection,
+        step: steps.Step,
+        part_name: str,
+        state,
+        stat: os.stat_result,
+    ) -> None:
+        self._remove(connection, step, part_name)
+        connection.execute(
+            "INSERT INTO parts VALUES (?, ?, ?, ?)",
+            (step.name, part_name, stat.st_mtime_ns, stat.st_size),
+        )
+        for directory, paths in [
+            (False, getattr(state, "files", ())),
+            (True, getattr(state, "directories", ())),
+        ]:
+            connection.executemany(
+                "INSERT OR IGNORE INTO paths VALUES (?, ?, ?, ?)",
+                ((step.name, _encode(p), directory, part_name) for p in paths),
+            )
+
+    def _remove(
+        self, connection: sqlite3.Connection, step: steps.Step, part_name: str
+    ) -> None:
+        for table in ("parts", "paths"):
+            connection.execute(
+                "DELETE FROM {} WHERE step = ? AND part = ?".format(table),
+                (step.name, part_name),
+            )
+
+
+def _open_index(path: str) -> sqlite3.Connection:
+    # The index only caches what is in the state files, so it is rebuilt
+    # from them rather than migrated or repaired.
+    connection = sqlite3.connect(path)
+    try:
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version != _SCHEMA_VERSION:
+            connection.executescript(_SCHEMA)
+    except sqlite3.DatabaseError:
+        connection.close()
+        os.remove(path)
+        connection = sqlite3.connect(path)
+        connection.executescript(_SCHEMA)
+    return connection
+
+
+def _encode(path: str) -> bytes:
+    return path.encode("utf-8", "surrogateescape")
+
+
+def _decode(path: bytes) -> str:
+    return path.decode("utf-8", "surrogateescape")
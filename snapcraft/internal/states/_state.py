@@ -18,6 +18,7 @@ import os
 
 from snapcraft import yaml_utils
 from snapcraft.internal import steps
+from snapcraft.internal.states import _state_file
 
 
 class State(yaml_utils.SnapcraftYAMLObject):
@@ -92,11 +93,16 @@ def get_state(state_dir: str, step: steps.Step):
     state = None
     state_file = get_step_state_file(state_dir, step)
     if os.path.isfile(state_file):
-        with open(state_file, "r") as f:
-            state = yaml_utils.load(f)
+        with open(state_file, "rb") as f:
+            state = _state_file.load(f.read())
 
     return state
 
 
+def save_state(state_dir: str, step: steps.Step, state) -> None:
+    with open(get_step_state_file(state_dir, step), "wb") as f:
+        f.write(_state_file.dump(state))
+
+
 def get_step_state_file(state_dir: str, step: steps.Step) -> str:
     return os.path.join(state_dir, step.name)
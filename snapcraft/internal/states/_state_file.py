@@ -0,0 +1,152 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Read and write step state files.
+
+States are written as YAML, but the sets of paths carried by the stage and
+prime states can hold hundreds of thousands of entries which are very slow
+to parse as YAML. States carrying such sets are written in a compact format
+instead:
+
+    SNAPCRAFT-STATE 1
+    <JSON header giving the size of each of the following sections>
+    <the YAML of the state without its path sets>
+    <each path set, as its sorted NUL separated paths>
+
+Path sets are only parsed when first used, until then membership is tested
+with a binary search on the sorted paths. YAML state files, as written by
+previous versions, are still read.
+"""
+
+import collections.abc
+import copy
+import json
+from typing import Any, Dict, Iterator, List, Optional, Set  # noqa: F401
+
+from snapcraft import yaml_utils
+
+_MAGIC = b"SNAPCRAFT-STATE 1\n"
+
+# The attributes of the states holding sets of paths.
+_PATH_SET_ATTRIBUTES = ("files", "directories", "dependency_paths")
+
+
+class _PathSet(collections.abc.Set):
+    """A read-only set of paths parsed from its sorted, encoded paths."""
+
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._paths = None  # type: Optional[Set[str]]
+
+    def _get_paths(self) -> Set[str]:
+        if self._paths is None:
+            if self._data:
+                self._paths = {_decode(p) for p in self._data.split(b"\0")}
+            else:
+                self._paths = set()
+        return self._paths
+
+    def __contains__(self, path: object) -> bool:
+        if self._paths is not None:
+            return path in self._paths
+        if not isinstance(path, str):
+            return False
+        return _bisect(self._data, _encode(path))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._get_paths())
+
+    def __len__(self) -> int:
+        return len(self._get_paths())
+
+    def __repr__(self) -> str:
+        return repr(self._get_paths())
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        # Operations with other sets return regular sets.
+        return set(iterable)
+
+
+def load(data: bytes) -> Any:
+    """Return the state in the contents of a state file."""
+    if not data.startswith(_MAGIC):
+        return yaml_utils.load(data.decode())
+
+    header_end = data.index(b"\n", len(_MAGIC))
+    header = json.loads(data[len(_MAGIC) : header_end].decode())
+    offset = header_end + 1
+    yaml_size = header["yaml"]
+    state = yaml_utils.load(data[offset : offset + yaml_size].decode())
+    offset += yaml_size
+    for attribute, size in header["path_sets"]:
+        setattr(state, attribute, _PathSet(data[offset : offset + size]))
+        offset += size
+    return state
+
+
+def dump(state: Any) -> bytes:
+    """Return the contents of the state file for state."""
+    path_sets = [
+        (attribute, getattr(state, attribute))
+        for attribute in _PATH_SET_ATTRIBUTES
+        if isinstance(getattr(state, attribute, None), collections.abc.Set)
+    ]
+    if not path_sets:
+        return yaml_utils.dump(state).encode()
+
+    state = copy.copy(state)
+    for attribute, _ in path_sets:
+        delattr(state, attribute)
+    sections = [yaml_utils.dump(state).encode()]
+    sections.extend(b"\0".join(sorted(_encode(p) for p in s)) for _, s in path_sets)
+    header = {
+        "yaml": len(sections[0]),
+        "path_sets": [
+            (attribute, len(section))
+            for (attribute, _), section in zip(path_sets, sections[1:])
+        ],
+    }
+    return b"".join([_MAGIC, json.dumps(header).encode(), b"\n"] + sections)
+
+
+def _bisect(data: bytes, path: bytes) -> bool:
+    # Paths cannot contain NUL, so the one found before (or after) any
+    # position in data marks the start (or end) of the path at it.
+    low = 0
+    high = len(data)
+    while low < high:
+        middle = (low + high) // 2
+        start = data.rfind(b"\0", low, middle) + 1 or low
+        end = data.find(b"\0", middle, high)
+        if end == -1:
+            end = high
+        candidate = data[start:end]
+        if candidate == path:
+            return True
+        if candidate < path:
+            low = end + 1
+        else:
+            high = start - 1 if start > low else low
+    return False
+
+
+def _encode(path: str) -> bytes:
+    return path.encode("utf-8", "surrogateescape")
+
+
+def _decode(path: bytes) -> str:
+    return path.decode("utf-8", "surrogateescape")
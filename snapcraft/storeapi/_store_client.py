@@ -1,4 +1,3 @@
-import hashlib
 import os
 import urllib.parse
 from time import sleep
@@ -8,7 +7,7 @@ import pymacaroons
 import requests
 
 import snapcraft
-from snapcraft import config
+from snapcraft import config, file_utils
 from snapcraft.internal.indicators import download_requests_stream
 
 from . import logger
@@ -310,11 +309,7 @@ class StoreClient:
         if not os.path.exists(path):
             return False
 
-        file_sum = hashlib.sha512()
-        with open(path, "rb") as f:
-            for file_chunk in iter(lambda: f.read(file_sum.block_size * 128), b""):
-                file_sum.update(file_chunk)
-        return expected_sha512 == file_sum.hexdigest()
+        return expected_sha512 == file_utils.calculate_hash(path, algorithm="sha512")
 
     def push_assertion(self, snap_id, assertion, endpoint, force=False):
         return self.sca.push_assertion(snap_id, assertion, endpoint, force)
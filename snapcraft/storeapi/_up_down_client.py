@@ -26,3 +26,40 @@ class UpDownClient(Client):
                 "Accept": "application/json",
             },
         )
+
+    def start_chunked_upload(self, size):
+        return self.post(
+            urllib.parse.urljoin(self.root_url, "unscanned-upload/chunked/"),
+            json={"size": size},
+            headers={"Accept": "application/json"},
+        )
+
+    def get_chunked_upload(self, upload_id):
+        return self.get(
+            self._get_chunked_upload_url(upload_id),
+            headers={"Accept": "application/json"},
+        )
+
+    def upload_chunk(self, upload_id, chunk, *, offset, size):
+        return self.put(
+            self._get_chunked_upload_url(upload_id),
+            data=chunk,
+            headers={
+                "Content-Type": "application/octet-stream",
+                "Content-Range": "bytes {}-{}/{}".format(
+                    offset, offset + len(chunk) - 1, size
+                ),
+                "Accept": "application/json",
+            },
+        )
+
+    def complete_chunked_upload(self, upload_id):
+        return self.post(
+            urllib.parse.urljoin(self._get_chunked_upload_url(upload_id), "complete/"),
+            headers={"Accept": "application/json"},
+        )
+
+    def _get_chunked_upload_url(self, upload_id):
+        return urllib.parse.urljoin(
+            self.root_url, "unscanned-upload/chunked/{}/".format(upload_id)
+        )
@@ -14,18 +14,33 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import concurrent.futures
+import contextlib
+import hashlib
+import json
 import logging
 import functools
 import os
+import threading
+from typing import Set  # noqa: F401
 
 from progressbar import Bar, Percentage, ProgressBar
+from requests.adapters import DEFAULT_POOLSIZE
 from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
 
+from snapcraft import file_utils
+from snapcraft.internal import cache
+from snapcraft.internal.errors import SnapcraftEnvironmentError
 from snapcraft.storeapi.errors import StoreUploadError
 
 
 logger = logging.getLogger(__name__)
 
+# Chunked uploads are experimental, as the upload service does not offer
+# them yet. They are used once a chunk size is set, with this many chunks
+# uploaded at a time by default.
+_DEFAULT_CHUNK_WORKERS = 4
+
 
 def _update_progress_bar(progress_bar, maximum_value, monitor):
     if monitor.bytes_read <= maximum_value:
@@ -38,6 +53,14 @@ def upload_files(binary_filename, updown_client):
     Submit a file to the Store upload service and return the
     corresponding upload_id.
     """
+    chunk_size = _get_positive_environ("STORE_UPLOAD_CHUNK_SIZE")
+    if chunk_size is not None:
+        logger.warning(
+            "Uploading in chunks is experimental and needs an upload service "
+            "supporting it."
+        )
+        return _upload_chunks(binary_filename, updown_client, chunk_size=chunk_size)
+
     try:
         binary_file_size = os.path.getsize(binary_filename)
         binary_file = open(binary_filename, "rb")
@@ -80,3 +103,144 @@ def upload_files(binary_filename, updown_client):
         "binary_filesize": binary_file_size,
         "source_uploaded": False,
     }
+
+
+def _upload_chunks(binary_filename, updown_client, *, chunk_size):
+    """Upload a binary file to the Store in chunks, resuming where a previous
+    upload of the same file was interrupted.
+    """
+    binary_file_size = os.path.getsize(binary_filename)
+    journal_path = _get_upload_journal_path(
+        binary_filename, updown_client.root_url, chunk_size
+    )
+
+    upload_id = None
+    received = set()
+    with contextlib.suppress(FileNotFoundError, ValueError, KeyError):
+        with open(journal_path) as journal_file:
+            upload_id = json.load(journal_file)["upload_id"]
+    if upload_id is not None:
+        response = updown_client.get_chunked_upload(upload_id)
+        if response.ok:
+            received = set(response.json()["received"])
+            logger.info(
+                "Resuming the upload of {!r}.".format(os.path.basename(binary_filename))
+            )
+        else:
+            # The upload expired.
+            upload_id = None
+    if upload_id is None:
+        response = updown_client.start_chunked_upload(binary_file_size)
+        if not response.ok:
+            raise StoreUploadError(response)
+        upload_id = response.json()["upload_id"]
+        os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+        with open(journal_path, "w") as journal_file:
+            json.dump({"upload_id": upload_id}, journal_file)
+
+    offsets = range(0, binary_file_size, chunk_size)
+    uploaded = sum(
+        min(chunk_size, binary_file_size - offset)
+        for offset in offsets
+        if offset in received
+    )
+    progress_bar = ProgressBar(
+        widgets=[
+            "Pushing {!r} ".format(os.path.basename(binary_filename)),
+            Bar(marker="=", left="[", right="]"),
+            " ",
+            Percentage(),
+        ],
+        maxval=binary_file_size,
+    )
+    progress_bar.start()
+    progress_lock = threading.Lock()
+
+    with open(binary_filename, "rb") as binary_file:
+
+        def upload_chunk(offset):
+            nonlocal uploaded
+            chunk = os.pread(binary_file.fileno(), chunk_size, offset)
+            response = updown_client.upload_chunk(
+                upload_id, chunk, offset=offset, size=binary_file_size
+            )
+            if not response.ok:
+                raise StoreUploadError(response)
+            with progress_lock:
+                uploaded += len(chunk)
+                progress_bar.update(uploaded)
+
+        workers = _get_positive_environ("STORE_UPLOAD_WORKERS")
+        if workers is None:
+            workers = _DEFAULT_CHUNK_WORKERS
+        elif workers > DEFAULT_POOLSIZE:
+            # More workers than pooled connections would not reuse them.
+            logger.warning(
+                "STORE_UPLOAD_WORKERS is set to {}, uploading {} chunks at a "
+                "time instead.".format(workers, DEFAULT_POOLSIZE)
+            )
+            workers = DEFAULT_POOLSIZE
+        _run_bounded(
+            upload_chunk,
+            (offset for offset in offsets if offset not in received),
+            workers=workers,
+        )
+
+    response = updown_client.complete_chunked_upload(upload_id)
+    if not response.ok:
+        raise StoreUploadError(response)
+    progress_bar.finish()
+    os.remove(journal_path)
+
+    return {
+        "upload_id": response.json()["upload_id"],
+        "binary_filesize": binary_file_size,
+        "source_uploaded": False,
+    }
+
+
+def _run_bounded(func, items, *, workers):
+    """Call func on each of items from workers threads.
+
+    Items are only submitted as workers are free, so that once a call fails,
+    or the upload is interrupted, the error is raised as soon as the calls
+    running finish instead of after all of them.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        running = set()  # type: Set[concurrent.futures.Future]
+        try:
+            for item in items:
+                if len(running) >= workers:
+                    done, running = concurrent.futures.wait(
+                        running, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        future.result()
+                running.add(executor.submit(func, item))
+            for future in concurrent.futures.as_completed(running):
+                future.result()
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+
+
+def _get_positive_environ(name):
+    value = os.environ.get(name)
+    if value is None:
+        return None
+    if not value.isdigit() or int(value) < 1:
+        raise SnapcraftEnvironmentError(
+            "{} is set to {!r}, it must be a positive number.".format(name, value)
+        )
+    return int(value)
+
+
+def _get_upload_journal_path(binary_filename, root_url, chunk_size):
+    # Uploads are resumed for the same contents, to the same server.
+    key = hashlib.sha256(
+        "{}\0{}\0{}".format(
+            file_utils.calculate_sha3_384(binary_filename), root_url, chunk_size
+        ).encode()
+    ).hexdigest()
+    return os.path.join(cache.SnapcraftCache().cache_root, "uploads", key)
@@ -33,6 +33,35 @@ class FakeStoreUploadServer(base.BaseFakeServer):
         )
         configurator.add_view(self.unscanned_upload, route_name="unscanned-upload")
 
+        # Uploads in chunks, as identified by the offset they start at.
+        self.chunked_uploads = dict()
+        configurator.add_route(
+            "start-chunked-upload", "/unscanned-upload/chunked/", request_method="POST"
+        )
+        configurator.add_view(
+            self.start_chunked_upload, route_name="start-chunked-upload"
+        )
+        configurator.add_route(
+            "get-chunked-upload",
+            "/unscanned-upload/chunked/{upload_id}/",
+            request_method="GET",
+        )
+        configurator.add_view(self.get_chunked_upload, route_name="get-chunked-upload")
+        configurator.add_route(
+            "upload-chunk",
+            "/unscanned-upload/chunked/{upload_id}/",
+            request_method="PUT",
+        )
+        configurator.add_view(self.upload_chunk, route_name="upload-chunk")
+        configurator.add_route(
+            "complete-chunked-upload",
+            "/unscanned-upload/chunked/{upload_id}/complete/",
+            request_method="POST",
+        )
+        configurator.add_view(
+            self.complete_chunked_upload, route_name="complete-chunked-upload"
+        )
+
     def unscanned_upload(self, request):
         logger.info("Handling upload request")
         if "UPDOWN_BROKEN" in os.environ:
@@ -46,3 +75,51 @@ class FakeStoreUploadServer(base.BaseFakeServer):
         return response.Response(
             payload, response_code, [("Content-Type", content_type)]
         )
+
+    def start_chunked_upload(self, request):
+        logger.info("Handling chunked upload request")
+        if "UPDOWN_BROKEN" in os.environ:
+            return response.Response(b"Broken", 500, [("Content-Type", "text/plain")])
+        upload_id = "test-chunked-upload-id-{}".format(len(self.chunked_uploads))
+        self.chunked_uploads[upload_id] = {
+            "size": request.json_body["size"],
+            "chunks": dict(),
+        }
+        return self._json_response({"upload_id": upload_id})
+
+    def get_chunked_upload(self, request):
+        upload = self.chunked_uploads.get(request.matchdict["upload_id"])
+        if upload is None:
+            return self._json_response({"error": "Upload not found"}, 404)
+        return self._json_response(
+            {"size": upload["size"], "received": sorted(upload["chunks"])}
+        )
+
+    def upload_chunk(self, request):
+        upload = self.chunked_uploads.get(request.matchdict["upload_id"])
+        if upload is None:
+            return self._json_response({"error": "Upload not found"}, 404)
+        content_range = request.headers["Content-Range"]
+        offset = int(content_range.split()[1].split("-")[0])
+        upload["chunks"][offset] = request.body
+        return self._json_response({})
+
+    def complete_chunked_upload(self, request):
+        upload = self.chunked_uploads.get(request.matchdict["upload_id"])
+        if upload is None:
+            return self._json_response({"error": "Upload not found"}, 404)
+        received = 0
+        for offset, chunk in sorted(upload["chunks"].items()):
+            if offset != received:
+                break
+            received += len(chunk)
+        if received != upload["size"]:
+            return self._json_response({"error": "Upload incomplete"}, 400)
+        return self._json_response({"upload_id": "test-upload-id"})
+
+    def _json_response(self, payload, status_code=200):
+        return response.Response(
+            json.dumps(payload).encode(),
+            status_code,
+            [("Content-Type", "application/json")],
+        )
@@ -117,6 +117,11 @@ class FakePlugin(fixtures.Fixture):
 
 
 def _fake_elffile_extract(self, path):
+    # None of the fake ELF files set DT_RPATH nor DT_RUNPATH
+    return _fake_elffile_data(path) + ([], [])
+
+
+def _fake_elffile_data(path):
     arch = ("ELFCLASS64", "ELFDATA2LSB", "EM_X86_64")
     name = os.path.basename(path)
     if name in [
@@ -468,14 +473,17 @@ class FakeAptCache(fixtures.Fixture):
         for package, version in self.packages:
             self.add_package(FakeAptCachePackage(package, version))
 
-        def fetch_binary(package_candidate, destination):
-            path = os.path.join(self.path, "{}.deb".format(package_candidate.name))
-            open(path, "w").close()
-            return path
-
-        patcher = mock.patch("snapcraft.repo._deb._AptCache.fetch_binary")
-        mock_fetch_binary = patcher.start()
-        mock_fetch_binary.side_effect = fetch_binary
+        def fetch_binaries(package_candidates, destination):
+            paths = []
+            for package_candidate in package_candidates:
+                path = os.path.join(self.path, "{}.deb".format(package_candidate.name))
+                open(path, "w").close()
+                paths.append(path)
+            return paths
+
+        patcher = mock.patch("snapcraft.repo._deb._AptCache.fetch_binaries")
+        mock_fetch_binaries = patcher.start()
+        mock_fetch_binaries.side_effect = fetch_binaries
         self.addCleanup(patcher.stop)
 
         # Add all the packages in the manifest.
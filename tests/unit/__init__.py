@@ -301,6 +301,7 @@ class TestCase(testscenarios.WithScenarios, testtools.TestCase):
             confinement=confinement,
             snap_type=snap_type,
             soname_cache=elf.SonameCache(),
+            elf_cache=elf.ElfCache(),
         )
 
 
@@ -22,6 +22,7 @@ from unittest.mock import call, patch, Mock
 from testtools.matchers import Equals, EndsWith, DirExists, FileContains, Not
 
 from . import BaseProviderBaseTest, MacBaseProviderWithBasesBaseTest, ProviderImpl
+from snapcraft.internal import steps
 from snapcraft.internal.build_providers import errors, _base_provider
 from tests import unit
 
@@ -178,6 +179,31 @@ class BaseProviderTest(BaseProviderBaseTest):
         # TODO add robustness to start. (LP: #1792242)
         self.assertThat(provider.provider_project_dir, Not(DirExists()))
 
+    def test_execute_step(self):
+        provider = ProviderImpl(project=self.project, echoer=self.echoer_mock)
+
+        provider.execute_step(steps.BUILD)
+
+        provider.run_mock.assert_called_once_with(["snapcraft", "build"])
+
+    def test_execute_step_with_jobs(self):
+        provider = ProviderImpl(project=self.project, echoer=self.echoer_mock)
+
+        provider.execute_step(steps.BUILD, jobs=4)
+
+        provider.run_mock.assert_called_once_with(
+            ["snapcraft", "build", "--jobs", "4"]
+        )
+
+    def test_pack_project_with_jobs(self):
+        provider = ProviderImpl(project=self.project, echoer=self.echoer_mock)
+
+        provider.pack_project(output="out.snap", jobs=4)
+
+        provider.run_mock.assert_called_once_with(
+            ["snapcraft", "snap", "--output", "out.snap", "--jobs", "4"]
+        )
+
     def test_clean_part(self):
         provider = ProviderImpl(project=self.project, echoer=self.echoer_mock)
 
@@ -0,0 +1,68 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+from testtools.matchers import DirExists, Equals, FileContains, Is
+
+from snapcraft.internal import cache
+from tests import unit
+
+
+class AptStagePackageTreeCacheTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.tree_cache = cache.AptStagePackageTreeCache()
+
+    def unpack(self, path):
+        os.makedirs(os.path.join(path, "bin"))
+        with open(os.path.join(path, "bin", "foo"), "w") as f:
+            f.write("foo")
+
+    def test_get_nothing_cached(self):
+        self.assertThat(self.tree_cache.get(key="1"), Is(None))
+
+    def test_cache_and_retrieve(self):
+        tree = self.tree_cache.cache(key="1", unpack=self.unpack)
+
+        self.assertThat(self.tree_cache.get(key="1"), Equals(tree))
+        self.assertThat(os.path.join(tree, "bin", "foo"), FileContains("foo"))
+
+    def test_failed_unpack_is_not_cached(self):
+        def unpack(path):
+            self.unpack(path)
+            raise RuntimeError("unpack failed")
+
+        self.assertRaises(RuntimeError, self.tree_cache.cache, key="1", unpack=unpack)
+
+        self.assertThat(self.tree_cache.get(key="1"), Is(None))
+        self.assertThat(os.listdir(self.tree_cache.tree_cache_root), Equals([]))
+
+    def test_least_recently_used_entries_are_pruned(self):
+        for key in ("1", "2"):
+            tree = self.tree_cache.cache(key=key, unpack=self.unpack)
+            os.utime(os.path.dirname(tree), (int(key), int(key)))
+
+        with open(os.path.join(os.path.dirname(tree), "size")) as f:
+            entry_size = int(f.read())
+        tree_cache = cache.AptStagePackageTreeCache(max_size=entry_size)
+
+        self.assertThat(
+            tree_cache.prune(), Equals([os.path.join(tree_cache.tree_cache_root, "1")])
+        )
+        self.assertThat(os.path.dirname(tree), DirExists())
+        self.assertThat(self.tree_cache.get(key="1"), Is(None))
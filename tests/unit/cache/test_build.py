@@ -0,0 +1,68 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+from testtools.matchers import DirExists, Equals, FileContains, Is, Not
+
+from snapcraft.internal import cache
+from tests import unit
+
+
+class BuildCacheTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        os.makedirs(os.path.join("install", "bin"))
+        with open(os.path.join("install", "bin", "foo"), "w") as f:
+            f.write("foo")
+        os.mkdir("state")
+        with open(os.path.join("state", "build"), "w") as f:
+            f.write("build state")
+
+        self.build_cache = cache.BuildCache(cache_dir="builds")
+
+    def test_get_nothing_cached(self):
+        self.assertThat(self.build_cache.get(key="1"), Is(None))
+
+    def test_cache_and_retrieve(self):
+        entry = self.build_cache.cache(key="1", installdir="install", statedir="state")
+
+        self.assertThat(self.build_cache.get(key="1"), Equals(entry))
+        self.assertThat(
+            os.path.join(entry, "install", "bin", "foo"), FileContains("foo")
+        )
+        self.assertThat(
+            os.path.join(entry, "state", "build"), FileContains("build state")
+        )
+
+    def test_least_recently_used_entries_are_pruned(self):
+        for key in ("1", "2", "3"):
+            entry = self.build_cache.cache(
+                key=key, installdir="install", statedir="state"
+            )
+            os.utime(entry, (int(key), int(key)))
+        # Use the oldest entry.
+        self.build_cache.get(key="1")
+
+        with open(os.path.join(entry, "size")) as f:
+            entry_size = int(f.read())
+        build_cache = cache.BuildCache(cache_dir="builds", max_size=2 * entry_size)
+
+        self.assertThat(build_cache.prune(), Equals([os.path.join("builds", "2")]))
+        self.assertThat(os.path.join("builds", "1"), DirExists())
+        self.assertThat(os.path.join("builds", "2"), Not(DirExists()))
+        self.assertThat(os.path.join("builds", "3"), DirExists())
@@ -15,10 +15,12 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import os.path
+import struct
 import subprocess
 from textwrap import dedent
 from unittest import mock
 
+import fixtures
 from testtools.matchers import Contains, Equals, FileExists
 from . import CommandBaseTestCase
 
@@ -151,3 +153,114 @@ class PackCommandTestCase(PackCommandBaseTestCase):
         )
 
         self.assertThat("mysnap_99_multi.snap", FileExists())
+
+    def test_snap_from_dir_with_compression_and_processors(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable("SNAPCRAFT_PACK_COMPRESSION", "lzo")
+        )
+        self.useFixture(fixtures.EnvironmentVariable("SNAPCRAFT_PACK_PROCESSORS", "2"))
+        with open(self.snap_yaml, "w") as f:
+            f.write(
+                dedent(
+                    """\
+                name: mysnap
+                version: 99
+            """
+                )
+            )
+
+        result = self.run_command([self.command, self.snap_dir])
+
+        self.assertThat(result.exit_code, Equals(0))
+        self.popen_spy.assert_called_once_with(
+            [
+                "mksquashfs",
+                "mysnap",
+                "mysnap_99_all.snap",
+                "-noappend",
+                "-comp",
+                "lzo",
+                "-no-xattrs",
+                "-no-fragments",
+                "-all-root",
+                "-processors",
+                "2",
+            ],
+            stderr=subprocess.STDOUT,
+            stdout=subprocess.PIPE,
+        )
+
+    def test_snap_from_dir_is_created_at_the_time_it_was_primed(self):
+        with open(self.snap_yaml, "w") as f:
+            f.write(
+                dedent(
+                    """\
+                name: mysnap
+                version: 99
+            """
+                )
+            )
+        os.utime(self.snap_yaml, (1000, 1000))
+
+        self.run_command([self.command, self.snap_dir])
+
+        # The creation time follows the magic and inode count in the
+        # superblock.
+        with open("mysnap_99_all.snap", "rb") as f:
+            f.seek(8)
+            self.assertThat(struct.unpack("<I", f.read(4)), Equals((1000,)))
+
+    def test_snap_from_unchanged_dir_is_not_packed_again(self):
+        with open(self.snap_yaml, "w") as f:
+            f.write(
+                dedent(
+                    """\
+                name: mysnap
+                version: 99
+            """
+                )
+            )
+
+        self.run_command([self.command, self.snap_dir])
+        # Priming again writes the same metadata anew.
+        os.utime(self.snap_yaml, (2000, 2000))
+        result = self.run_command([self.command, self.snap_dir])
+
+        self.assertThat(result.exit_code, Equals(0))
+        self.assertThat(result.output, Contains("Snapped mysnap_99_all.snap\n"))
+        self.assertThat(self.popen_spy.call_count, Equals(1))
+
+    def test_snap_from_changed_dir_is_packed_again(self):
+        with open(self.snap_yaml, "w") as f:
+            f.write(
+                dedent(
+                    """\
+                name: mysnap
+                version: 99
+            """
+                )
+            )
+
+        self.run_command([self.command, self.snap_dir])
+        open(os.path.join(self.snap_dir, "new-file"), "w").close()
+        self.run_command([self.command, self.snap_dir])
+
+        self.assertThat(self.popen_spy.call_count, Equals(2))
+
+    def test_snap_modified_since_packed_is_packed_again(self):
+        with open(self.snap_yaml, "w") as f:
+            f.write(
+                dedent(
+                    """\
+                name: mysnap
+                version: 99
+            """
+                )
+            )
+
+        self.run_command([self.command, self.snap_dir])
+        with open("mysnap_99_all.snap", "ab") as f:
+            f.write(b"modified")
+        self.run_command([self.command, self.snap_dir])
+
+        self.assertThat(self.popen_spy.call_count, Equals(2))
@@ -385,6 +385,116 @@ class ExecutionTestCase(LifecycleTestBase):
         lifecycle.execute(steps.PULL, project_config)
 
 
+class ConcurrentExecutionTestCase(LifecycleTestBase):
+    def setUp(self):
+        super().setUp()
+
+        patcher = mock.patch("snapcraft.repo.snaps.install_snaps")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_build_independent_parts(self):
+        project_config = self.make_snapcraft_project(
+            textwrap.dedent(
+                """\
+                parts:
+                  part1:
+                    plugin: nil
+                  part2:
+                    plugin: nil
+                  part3:
+                    plugin: nil
+                """
+            )
+        )
+
+        lifecycle.execute(steps.BUILD, project_config, jobs=3)
+
+        for part_name in ("part1", "part2", "part3"):
+            for step in (steps.PULL, steps.BUILD):
+                self.assertThat(
+                    os.path.join(self.parts_dir, part_name, "state", step.name),
+                    FileExists(),
+                )
+            self.assertThat(
+                os.path.join(self.parts_dir, part_name, "state", steps.STAGE.name),
+                Not(FileExists()),
+            )
+
+    def test_dependency_is_staged_before_dependent_is_pulled(self):
+        project_config = self.make_snapcraft_project(
+            textwrap.dedent(
+                """\
+                parts:
+                  part1:
+                    plugin: nil
+                    override-build: touch $SNAPCRAFT_PART_INSTALL/part1
+                  part2:
+                    plugin: nil
+                    after: [part1]
+                    override-pull: test -f $SNAPCRAFT_STAGE/part1
+                """
+            )
+        )
+
+        lifecycle.execute(steps.PULL, project_config, jobs=2)
+
+        self.assertThat(
+            self.fake_logger.output,
+            Contains("'part2' has dependencies that need to be staged: part1"),
+        )
+        self.assertThat(
+            os.path.join(self.parts_dir, "part2", "state", steps.PULL.name),
+            FileExists(),
+        )
+
+    def test_skips_steps_that_already_ran(self):
+        project_config = self.make_snapcraft_project(
+            textwrap.dedent(
+                """\
+                parts:
+                  part1:
+                    plugin: nil
+                """
+            )
+        )
+
+        lifecycle.execute(steps.PULL, project_config)
+        lifecycle.execute(steps.PULL, project_config, jobs=2)
+
+        self.assertThat(
+            self.fake_logger.output, Contains("Skipping pull part1 (already ran)")
+        )
+
+    def test_job_error_is_raised(self):
+        project_config = self.make_snapcraft_project(
+            textwrap.dedent(
+                """\
+                parts:
+                  part1:
+                    plugin: nil
+                    override-build: exit 1
+                  part2:
+                    plugin: nil
+                """
+            )
+        )
+
+        raised = self.assertRaises(
+            errors.ScriptletRunError,
+            lifecycle.execute,
+            steps.BUILD,
+            project_config,
+            jobs=2,
+        )
+
+        self.assertThat(raised.scriptlet_name, Equals("override-build"))
+        self.assertThat(
+            os.path.join(self.parts_dir, "part2", "state", steps.BUILD.name),
+            FileExists(),
+        )
+
+
 class DirtyBuildScriptletTestCase(LifecycleTestBase):
     scenarios = (
         ("override-pull scriptlet", dict(scriptlet="override-pull", step=steps.PULL)),
@@ -570,17 +680,11 @@ class RecordManifestBaseTestCase(LifecycleTestBase):
         check_output_patcher.start()
         self.addCleanup(check_output_patcher.stop)
 
-        original_check_call = subprocess.check_call
-
-        def _fake_dpkg_deb(command, *args, **kwargs):
-            if "dpkg-deb" not in command:
-                return original_check_call(command, *args, **kwargs)
-
-        check_call_patcher = mock.patch(
-            "subprocess.check_call", side_effect=_fake_dpkg_deb
+        extract_deb_patcher = mock.patch(
+            "snapcraft.internal.repo._deb._extract_deb", return_value=[]
         )
-        check_call_patcher.start()
-        self.addCleanup(check_call_patcher.stop)
+        extract_deb_patcher.start()
+        self.addCleanup(extract_deb_patcher.stop)
 
         self.fake_apt_cache = fixture_setup.FakeAptCache()
         self.useFixture(self.fake_apt_cache)
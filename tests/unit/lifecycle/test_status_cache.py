@@ -16,6 +16,7 @@
 
 import os
 import textwrap
+from unittest import mock
 
 from snapcraft.internal import lifecycle, states, steps
 from snapcraft.internal.lifecycle._status_cache import StatusCache
@@ -115,3 +116,31 @@ class StatusCacheTestCase(LifecycleTestBase):
         # Now clear that step from the cache, and it should be up-to-date
         self.cache.clear_step(main_part, steps.PULL)
         self.assertTrue(self.cache.get_outdated_report(main_part, steps.PULL))
+
+    def test_dirty_reports_are_persisted(self):
+        main_part = self.project_config.parts.get_part("main")
+        lifecycle.execute(steps.PULL, self.project_config, part_names=["main"])
+        self.assertFalse(self.cache.get_dirty_report(main_part, steps.PULL))
+        self.cache.save()
+
+        cache = StatusCache(self.project_config)
+        with mock.patch.object(main_part, "get_dirty_report") as get_dirty_report_mock:
+            self.assertFalse(cache.get_dirty_report(main_part, steps.PULL))
+            get_dirty_report_mock.assert_not_called()
+
+    def test_persisted_dirty_reports_are_checked_again_once_state_changes(self):
+        main_part = self.project_config.parts.get_part("main")
+        lifecycle.execute(steps.PULL, self.project_config, part_names=["main"])
+        self.assertFalse(self.cache.get_dirty_report(main_part, steps.PULL))
+        self.cache.save()
+
+        # Make sure the state file is different.
+        pull_state_file = states.get_step_state_file(
+            main_part.plugin.statedir, steps.PULL
+        )
+        os.utime(pull_state_file, ns=(0, 0))
+
+        cache = StatusCache(self.project_config)
+        with mock.patch.object(main_part, "get_dirty_report") as get_dirty_report_mock:
+            cache.get_dirty_report(main_part, steps.PULL)
+            get_dirty_report_mock.assert_called_once_with(steps.PULL)
@@ -0,0 +1,74 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from unittest import mock
+
+from testtools.matchers import Equals, FileExists, Is, Not
+
+from snapcraft.internal.pluginhandler import _content_digests
+from snapcraft.internal.pluginhandler._content_digests import ContentDigests
+from tests import unit
+
+
+class ContentDigestsTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        os.mkdir("install")
+        with open(os.path.join("install", "1"), "w") as f:
+            f.write("1")
+        with open(os.path.join("install", "2"), "w") as f:
+            f.write("1")
+        os.symlink("1", os.path.join("install", "link"))
+
+    def test_get(self):
+        digests = ContentDigests("install", "digests")
+
+        self.assertThat(digests.get("1"), Equals(digests.get("2")))
+        self.assertThat(digests.get("link"), Is(None))
+        self.assertThat(digests.get("missing"), Is(None))
+
+        with open(os.path.join("install", "2"), "w") as f:
+            f.write("2")
+        self.assertThat(digests.get("1"), Not(Equals(digests.get("2"))))
+
+    def test_digests_are_cached(self):
+        digests = ContentDigests("install", "digests")
+        digest = digests.get("1")
+        digests.save()
+        self.assertThat("digests", FileExists())
+
+        digests = ContentDigests("install", "digests")
+        with mock.patch.object(_content_digests, "_get_digest") as get_digest_mock:
+            self.assertThat(digests.get("1"), Equals(digest))
+            get_digest_mock.assert_not_called()
+
+    def test_not_cached_without_directory(self):
+        digests = ContentDigests("install", os.path.join("missing", "digests"))
+        digests.get("1")
+        digests.save()
+
+        self.assertThat(os.path.join("missing", "digests"), Not(FileExists()))
+
+    def test_get_tree_digest(self):
+        digests = ContentDigests("install", "digests")
+        tree_digest = digests.get_tree_digest()
+        self.assertThat(digests.get_tree_digest(), Equals(tree_digest))
+
+        os.remove(os.path.join("install", "link"))
+        os.symlink("2", os.path.join("install", "link"))
+        self.assertThat(digests.get_tree_digest(), Not(Equals(tree_digest)))
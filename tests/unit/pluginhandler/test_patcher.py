@@ -13,8 +13,13 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
 from unittest import mock
 
+from testtools.matchers import Equals
+
+from snapcraft.internal import common
+from snapcraft.internal.pluginhandler import PartPatcher
 from tests import unit
 
 
@@ -60,3 +65,41 @@ class PrimeTypeAppDoesPatchingTestCase(unit.TestCase):
                 stage_packages=[],
                 stagedir=self.stage_dir,
             )
+
+
+class PartPatcherHardLinksTestCase(unit.TestCase):
+    def test_hard_links_are_patched_together(self):
+        for name in ("a", "c"):
+            open(name, "w").close()
+        os.link("a", "b")
+        elf_files = frozenset(
+            mock.Mock(path=os.path.abspath(name)) for name in ("a", "b", "c")
+        )
+        part_patcher = PartPatcher(
+            elf_files=elf_files,
+            plugin=mock.Mock(),
+            project=mock.Mock(),
+            confinement="strict",
+            core_base="core18",
+            snap_base_path="/snap/fake-name/current",
+            stage_packages=[],
+            stagedir=self.stage_dir,
+            primedir=self.prime_dir,
+        )
+
+        with mock.patch("snapcraft.internal.elf.Patcher") as patcher_mock, mock.patch(
+            "snapcraft.internal.common.map_concurrently",
+            wraps=common.map_concurrently,
+        ) as map_concurrently_mock:
+            part_patcher._patch("/lib/ld-linux.so.2")
+
+        self.assertThat(
+            [
+                [elf_file.path for elf_file in inode_elf_files]
+                for inode_elf_files in map_concurrently_mock.call_args[0][1]
+            ],
+            Equals(
+                [[os.path.abspath("a"), os.path.abspath("b")], [os.path.abspath("c")]]
+            ),
+        )
+        self.assertThat(patcher_mock().patch.call_count, Equals(3))
@@ -19,11 +19,13 @@ import copy
 import os
 import shutil
 import stat
+import sys
 import tempfile
 from collections import OrderedDict
 from textwrap import dedent
-from unittest.mock import call, Mock, MagicMock, patch
+from unittest.mock import ANY, call, Mock, MagicMock, patch
 
+import fixtures
 from testtools.matchers import Contains, Equals, FileExists, MatchesRegex, Not
 
 import snapcraft
@@ -92,6 +94,89 @@ class PluginTestCase(unit.TestCase):
             os.path.exists(os.path.join(handler.plugin.build_basedir, "file"))
         )
 
+    def test_rebuild_with_incremental_sync_keeps_build_artifacts(self):
+        handler = self.load_part(
+            "test-part", part_properties={"build-attributes": ["incremental-sync"]}
+        )
+
+        os.makedirs(handler.plugin.sourcedir)
+        for file_name in ("file1", "file2"):
+            open(os.path.join(handler.plugin.sourcedir, file_name), "w").close()
+        handler.build()
+        handler.mark_build_done()
+        open(os.path.join(handler.plugin.build_basedir, "artifact"), "w").close()
+
+        os.remove(os.path.join(handler.plugin.sourcedir, "file2"))
+        handler.clean(step=steps.BUILD)
+        handler.build()
+
+        self.assertThat(
+            os.path.join(handler.plugin.build_basedir, "artifact"), FileExists()
+        )
+        self.assertThat(
+            os.path.join(handler.plugin.build_basedir, "file1"), FileExists()
+        )
+        self.assertThat(
+            os.path.join(handler.plugin.build_basedir, "file2"), Not(FileExists())
+        )
+
+    def test_build_is_restored_from_the_build_cache(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable("SNAPCRAFT_ENABLE_BUILD_CACHE", "y")
+        )
+        self.useFixture(
+            fixtures.EnvironmentVariable(
+                "SNAPCRAFT_BUILD_CACHE_DIR", os.path.abspath("builds")
+            )
+        )
+        handler = self.load_part("test-part")
+        handler.makedirs()
+        open(os.path.join(handler.plugin.sourcedir, "file"), "w").close()
+
+        def do_build():
+            open(os.path.join(handler.plugin.installdir, "built"), "w").close()
+            handler.mark_build_done()
+
+        with patch.object(handler, "_do_build", side_effect=do_build) as mock_build:
+            handler.build()
+            handler.clean(step=steps.BUILD)
+            handler.build()
+
+        mock_build.assert_called_once_with()
+        self.assertThat(os.path.join(handler.plugin.installdir, "built"), FileExists())
+        self.assertFalse(handler.is_clean(steps.BUILD))
+
+    def test_build_cache_key_covers_the_plugin(self):
+        handler = self.load_part("test-part")
+        handler.makedirs()
+        key = handler._get_build_cache_key()
+        plugin_file = sys.modules[type(handler.plugin).__module__].__file__
+        calculate_hash = snapcraft.file_utils.calculate_hash
+
+        def edited_calculate_hash(path, *, algorithm):
+            if path == plugin_file:
+                return "edited"
+            return calculate_hash(path, algorithm=algorithm)
+
+        with patch(
+            "snapcraft.file_utils.calculate_hash", side_effect=edited_calculate_hash
+        ):
+            self.assertThat(handler._get_build_cache_key(), Not(Equals(key)))
+        self.assertThat(handler._get_build_cache_key(), Equals(key))
+
+    def test_library_paths_include_the_build_environment(self):
+        handler = self.load_part("test-part")
+        library_paths = handler._get_library_paths()
+
+        handler.build_environment = [
+            'LD_LIBRARY_PATH="/opt/lib:$LD_LIBRARY_PATH:$UNKNOWN/lib"',
+            'OTHER="/other"',
+        ]
+
+        self.assertThat(
+            handler._get_library_paths(), Equals(["/opt/lib"] + library_paths)
+        )
+
     @patch("os.path.isdir", return_value=False)
     def test_local_non_dir_source_path_must_raise_exception(self, mock_isdir):
         self.assertRaises(
@@ -537,6 +622,30 @@ class MigratableFilesetsTestCase(unit.TestCase):
         self.assertThat(files, Equals({"foo/bar/baz/3"}))
         self.assertThat(dirs, Equals({"foo", "foo/bar", "foo/bar/baz"}))
 
+    def test_migratable_filesets_wildcards_skip_hidden(self):
+        open("install/foo/.5", "w").close()
+
+        files, dirs = pluginhandler._migratable_filesets(["foo/*"], "install")
+        self.assertThat(files, Equals({"foo/2", "foo/bar/3", "foo/bar/baz/4"}))
+        self.assertThat(dirs, Equals({"foo", "foo/bar", "foo/bar/baz"}))
+
+        files, dirs = pluginhandler._migratable_filesets(["foo"], "install")
+        self.assertThat(
+            files, Equals({"foo/2", "foo/.5", "foo/bar/3", "foo/bar/baz/4"})
+        )
+
+    def test_migratable_filesets_exclude_directory(self):
+        files, dirs = pluginhandler._migratable_filesets(["*", "-foo/bar"], "install")
+        self.assertThat(files, Equals({"1", "foo/2"}))
+        self.assertThat(dirs, Equals({"foo"}))
+
+    def test_migratable_filesets_missing_path(self):
+        files, dirs = pluginhandler._migratable_filesets(
+            ["foo/2", "missing/5"], "install"
+        )
+        self.assertThat(files, Equals({"foo/2", "missing/5"}))
+        self.assertThat(dirs, Equals({"foo", "missing"}))
+
 
 class OrganizeTestCase(unit.TestCase):
 
@@ -1443,6 +1552,66 @@ class StateTestCase(StateBaseTestCase):
             "Expected 'bin/2' to remain as it's required by other parts",
         )
 
+    def test_update_stage(self):
+        bindir = os.path.join(self.handler.plugin.installdir, "bin")
+        os.makedirs(bindir)
+        for name in ("1", "2", "3"):
+            open(os.path.join(bindir, name), "w").close()
+
+        self.handler.mark_done(steps.BUILD)
+        self.handler.stage()
+
+        # Modify bin/2, remove bin/3 and add bin/4.
+        os.remove(os.path.join(bindir, "2"))
+        with open(os.path.join(bindir, "2"), "w") as f:
+            f.write("modified")
+        os.remove(os.path.join(bindir, "3"))
+        open(os.path.join(bindir, "4"), "w").close()
+
+        with patch(
+            "snapcraft.file_utils.link_or_copy",
+            wraps=snapcraft.file_utils.link_or_copy,
+        ) as link_or_copy_mock:
+            self.handler.update_stage({})
+
+        self.assertThat(
+            {args[0] for args, kwargs in link_or_copy_mock.call_args_list},
+            Equals({os.path.join(bindir, "2"), os.path.join(bindir, "4")}),
+        )
+        self.assertThat(
+            self.handler.get_stage_state().files, Equals({"bin/1", "bin/2", "bin/4"})
+        )
+        with open(os.path.join(self.stage_dir, "bin", "2")) as f:
+            self.assertThat(f.read(), Equals("modified"))
+        self.assertFalse(os.path.exists(os.path.join(self.stage_dir, "bin", "3")))
+
+    def test_update_stage_retargeted_symlink(self):
+        bindir = os.path.join(self.handler.plugin.installdir, "bin")
+        os.makedirs(bindir)
+        for name in ("1", "2"):
+            open(os.path.join(bindir, name), "w").close()
+        os.symlink("1", os.path.join(bindir, "link"))
+        os.symlink("1", os.path.join(bindir, "file"))
+
+        self.handler.mark_done(steps.BUILD)
+        self.handler.stage()
+
+        # Retarget bin/link and replace the bin/file symlink with a file.
+        os.remove(os.path.join(bindir, "link"))
+        os.symlink("2", os.path.join(bindir, "link"))
+        os.remove(os.path.join(bindir, "file"))
+        with open(os.path.join(bindir, "file"), "w") as f:
+            f.write("file")
+
+        self.handler.update_stage({})
+
+        self.assertThat(
+            os.readlink(os.path.join(self.stage_dir, "bin", "link")), Equals("2")
+        )
+        self.assertFalse(os.path.islink(os.path.join(self.stage_dir, "bin", "file")))
+        with open(os.path.join(self.stage_dir, "bin", "file")) as f:
+            self.assertThat(f.read(), Equals("file"))
+
     def test_clean_stage_old_state(self):
         self.handler.mark_done(steps.STAGE, None)
         raised = self.assertRaises(
@@ -1468,7 +1637,7 @@ class StateTestCase(StateBaseTestCase):
         self.assertThat(self.handler.latest_step(), Equals(steps.PRIME))
         self.assertRaises(errors.NoNextStepError, self.handler.next_step)
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/1", "bin/2"}
+            self.handler.primedir, {"bin/1", "bin/2"}, elf_cache=ANY
         )
         self.assertFalse(mock_copy.called)
 
@@ -1548,7 +1717,7 @@ class StateTestCase(StateBaseTestCase):
         # bin/2 shouldn't be in this list as it was already primed by another
         # part.
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/1"}
+            self.handler.primedir, {"bin/1"}, elf_cache=ANY
         )
         self.assertFalse(mock_copy.called)
 
@@ -1571,7 +1740,7 @@ class StateTestCase(StateBaseTestCase):
 
     @patch(
         "snapcraft.internal.elf.ElfFile._extract",
-        return_value=(("", "", ""), "EXEC", "", dict(), False, True),
+        return_value=(("", "", ""), "EXEC", "", dict(), False, True, [], []),
     )
     @patch("snapcraft.internal.elf.ElfFile.load_dependencies")
     @patch("snapcraft.internal.pluginhandler._migrate_files")
@@ -1608,7 +1777,7 @@ class StateTestCase(StateBaseTestCase):
         self.assertThat(self.handler.latest_step(), Equals(steps.PRIME))
         self.assertRaises(errors.NoNextStepError, self.handler.next_step)
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/1", "bin/2"}
+            self.handler.primedir, {"bin/1", "bin/2"}, elf_cache=ANY
         )
         mock_migrate_files.assert_has_calls(
             [
@@ -1644,7 +1813,7 @@ class StateTestCase(StateBaseTestCase):
 
     @patch(
         "snapcraft.internal.elf.ElfFile._extract",
-        return_value=(("", "", ""), "EXEC", "", dict(), False, True),
+        return_value=(("", "", ""), "EXEC", "", dict(), False, True, [], []),
     )
     @patch("snapcraft.internal.elf.ElfFile.load_dependencies")
     @patch("snapcraft.internal.pluginhandler._migrate_files")
@@ -1681,7 +1850,7 @@ class StateTestCase(StateBaseTestCase):
         self.assertThat(self.handler.latest_step(), Equals(steps.PRIME))
         self.assertRaises(errors.NoNextStepError, self.handler.next_step)
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/file"}
+            self.handler.primedir, {"bin/file"}, elf_cache=ANY
         )
         # Verify that only the part's files were migrated-- not the system
         # dependency.
@@ -1700,7 +1869,7 @@ class StateTestCase(StateBaseTestCase):
 
     @patch(
         "snapcraft.internal.elf.ElfFile._extract",
-        return_value=(("", "", ""), "EXEC", "", dict(), False, True),
+        return_value=(("", "", ""), "EXEC", "", dict(), False, True, [], []),
     )
     @patch(
         "snapcraft.internal.elf.ElfFile.load_dependencies",
@@ -1732,7 +1901,7 @@ class StateTestCase(StateBaseTestCase):
         self.assertThat(self.handler.latest_step(), Equals(steps.PRIME))
         self.assertRaises(errors.NoNextStepError, self.handler.next_step)
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/1", "foo/bar/baz"}
+            self.handler.primedir, {"bin/1", "foo/bar/baz"}, elf_cache=ANY
         )
         mock_migrate_files.assert_called_once_with(
             {"bin/1", "foo/bar/baz"},
@@ -1766,7 +1935,7 @@ class StateTestCase(StateBaseTestCase):
         self.assertThat(self.handler.latest_step(), Equals(steps.PRIME))
         self.assertRaises(errors.NoNextStepError, self.handler.next_step)
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/1"}
+            self.handler.primedir, {"bin/1"}, elf_cache=ANY
         )
         self.assertFalse(mock_copy.called)
 
@@ -2412,6 +2581,26 @@ class CleanTestCase(CleanBaseTestCase):
             "Expected part2's staged files to be untouched",
         )
 
+    def test_clean_stage_leaves_files_shared_with_other_parts(self):
+        handler1 = self.load_part("part1")
+        handler1.makedirs()
+        handler2 = self.load_part("part2")
+        handler2.makedirs()
+
+        os.makedirs(os.path.join(self.stage_dir, "bin"))
+        for name in ("1", "2", "shared"):
+            open(os.path.join(self.stage_dir, "bin", name), "w").close()
+        handler1.mark_stage_done({"bin/1", "bin/shared"}, {"bin"})
+        handler2.mark_stage_done({"bin/2", "bin/shared"}, {"bin"})
+
+        handler1.clean_stage(
+            {"part1": handler1.get_stage_state(), "part2": handler2.get_stage_state()}
+        )
+
+        self.assertThat(os.path.join(self.stage_dir, "bin", "1"), Not(FileExists()))
+        self.assertThat(os.path.join(self.stage_dir, "bin", "2"), FileExists())
+        self.assertThat(os.path.join(self.stage_dir, "bin", "shared"), FileExists())
+
     def test_clean_stage_after_fileset_change(self):
         # Create part1 and get it through the "build" step.
         handler = self.load_part("part1")
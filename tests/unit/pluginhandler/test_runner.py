@@ -20,7 +20,7 @@ import subprocess
 from textwrap import dedent
 
 from unittest import mock
-from testtools.matchers import Contains, FileContains, FileExists
+from testtools.matchers import Contains, Equals, FileContains, FileExists
 
 from snapcraft.internal import errors
 from snapcraft.internal.pluginhandler import _runner
@@ -76,6 +76,23 @@ class RunnerTestCase(unit.TestCase):
 
         self.assertThat(os.path.join("sourcedir", "fake-pull"), FileExists())
 
+    def test_builtin_function_called_repeatedly(self):
+        os.mkdir("builddir")
+        calls = []
+
+        runner = _runner.Runner(
+            part_properties={"override-build": "snapcraftctl build\n" * 3},
+            sourcedir="sourcedir",
+            builddir="builddir",
+            stagedir="stagedir",
+            primedir="primedir",
+            builtin_functions={"build": lambda: calls.append("build")},
+        )
+
+        runner.build()
+
+        self.assertThat(calls, Equals(["build", "build", "build"]))
+
     def test_snapcraft_utils_in_path_if_snap(self):
         self.useFixture(fixture_setup.FakeSnapcraftIsASnap())
 
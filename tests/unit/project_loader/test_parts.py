@@ -150,6 +150,37 @@ class PartOrderTestCase(ProjectLoaderBaseTest):
                 "expected_order": ["part3", "part1", "part2"],
             },
         ),
+        (
+            "diamond after",
+            {
+                "contents": dedent(
+                    """\
+                name: test
+                base: core18
+                version: "1"
+                summary: test
+                description: test
+                confinement: strict
+
+                parts:
+                  part4:
+                    plugin: nil
+                    after: [part2, part3]
+                  part2:
+                    plugin: nil
+                    after: [part1]
+                  part3:
+                    plugin: nil
+                    after: [part1]
+                  part1:
+                    plugin: nil
+                  part0:
+                    plugin: nil
+                """
+                ),
+                "expected_order": ["part0", "part1", "part2", "part3", "part4"],
+            },
+        ),
     ]
 
     def test_part_order_consistency(self):
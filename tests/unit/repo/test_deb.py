@@ -16,10 +16,12 @@
 
 import apt
 import os
+import stat
+import subprocess
 from subprocess import CalledProcessError
 from unittest.mock import ANY, DEFAULT, call, patch, MagicMock
 
-from testtools.matchers import Contains, Equals, FileExists, Not
+from testtools.matchers import Contains, Equals, FileContains, FileExists, Not
 
 import snapcraft
 from snapcraft.internal import repo
@@ -44,12 +46,12 @@ class UbuntuTestCase(RepoBaseTestCase):
         self.mock_package.candidate.fetch_binary.side_effect = _fetch_binary
         self.mock_cache.return_value.get_changes.return_value = [self.mock_package]
 
-    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binary")
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
     @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
-    def test_cache_update_failed(self, mock_apt_pkg, mock_fetch_binary):
+    def test_cache_update_failed(self, mock_apt_pkg, mock_fetch_binaries):
         fake_package_path = os.path.join(self.path, "fake-package.deb")
         open(fake_package_path, "w").close()
-        mock_fetch_binary.return_value = fake_package_path
+        mock_fetch_binaries.return_value = [fake_package_path]
         self.mock_cache().is_virtual_package.return_value = False
         self.mock_cache().update.side_effect = apt.cache.FetchFailedException()
         project_options = snapcraft.ProjectOptions()
@@ -57,12 +59,14 @@ class UbuntuTestCase(RepoBaseTestCase):
         self.assertRaises(errors.CacheUpdateFailedError, ubuntu.get, ["fake-package"])
 
     @patch("shutil.rmtree")
-    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binary")
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
     @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
-    def test_cache_hashsum_mismatch(self, mock_apt_pkg, mock_fetch_binary, mock_rmtree):
+    def test_cache_hashsum_mismatch(
+        self, mock_apt_pkg, mock_fetch_binaries, mock_rmtree
+    ):
         fake_package_path = os.path.join(self.path, "fake-package.deb")
         open(fake_package_path, "w").close()
-        mock_fetch_binary.return_value = fake_package_path
+        mock_fetch_binaries.return_value = [fake_package_path]
         self.mock_cache().is_virtual_package.return_value = False
         self.mock_cache().update.side_effect = [
             apt.cache.FetchFailedException(
@@ -89,12 +93,12 @@ class UbuntuTestCase(RepoBaseTestCase):
         self.assertThat(name, Equals("hello"))
         self.assertThat(version, Equals("2.10-1"))
 
-    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binary")
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
     @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
-    def test_get_package(self, mock_apt_pkg, mock_fetch_binary):
+    def test_get_package(self, mock_apt_pkg, mock_fetch_binaries):
         fake_package_path = os.path.join(self.path, "fake-package.deb")
         open(fake_package_path, "w").close()
-        mock_fetch_binary.return_value = fake_package_path
+        mock_fetch_binaries.return_value = [fake_package_path]
         self.mock_cache().is_virtual_package.return_value = False
 
         fake_trusted_parts_path = os.path.join(self.path, "fake-trusted-parts")
@@ -152,10 +156,10 @@ class UbuntuTestCase(RepoBaseTestCase):
         )
         self.assertThat(os.listdir(trusted_parts_dir), Equals(["trusted-part.gpg"]))
 
-    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binary")
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
     @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
-    def test_get_package_fetch_error(self, mock_apt_pkg, mock_fetch_binary):
-        mock_fetch_binary.side_effect = apt.package.FetchError("foo")
+    def test_get_package_fetch_error(self, mock_apt_pkg, mock_fetch_binaries):
+        mock_fetch_binaries.side_effect = apt.package.FetchError("foo")
         self.mock_cache().is_virtual_package.return_value = False
         project_options = snapcraft.ProjectOptions()
         ubuntu = repo.Ubuntu(self.tempdir, project_options=project_options)
@@ -164,14 +168,14 @@ class UbuntuTestCase(RepoBaseTestCase):
         )
         self.assertThat(str(raised), Equals("Package fetch error: foo"))
 
-    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binary")
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
     @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
     def test_get_package_trusted_parts_already_imported(
-        self, mock_apt_pkg, mock_fetch_binary
+        self, mock_apt_pkg, mock_fetch_binaries
     ):
         fake_package_path = os.path.join(self.path, "fake-package.deb")
         open(fake_package_path, "w").close()
-        mock_fetch_binary.return_value = fake_package_path
+        mock_fetch_binaries.return_value = [fake_package_path]
         self.mock_cache().is_virtual_package.return_value = False
 
         def _fake_find_file(key: str):
@@ -217,12 +221,12 @@ class UbuntuTestCase(RepoBaseTestCase):
             os.path.join(self.tempdir, "download", "fake-package.deb"), FileExists()
         )
 
-    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binary")
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
     @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
-    def test_get_multiarch_package(self, mock_apt_pkg, mock_fetch_binary):
+    def test_get_multiarch_package(self, mock_apt_pkg, mock_fetch_binaries):
         fake_package_path = os.path.join(self.path, "fake-package.deb")
         open(fake_package_path, "w").close()
-        mock_fetch_binary.return_value = fake_package_path
+        mock_fetch_binaries.return_value = [fake_package_path]
         self.mock_cache().is_virtual_package.return_value = False
 
         fake_trusted_parts_path = os.path.join(self.path, "fake-trusted-parts")
@@ -272,6 +276,265 @@ class UbuntuTestCase(RepoBaseTestCase):
             os.path.join(self.tempdir, "download", "fake-package.deb"), FileExists()
         )
 
+    @patch("snapcraft.internal.repo._deb.apt.package._file_is_same")
+    @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
+    def test_fetch_binaries_in_a_single_acquire(self, mock_apt_pkg, mock_file_is_same):
+        mock_file_is_same.side_effect = lambda destfile, size, md5: destfile.endswith(
+            "cached.deb"
+        )
+        mock_apt_pkg.AcquireFile.return_value.status = (
+            mock_apt_pkg.AcquireFile.return_value.STAT_DONE
+        )
+        package_candidates = []
+        for name in ("cached", "new1", "new2"):
+            package_candidate = MagicMock()
+            package_candidate._records.filename = "pool/{}.deb".format(name)
+            package_candidates.append(package_candidate)
+
+        apt_cache = repo._deb._AptCache("amd64")
+        apt_cache.progress = MagicMock()
+        paths = apt_cache.fetch_binaries(
+            package_candidates=package_candidates, destination=self.path
+        )
+
+        self.assertThat(
+            paths,
+            Equals(
+                [
+                    os.path.join(self.path, "{}.deb".format(name))
+                    for name in ("cached", "new1", "new2")
+                ]
+            ),
+        )
+        mock_apt_pkg.Acquire.assert_called_once_with(apt_cache.progress)
+        self.assertThat(mock_apt_pkg.AcquireFile.call_count, Equals(2))
+        mock_apt_pkg.Acquire.return_value.run.assert_called_once_with()
+
+    @patch("snapcraft.internal.repo._deb.apt.package._file_is_same")
+    @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
+    def test_fetch_binaries_all_cached(self, mock_apt_pkg, mock_file_is_same):
+        mock_file_is_same.return_value = True
+        package_candidate = MagicMock()
+        package_candidate._records.filename = "pool/cached.deb"
+
+        apt_cache = repo._deb._AptCache("amd64")
+        apt_cache.progress = MagicMock()
+        apt_cache.fetch_binaries(
+            package_candidates=[package_candidate], destination=self.path
+        )
+
+        mock_apt_pkg.Acquire.return_value.run.assert_not_called()
+
+    def make_fake_package(self, ubuntu):
+        package_dir = os.path.join(self.path, "package")
+        os.makedirs(os.path.join(package_dir, "DEBIAN"))
+        with open(os.path.join(package_dir, "DEBIAN", "control"), "w") as f:
+            f.write(
+                "Package: fake-package\nVersion: 1.0\nArchitecture: all\n"
+                "Maintainer: Test <test@example.com>\nDescription: test\n"
+            )
+        os.makedirs(os.path.join(package_dir, "usr", "bin"))
+        script_path = os.path.join(package_dir, "usr", "bin", "script")
+        with open(script_path, "w") as f:
+            f.write("#!/usr/bin/python3\nimport this")
+        os.chmod(script_path, 0o4755)
+        os.makedirs(os.path.join(package_dir, "usr", "lib", "pkgconfig"))
+        with open(
+            os.path.join(package_dir, "usr", "lib", "pkgconfig", "fake.pc"), "w"
+        ) as f:
+            f.write("prefix=/usr\n")
+        os.symlink("/usr/bin/script", os.path.join(package_dir, "usr", "bin", "link"))
+        os.makedirs(ubuntu._downloaddir)
+        subprocess.check_call(
+            [
+                "dpkg-deb",
+                "--build",
+                package_dir,
+                os.path.join(ubuntu._downloaddir, "fake-package.deb"),
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+
+    @patch("snapcraft.internal.repo._deb.Ubuntu.get_package_libraries")
+    def test_unpack_normalizes_members(self, mock_get_package_libraries):
+        mock_get_package_libraries.return_value = set()
+        project_options = snapcraft.ProjectOptions()
+        ubuntu = repo.Ubuntu(self.tempdir, project_options=project_options)
+        self.make_fake_package(ubuntu)
+
+        unpackdir = os.path.join(self.path, "unpack")
+        ubuntu.unpack(unpackdir)
+
+        unpacked_script_path = os.path.join(unpackdir, "usr", "bin", "script")
+        self.assertThat(
+            unpacked_script_path,
+            FileContains("#!/usr/bin/env python3\nimport this"),
+        )
+        self.assertThat(
+            stat.S_IMODE(os.stat(unpacked_script_path).st_mode), Equals(0o755)
+        )
+        self.assertThat(
+            os.path.join(unpackdir, "usr", "lib", "pkgconfig", "fake.pc"),
+            FileContains("prefix={}/usr\n".format(unpackdir)),
+        )
+        self.assertThat(
+            os.readlink(os.path.join(unpackdir, "usr", "bin", "link")),
+            Equals("script"),
+        )
+
+    @patch("snapcraft.internal.repo._deb.Ubuntu.get_package_libraries")
+    def test_unpack_from_tree_cache(self, mock_get_package_libraries):
+        mock_get_package_libraries.return_value = set()
+        project_options = snapcraft.ProjectOptions()
+        ubuntu = repo.Ubuntu(self.tempdir, project_options=project_options)
+        self.make_fake_package(ubuntu)
+        ubuntu.unpack(os.path.join(self.path, "unpack"))
+
+        unpackdir = os.path.join(self.path, "unpack-again")
+        with patch("snapcraft.internal.repo._deb._extract_deb") as mock_extract_deb:
+            ubuntu.unpack(unpackdir)
+            mock_extract_deb.assert_not_called()
+
+        self.assertThat(
+            os.path.join(unpackdir, "usr", "bin", "script"),
+            FileContains("#!/usr/bin/env python3\nimport this"),
+        )
+        self.assertThat(
+            os.path.join(unpackdir, "usr", "lib", "pkgconfig", "fake.pc"),
+            FileContains("prefix={}/usr\n".format(unpackdir)),
+        )
+        self.assertThat(
+            os.readlink(os.path.join(unpackdir, "usr", "bin", "link")),
+            Equals("script"),
+        )
+
+    def build_fake_package(self, ubuntu, name, populate):
+        package_dir = os.path.join(self.path, name)
+        os.makedirs(os.path.join(package_dir, "DEBIAN"))
+        with open(os.path.join(package_dir, "DEBIAN", "control"), "w") as f:
+            f.write(
+                "Package: {}\nVersion: 1.0\nArchitecture: all\n"
+                "Maintainer: Test <test@example.com>\n"
+                "Description: test\n".format(name)
+            )
+        populate(package_dir)
+        os.makedirs(ubuntu._downloaddir, exist_ok=True)
+        subprocess.check_call(
+            [
+                "dpkg-deb",
+                "--build",
+                package_dir,
+                os.path.join(ubuntu._downloaddir, "{}.deb".format(name)),
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+
+    def make_fake_packages_sharing_files(self, ubuntu, names):
+        for name in names:
+
+            def populate(package_dir, name=name):
+                os.makedirs(os.path.join(package_dir, "usr", "lib", "pkgconfig"))
+                with open(
+                    os.path.join(package_dir, "usr", "lib", "pkgconfig", "fake.pc"),
+                    "w",
+                ) as f:
+                    f.write("prefix=/usr\nName: {}\n".format(name))
+
+            self.build_fake_package(ubuntu, name, populate)
+
+    def make_fake_directory_package(self, ubuntu, name):
+        def populate(package_dir):
+            os.makedirs(os.path.join(package_dir, "usr", "x"))
+            open(os.path.join(package_dir, "usr", "x", "file"), "w").close()
+
+        self.build_fake_package(ubuntu, name, populate)
+
+    def make_fake_symlink_package(self, ubuntu, name):
+        def populate(package_dir):
+            os.makedirs(os.path.join(package_dir, "usr"))
+            os.symlink("y", os.path.join(package_dir, "usr", "x"))
+
+        self.build_fake_package(ubuntu, name, populate)
+
+    @patch("snapcraft.internal.repo._deb.Ubuntu.get_package_libraries")
+    def test_unpack_symlink_replacing_directory(self, mock_get_package_libraries):
+        mock_get_package_libraries.return_value = set()
+        project_options = snapcraft.ProjectOptions()
+        ubuntu = repo.Ubuntu(self.tempdir, project_options=project_options)
+        self.make_fake_directory_package(ubuntu, "a")
+        self.make_fake_symlink_package(ubuntu, "b")
+
+        for unpackdir_name in ("unpack", "unpack-from-cache"):
+            unpackdir = os.path.join(self.path, unpackdir_name)
+            ubuntu.unpack(unpackdir)
+
+            self.assertThat(
+                os.readlink(os.path.join(unpackdir, "usr", "x")), Equals("y")
+            )
+
+    @patch("snapcraft.internal.repo._deb.Ubuntu.get_package_libraries")
+    def test_unpack_directory_replacing_symlink(self, mock_get_package_libraries):
+        mock_get_package_libraries.return_value = set()
+        project_options = snapcraft.ProjectOptions()
+        ubuntu = repo.Ubuntu(self.tempdir, project_options=project_options)
+        self.make_fake_symlink_package(ubuntu, "a")
+        self.make_fake_directory_package(ubuntu, "b")
+
+        for unpackdir_name in ("unpack", "unpack-from-cache"):
+            unpackdir = os.path.join(self.path, unpackdir_name)
+            ubuntu.unpack(unpackdir)
+
+            self.assertFalse(os.path.islink(os.path.join(unpackdir, "usr", "x")))
+            self.assertThat(os.path.join(unpackdir, "usr", "x", "file"), FileExists())
+
+    @patch("snapcraft.internal.repo._deb.Ubuntu.get_package_libraries")
+    def test_unpack_shared_files_from_last_package(self, mock_get_package_libraries):
+        mock_get_package_libraries.return_value = set()
+        project_options = snapcraft.ProjectOptions()
+        ubuntu = repo.Ubuntu(self.tempdir, project_options=project_options)
+        names = ["fake-package-{}".format(i) for i in range(8)]
+        self.make_fake_packages_sharing_files(ubuntu, names)
+
+        for unpackdir_name in ("unpack", "unpack-from-cache"):
+            unpackdir = os.path.join(self.path, unpackdir_name)
+            ubuntu.unpack(unpackdir)
+
+            self.assertThat(
+                os.path.join(unpackdir, "usr", "lib", "pkgconfig", "fake.pc"),
+                FileContains(
+                    "prefix={}/usr\nName: fake-package-7\n".format(unpackdir)
+                ),
+            )
+
+    def test_tree_cache_key_depends_on_contents(self):
+        keys = set()
+        for archive in ("archive", "ppa"):
+            os.makedirs(archive)
+            path = os.path.join(archive, "fake-package_1.0_all.deb")
+            with open(path, "w") as f:
+                f.write("from {}".format(archive))
+            keys.add(repo._deb._get_tree_cache_key(path))
+
+        self.assertThat(len(keys), Equals(2))
+
+    def test_prefix_pkg_config(self):
+        self.assertThat(
+            repo._deb._prefix_pkg_config(
+                b"prefix=/usr\nexec_prefix=${prefix}\n\nprefix=/opt\n", "/root"
+            ),
+            Equals(b"prefix=/root/usr\nexec_prefix=${prefix}\n\nprefix=/root/opt\n"),
+        )
+
+    def test_unpack_invalid_package(self):
+        project_options = snapcraft.ProjectOptions()
+        ubuntu = repo.Ubuntu(self.tempdir, project_options=project_options)
+        os.makedirs(ubuntu._downloaddir)
+        open(os.path.join(ubuntu._downloaddir, "fake-package.deb"), "w").close()
+
+        self.assertRaises(
+            errors.UnpackError, ubuntu.unpack, os.path.join(self.path, "unpack")
+        )
+
     @patch("snapcraft.repo._deb._get_geoip_country_code_prefix")
     def test_sources_is_none_uses_default(self, mock_cc):
         mock_cc.return_value = "ar"
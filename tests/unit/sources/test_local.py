@@ -339,6 +339,47 @@ class TestLocalUpdate(unit.TestCase):
         local.update()
         self.assertThat(os.path.join(destination, "dir", "file2"), FileExists())
 
+    def test_directories_and_symlinks_modified(self):
+        source = "source"
+        destination = "destination"
+        for directory in ("dir1", "dir2", "dir3"):
+            os.makedirs(os.path.join(source, directory))
+        os.mkdir(destination)
+
+        # Now make a reference file with a timestamp later than the
+        # directories were created. We'll ensure this by setting it ourselves
+        open("reference", "w").close()
+        access_time = os.stat("reference").st_atime
+        modify_time = os.stat("reference").st_mtime
+        os.utime("reference", (access_time, modify_time + 1))
+
+        local = sources.Local(source, destination)
+        local.pull()
+        self.assertFalse(
+            local.check("reference"), "Expected no updates to be available"
+        )
+
+        # Now add a file to every directory, and a symlink to one of them
+        for directory in ("dir1", "dir2", "dir3"):
+            open(os.path.join(source, directory, "file"), "w").close()
+        os.symlink("dir1", os.path.join(source, "link"))
+
+        access_time = os.stat("reference").st_atime
+        modify_time = os.stat("reference").st_mtime
+        for path in ("dir1", "dir2", "dir3", "link"):
+            os.utime(
+                os.path.join(source, path),
+                (access_time, modify_time + 1),
+                follow_symlinks=False,
+            )
+
+        self.assertTrue(local.check("reference"), "Expected update to be available")
+
+        local.update()
+        for directory in ("dir1", "dir2", "dir3"):
+            self.assertThat(os.path.join(destination, directory, "file"), FileExists())
+        self.assertThat(os.path.join(destination, "link"), unit.LinkExists("dir1"))
+
 
 class TestLocalUpdateSnapcraftYaml(unit.TestCase):
 
@@ -0,0 +1,149 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+from testtools.matchers import Equals, FileExists, Not
+
+from snapcraft.internal import states, steps
+from tests import unit
+
+
+class PathIndexTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.path_index = states.PathIndex("parts")
+
+    def save_stage_state(self, part_name, files, directories):
+        state_dir = os.path.join("parts", part_name, "state")
+        os.makedirs(state_dir, exist_ok=True)
+        state = states.StageState(files, directories)
+        states.save_state(state_dir, steps.STAGE, state)
+        return state
+
+    def test_update(self):
+        state = self.save_stage_state("part1", {"bin/1", "bin/2"}, {"bin"})
+        self.path_index.update(steps.STAGE, "part1", state)
+        state = self.save_stage_state("part2", {"bin/2"}, {"bin"})
+        self.path_index.update(steps.STAGE, "part2", state)
+
+        self.assertThat(
+            self.path_index.get_owners(steps.STAGE, "bin/1", directory=False),
+            Equals({"part1"}),
+        )
+        self.assertThat(
+            self.path_index.get_owners(steps.STAGE, "bin/2", directory=False),
+            Equals({"part1", "part2"}),
+        )
+        self.assertThat(
+            self.path_index.get_owners(steps.STAGE, "bin", directory=True),
+            Equals({"part1", "part2"}),
+        )
+        self.assertThat(
+            self.path_index.get_owners(steps.STAGE, "bin", directory=False),
+            Equals(set()),
+        )
+        self.assertThat(
+            self.path_index.get_owners(steps.PRIME, "bin/1", directory=False),
+            Equals(set()),
+        )
+
+    def test_remove(self):
+        state = self.save_stage_state("part1", {"bin/1"}, {"bin"})
+        self.path_index.update(steps.STAGE, "part1", state)
+
+        self.path_index.remove(steps.STAGE, "part1")
+
+        self.assertThat(
+            self.path_index.get_owners(steps.STAGE, "bin/1", directory=False),
+            Equals(set()),
+        )
+
+    def test_remove_without_index(self):
+        self.path_index.remove(steps.STAGE, "part1")
+
+        self.assertThat(
+            os.path.join("parts", ".snapcraft_path_index"), Not(FileExists())
+        )
+
+    def test_refresh_indexes_saved_states(self):
+        self.save_stage_state("part1", {"bin/1"}, {"bin"})
+        self.save_stage_state("part2", {"bin/2"}, {"bin"})
+
+        self.assertThat(
+            self.path_index.refresh(steps.STAGE, ["part1", "part2", "part3"]),
+            Equals({"part1", "part2"}),
+        )
+        self.assertThat(
+            self.path_index.get_owners(steps.STAGE, "bin/2", directory=False),
+            Equals({"part2"}),
+        )
+
+    def test_refresh_updates_changed_states(self):
+        state = self.save_stage_state("part1", {"bin/1"}, {"bin"})
+        self.path_index.update(steps.STAGE, "part1", state)
+        self.save_stage_state("part1", {"bin/1", "bin/longer-name"}, {"bin"})
+
+        self.path_index.refresh(steps.STAGE, ["part1"])
+
+        self.assertThat(
+            self.path_index.get_owners(steps.STAGE, "bin/longer-name", directory=False),
+            Equals({"part1"}),
+        )
+
+    def test_refresh_removes_cleaned_states(self):
+        state = self.save_stage_state("part1", {"bin/1"}, {"bin"})
+        self.path_index.update(steps.STAGE, "part1", state)
+        os.remove(os.path.join("parts", "part1", "state", "stage"))
+
+        self.assertThat(self.path_index.refresh(steps.STAGE, ["part1"]), Equals(set()))
+        self.assertThat(
+            self.path_index.get_owners(steps.STAGE, "bin/1", directory=False),
+            Equals(set()),
+        )
+
+    def test_get_shared_paths(self):
+        self.save_stage_state("part1", {"bin/1", "bin/2"}, {"bin"})
+        self.save_stage_state("part2", {"bin/2"}, {"bin"})
+        self.save_stage_state("part3", {"bin/1"}, {"bin"})
+        self.path_index.refresh(steps.STAGE, ["part1", "part2", "part3"])
+
+        self.assertThat(
+            self.path_index.get_shared_paths(
+                steps.STAGE, {"bin/1", "bin/2"}, directory=False, part_names={"part2"}
+            ),
+            Equals({"bin/2"}),
+        )
+        self.assertThat(
+            self.path_index.get_shared_paths(
+                steps.STAGE, {"bin"}, directory=True, part_names={"part2", "part3"}
+            ),
+            Equals({"bin"}),
+        )
+
+    def test_corrupt_index_is_rebuilt(self):
+        self.save_stage_state("part1", {"bin/1"}, {"bin"})
+        os.makedirs("parts", exist_ok=True)
+        with open(os.path.join("parts", ".snapcraft_path_index"), "w") as f:
+            f.write("not an index")
+
+        self.path_index.refresh(steps.STAGE, ["part1"])
+
+        self.assertThat(
+            self.path_index.get_owners(steps.STAGE, "bin/1", directory=False),
+            Equals({"part1"}),
+        )
@@ -0,0 +1,85 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from testtools.matchers import Equals, Is, StartsWith
+
+from snapcraft import yaml_utils
+from snapcraft.internal import states, steps
+from snapcraft.internal.states import _state_file
+from tests import unit
+
+
+class StateFileTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.files = {"usr/bin/foo", "usr/lib/libfoo.so.1", "foo\nbar", "ü"}
+        self.directories = {"usr", "usr/bin", "usr/lib"}
+        self.state = states.PrimeState(
+            self.files, self.directories, {"usr/lib"}, {"prime": ["usr"]}
+        )
+
+    def test_path_sets_round_trip(self):
+        data = _state_file.dump(self.state)
+        self.assertThat(data, StartsWith(b"SNAPCRAFT-STATE 1\n"))
+
+        state = _state_file.load(data)
+        self.assertThat(state, Equals(self.state))
+        self.assertThat(state.files, Equals(self.files))
+        self.assertThat(state.dependency_paths, Equals({"usr/lib"}))
+        self.assertThat(
+            state.properties, Equals({"override-prime": None, "prime": ["usr"]})
+        )
+        self.assertThat(_state_file.dump(state), Equals(data))
+
+    def test_path_lookups(self):
+        state = _state_file.load(_state_file.dump(self.state))
+
+        for path in self.files:
+            self.assertTrue(path in state.files, path)
+        for path in ["usr", "usr/bin/fo", "usr/bin/foo/", "foo", "zzz", "", 1]:
+            self.assertFalse(path in state.files, path)
+
+    def test_path_set_operations_return_sets(self):
+        state = _state_file.load(_state_file.dump(self.state))
+
+        files = state.files - {"usr/bin/foo"}
+        self.assertThat(type(files), Is(set))
+        self.assertThat(files, Equals({"usr/lib/libfoo.so.1", "foo\nbar", "ü"}))
+
+    def test_empty_path_sets(self):
+        state = states.StageState(set(), set(), {"stage": ["*"]})
+
+        self.assertThat(_state_file.load(_state_file.dump(state)).files, Equals(set()))
+
+    def test_states_without_path_sets_are_yaml(self):
+        data = _state_file.dump({"foo": "bar"})
+
+        self.assertThat(data, Equals(b"foo: bar\n"))
+        self.assertThat(_state_file.load(data), Equals({"foo": "bar"}))
+
+    def test_load_yaml(self):
+        data = yaml_utils.dump(self.state).encode()
+
+        self.assertThat(_state_file.load(data), Equals(self.state))
+
+    def test_load_empty(self):
+        self.assertThat(_state_file.load(b""), Is(None))
+
+    def test_save_state(self):
+        states.save_state(".", steps.PRIME, self.state)
+
+        self.assertThat(states.get_state(".", steps.PRIME), Equals(self.state))
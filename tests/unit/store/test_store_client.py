@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import concurrent.futures
 import json
 import logging
 import os
@@ -23,9 +24,11 @@ from unittest import mock
 
 import fixtures
 import pymacaroons
+import requests
 from testtools.matchers import Contains, Equals
 
 from snapcraft import config, storeapi, ProjectOptions
+from snapcraft.internal.errors import SnapcraftEnvironmentError
 from snapcraft.storeapi import errors, constants
 import tests
 from tests import fixture_setup, unit
@@ -974,6 +977,108 @@ class UploadTestCase(StoreTestCase):
             ),
         )
 
+    def test_upload_snap_in_chunks(self):
+        self.useFixture(fixtures.EnvironmentVariable("STORE_UPLOAD_CHUNK_SIZE", "1000"))
+        self.client.login("dummy", "test correct password")
+        self.client.register("test-snap")
+        tracker = self.client.upload("test-snap", self.snap_path)
+        result = tracker.track()
+        self.assertThat(result["code"], Equals("ready_to_release"))
+
+        upload_server = self.fake_store.fake_store_upload_server_fixture.server
+        (upload,) = upload_server.chunked_uploads.values()
+        with open(self.snap_path, "rb") as snap_file:
+            self.assertThat(
+                b"".join(chunk for _, chunk in sorted(upload["chunks"].items())),
+                Equals(snap_file.read()),
+            )
+
+    def test_upload_snap_in_chunks_resumes(self):
+        self.useFixture(fixtures.EnvironmentVariable("STORE_UPLOAD_CHUNK_SIZE", "1000"))
+        self.useFixture(fixtures.EnvironmentVariable("STORE_UPLOAD_WORKERS", "1"))
+        self.client.login("dummy", "test correct password")
+        self.client.register("test-snap")
+
+        upload_chunk = storeapi._up_down_client.UpDownClient.upload_chunk
+        offsets = []
+        interrupted = []
+
+        def interrupted_upload_chunk(updown_client, upload_id, chunk, **kwargs):
+            offsets.append(kwargs["offset"])
+            # The connection drops the first time the third chunk is sent.
+            if kwargs["offset"] == 2000 and not interrupted:
+                interrupted.append(True)
+                raise errors.StoreNetworkError(Exception("Connection reset"))
+            return upload_chunk(updown_client, upload_id, chunk, **kwargs)
+
+        with mock.patch.object(
+            storeapi._up_down_client.UpDownClient,
+            "upload_chunk",
+            new=interrupted_upload_chunk,
+        ):
+            self.assertRaises(
+                errors.StoreNetworkError, self.client.upload, "test-snap", self.snap_path
+            )
+            # No more chunks are uploaded once one fails.
+            self.assertThat(offsets, Equals([0, 1000, 2000]))
+            # Only the chunks that were not received are uploaded again.
+            del offsets[:]
+            tracker = self.client.upload("test-snap", self.snap_path)
+
+        self.assertThat(
+            offsets, Equals(list(range(2000, os.path.getsize(self.snap_path), 1000)))
+        )
+        self.assertThat(tracker.track()["code"], Equals("ready_to_release"))
+        upload_server = self.fake_store.fake_store_upload_server_fixture.server
+        self.assertThat(len(upload_server.chunked_uploads), Equals(1))
+
+    def test_upload_snap_in_chunks_workers_capped_to_pool_size(self):
+        self.useFixture(fixtures.EnvironmentVariable("STORE_UPLOAD_CHUNK_SIZE", "1000"))
+        self.useFixture(fixtures.EnvironmentVariable("STORE_UPLOAD_WORKERS", "100"))
+        self.client.login("dummy", "test correct password")
+        self.client.register("test-snap")
+
+        with mock.patch(
+            "concurrent.futures.ThreadPoolExecutor",
+            wraps=concurrent.futures.ThreadPoolExecutor,
+        ) as executor_mock:
+            tracker = self.client.upload("test-snap", self.snap_path)
+
+        executor_mock.assert_called_once_with(
+            max_workers=requests.adapters.DEFAULT_POOLSIZE
+        )
+        self.assertThat(tracker.track()["code"], Equals("ready_to_release"))
+
+    def test_upload_snap_in_chunks_invalid_chunk_size(self):
+        self.useFixture(fixtures.EnvironmentVariable("STORE_UPLOAD_CHUNK_SIZE", "big"))
+        self.client.login("dummy", "test correct password")
+        self.client.register("test-snap")
+
+        raised = self.assertRaises(
+            SnapcraftEnvironmentError, self.client.upload, "test-snap", self.snap_path
+        )
+        self.assertThat(
+            str(raised),
+            Equals(
+                "STORE_UPLOAD_CHUNK_SIZE is set to 'big', it must be a positive "
+                "number."
+            ),
+        )
+
+    def test_upload_snap_in_chunks_no_workers(self):
+        self.useFixture(fixtures.EnvironmentVariable("STORE_UPLOAD_CHUNK_SIZE", "1000"))
+        self.useFixture(fixtures.EnvironmentVariable("STORE_UPLOAD_WORKERS", "0"))
+        self.client.login("dummy", "test correct password")
+        self.client.register("test-snap")
+
+        raised = self.assertRaises(
+            SnapcraftEnvironmentError, self.client.upload, "test-snap", self.snap_path
+        )
+        self.assertThat(
+            str(raised),
+            Equals("STORE_UPLOAD_WORKERS is set to '0', it must be a positive number."),
+        )
+
     def test_upload_with_invalid_credentials_raises_exception(self):
         conf = config.Config()
         conf.set("macaroon", 'inval"id')
@@ -200,3 +200,22 @@ class FormatSnapFileNameErrorTest(unit.TestCase):
         # fact that version is not allowed.
         snap = dict(name="name")
         self.assertRaises(KeyError, common.format_snap_name, snap)
+
+
+class MapConcurrentlyTestCase(unit.TestCase):
+    def test_results_are_in_order(self):
+        self.assertThat(
+            common.map_concurrently(lambda i: i * 2, range(100)),
+            Equals([i * 2 for i in range(100)]),
+        )
+
+    def test_first_error_is_raised(self):
+        def _fail_on_odd(i):
+            if i % 2:
+                raise ValueError(i)
+            return i
+
+        raised = self.assertRaises(
+            ValueError, common.map_concurrently, _fail_on_odd, range(10)
+        )
+        self.assertThat(raised.args, Equals((1,)))
@@ -19,7 +19,15 @@ import os
 import tempfile
 import sys
 
-from testtools.matchers import Contains, EndsWith, Equals, NotEquals, StartsWith
+from testtools.matchers import (
+    Contains,
+    EndsWith,
+    Equals,
+    Is,
+    Not,
+    NotEquals,
+    StartsWith,
+)
 from unittest import mock
 
 from snapcraft.internal import errors, elf
@@ -142,6 +150,23 @@ class TestGetLibraries(TestElfBase):
             Equals(set([self.fake_elf.root_libraries["foo.so.1"], "/lib/bar.so.2"])),
         )
 
+    def test_get_libraries_fills_soname_cache(self):
+        elf_file = self.fake_elf["fake_elf-2.23"]
+
+        arch = ("ELFCLASS64", "ELFDATA2LSB", "EM_X86_64")
+        soname_cache = elf.SonameCache()
+        elf_file.load_dependencies(
+            root_path=self.fake_elf.root_path,
+            core_base_path=self.fake_elf.core_base_path,
+            soname_cache=soname_cache,
+        )
+
+        self.assertThat(
+            soname_cache[arch, "foo.so.1"],
+            Equals(self.fake_elf.root_libraries["foo.so.1"]),
+        )
+        self.assertThat(soname_cache[arch, "bar.so.2"], Equals(None))
+
     def test_primed_libraries_are_preferred(self):
         elf_file = self.fake_elf["fake_elf-2.23"]
         libs = elf_file.load_dependencies(
@@ -200,6 +225,129 @@ class TestGetLibraries(TestElfBase):
         )
 
 
+class TestLibraryResolver(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.arch = ("ELFCLASS64", "ELFDATA2LSB", "EM_X86_64")
+        self.elf_data = dict()
+
+        def _fake_extract(elf_file, path):
+            return self.elf_data[os.path.basename(path)]
+
+        patcher = mock.patch.object(elf.ElfFile, "_extract", _fake_extract)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(
+            elf.LibraryResolver, "_get_system_paths", return_value=[]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _make_elf(self, path, *, needed=None, rpath=None, runpath=None, arch=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"\x7fELF")
+
+        needed_libraries = {n: elf.NeededLibrary(name=n) for n in needed or []}
+        self.elf_data[os.path.basename(path)] = (
+            arch or self.arch,
+            "",
+            "",
+            needed_libraries,
+            False,
+            True,
+            rpath or [],
+            runpath or [],
+        )
+        return path
+
+    def test_resolve(self):
+        app = self._make_elf(
+            os.path.join(self.path, "bin", "app"),
+            needed=["libfoo.so.1", "libbar.so.2", "libmissing.so.1"],
+            rpath=["$ORIGIN/../app-libs"],
+        )
+        libfoo = self._make_elf(
+            os.path.join(self.path, "lib", "libfoo.so.1"), needed=["libbaz.so.3"]
+        )
+        libbar = self._make_elf(os.path.join(self.path, "app-libs", "libbar.so.2"))
+        libbaz = self._make_elf(os.path.join(self.path, "other", "libbaz.so.3"))
+
+        resolver = elf.LibraryResolver(
+            library_paths=[
+                os.path.join(self.path, "lib"),
+                os.path.join(self.path, "other"),
+            ]
+        )
+
+        self.assertThat(
+            resolver.resolve(elf.ElfFile(path=app)),
+            Equals(
+                [
+                    ("libfoo.so.1", libfoo),
+                    ("libbar.so.2", libbar),
+                    ("libmissing.so.1", ""),
+                    ("libbaz.so.3", libbaz),
+                ]
+            ),
+        )
+
+    def test_runpath_disables_rpath(self):
+        rpath_dir = os.path.join(self.path, "rpath")
+        runpath_dir = os.path.join(self.path, "runpath")
+        app = self._make_elf(
+            os.path.join(self.path, "app"),
+            needed=["libfoo.so.1"],
+            rpath=[rpath_dir],
+            runpath=[runpath_dir],
+        )
+        self._make_elf(os.path.join(rpath_dir, "libfoo.so.1"))
+        libfoo = self._make_elf(os.path.join(runpath_dir, "libfoo.so.1"))
+
+        resolver = elf.LibraryResolver(library_paths=[])
+
+        self.assertThat(
+            resolver.resolve(elf.ElfFile(path=app)), Equals([("libfoo.so.1", libfoo)])
+        )
+
+    def test_other_architectures_are_skipped(self):
+        app = self._make_elf(os.path.join(self.path, "app"), needed=["libfoo.so.1"])
+        self._make_elf(
+            os.path.join(self.path, "arm", "libfoo.so.1"),
+            arch=("ELFCLASS32", "ELFDATA2LSB", "EM_ARM"),
+        )
+
+        resolver = elf.LibraryResolver(library_paths=[os.path.join(self.path, "arm")])
+
+        self.assertThat(
+            resolver.resolve(elf.ElfFile(path=app)), Equals([("libfoo.so.1", "")])
+        )
+
+    def test_load_dependencies(self):
+        root_path = os.path.join(self.path, "root")
+        app = self._make_elf(
+            os.path.join(root_path, "bin", "app"), needed=["libfoo.so.1"]
+        )
+        libfoo = self._make_elf(os.path.join(root_path, "lib", "libfoo.so.1"))
+
+        elf_file = elf.ElfFile(path=app)
+        libs = elf_file.load_dependencies(
+            root_path=root_path,
+            core_base_path=os.path.join(self.path, "core"),
+            library_resolver=elf.LibraryResolver(
+                library_paths=[os.path.join(root_path, "lib")]
+            ),
+        )
+
+        self.assertThat(libs, Equals({libfoo}))
+        self.assertThat(
+            [(l.soname, l.path) for l in elf_file.dependencies],
+            Equals([("libfoo.so.1", libfoo)]),
+        )
+
+
 class TestGetElfFiles(TestElfBase):
     def test_get_elf_files(self):
         elf_files = elf.get_elf_files(self.fake_elf.root_path, {"fake_elf-2.23"})
@@ -366,6 +514,144 @@ class TestSonameCache(unit.TestCase):
         self.assertTrue((self.arch, "soname2.so") in self.soname_cache)
 
 
+class TestSonameIndex(TestElfBase):
+    def setUp(self):
+        super().setUp()
+        self.arch = ("ELFCLASS64", "ELFDATA2LSB", "EM_X86_64")
+        self.index_dir = self.useFixture(fixtures.TempDir()).path
+
+    def test_find(self):
+        index = elf.SonameCache().get_index(self.fake_elf.root_path)
+
+        self.assertThat(
+            index.find(self.arch, "foo.so.1"),
+            Equals(self.fake_elf.root_libraries["foo.so.1"]),
+        )
+        self.assertThat(index.find(self.arch, "missing.so.1"), Equals(None))
+        self.assertThat(
+            index.find(("ELFCLASS32", "ELFDATA2LSB", "EM_386"), "foo.so.1"),
+            Equals(None),
+        )
+
+    def test_update_index(self):
+        soname_cache = elf.SonameCache()
+        index = soname_cache.get_index(self.fake_elf.root_path)
+
+        new_library = os.path.join(self.fake_elf.root_path, "new.so.1")
+        with open(new_library, "wb") as f:
+            f.write(b"\x7fELF")
+        self.assertThat(index.find(self.arch, "new.so.1"), Equals(None))
+
+        soname_cache.update_index(self.fake_elf.root_path, [new_library])
+        self.assertThat(index.find(self.arch, "new.so.1"), Equals(new_library))
+
+    def test_removed_libraries_are_not_found(self):
+        index = elf.SonameCache().get_index(self.fake_elf.root_path)
+
+        os.remove(self.fake_elf.root_libraries["foo.so.1"])
+
+        self.assertThat(index.find(self.arch, "foo.so.1"), Equals(None))
+
+    def test_persisted_index(self):
+        elf.SonameCache(index_dir=self.index_dir).get_index(
+            self.fake_elf.root_path, persist=True
+        )
+
+        with mock.patch("snapcraft.internal.elf._walk_files") as walk_mock:
+            index = elf.SonameCache(index_dir=self.index_dir).get_index(
+                self.fake_elf.root_path, persist=True
+            )
+
+        walk_mock.assert_not_called()
+        self.assertThat(
+            index.find(self.arch, "foo.so.1"),
+            Equals(self.fake_elf.root_libraries["foo.so.1"]),
+        )
+
+    def test_persisted_index_is_shared(self):
+        index = elf.SonameCache().get_index(self.fake_elf.root_path, persist=True)
+
+        self.assertThat(
+            elf.SonameCache().get_index(self.fake_elf.root_path, persist=True),
+            Is(index),
+        )
+        self.assertThat(
+            elf.SonameCache().get_index(self.fake_elf.root_path), Not(Is(index))
+        )
+
+    def test_index_not_persisted_by_default(self):
+        elf.SonameCache(index_dir=self.index_dir).get_index(self.fake_elf.root_path)
+
+        self.assertThat(os.listdir(self.index_dir), Equals([]))
+
+
+class TestElfCache(TestElfBase):
+    def setUp(self):
+        super().setUp()
+
+        self.cache_path = os.path.join(self.path, "elf-cache")
+        self.elf_path = self.fake_elf["fake_elf-2.23"].path
+
+    def _assert_same_elf_data(self, elf_file, other_elf_file):
+        self.assertThat(elf_file.arch, Equals(other_elf_file.arch))
+        self.assertThat(elf_file.interp, Equals(other_elf_file.interp))
+        self.assertThat(elf_file.soname, Equals(other_elf_file.soname))
+        self.assertThat(elf_file.execstack_set, Equals(other_elf_file.execstack_set))
+        self.assertThat(elf_file.is_dynamic, Equals(other_elf_file.is_dynamic))
+        self.assertThat(
+            {name: lib.versions for name, lib in elf_file.needed.items()},
+            Equals({name: lib.versions for name, lib in other_elf_file.needed.items()}),
+        )
+
+    def test_hit_in_memory(self):
+        elf_cache = elf.ElfCache()
+
+        elf_file = elf.ElfFile(path=self.elf_path, elf_cache=elf_cache)
+        cached_elf_file = elf.ElfFile(path=self.elf_path, elf_cache=elf_cache)
+
+        self.assertThat(elf_cache.misses, Equals(1))
+        self.assertThat(elf_cache.hits, Equals(1))
+        self._assert_same_elf_data(elf_file, cached_elf_file)
+
+    def test_hit_after_save(self):
+        elf_cache = elf.ElfCache(cache_path=self.cache_path)
+        elf_file = elf.ElfFile(path=self.elf_path, elf_cache=elf_cache)
+        elf_cache.save()
+
+        elf_cache = elf.ElfCache(cache_path=self.cache_path)
+        with mock.patch.object(elf.ElfFile, "_extract") as extract_mock:
+            cached_elf_file = elf.ElfFile(path=self.elf_path, elf_cache=elf_cache)
+
+        extract_mock.assert_not_called()
+        self.assertThat(elf_cache.hits, Equals(1))
+        self.assertThat(elf_cache.misses, Equals(0))
+        self._assert_same_elf_data(elf_file, cached_elf_file)
+
+    def test_miss_for_modified_file(self):
+        elf_cache = elf.ElfCache(cache_path=self.cache_path)
+        elf.ElfFile(path=self.elf_path, elf_cache=elf_cache)
+        elf_cache.save()
+
+        stat = os.stat(self.elf_path)
+        os.utime(self.elf_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+        elf_cache = elf.ElfCache(cache_path=self.cache_path)
+        elf.ElfFile(path=self.elf_path, elf_cache=elf_cache)
+
+        self.assertThat(elf_cache.hits, Equals(0))
+        self.assertThat(elf_cache.misses, Equals(1))
+
+    def test_get_elf_files_uses_cache(self):
+        elf_cache = elf.ElfCache()
+        file_list = [os.path.basename(self.elf_path)]
+
+        elf.get_elf_files(self.fake_elf.root_path, file_list, elf_cache=elf_cache)
+        elf.get_elf_files(self.fake_elf.root_path, file_list, elf_cache=elf_cache)
+
+        self.assertThat(elf_cache.misses, Equals(1))
+        self.assertThat(elf_cache.hits, Equals(1))
+
+
 class TestSonameCacheErrors(unit.TestCase):
 
     scenarios = (
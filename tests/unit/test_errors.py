@@ -690,6 +690,26 @@ class ErrorFormattingTestCase(unit.TestCase):
                 ),
             },
         ),
+        (
+            "InvalidSquashfsError",
+            {
+                "exception": errors.InvalidSquashfsError,
+                "kwargs": {"path": "my-snap.snap"},
+                "expected_message": (
+                    "'my-snap.snap' does not hold a valid squashfs filesystem."
+                ),
+            },
+        ),
+        (
+            "SquashfsCompressionNotSupportedError",
+            {
+                "exception": errors.SquashfsCompressionNotSupportedError,
+                "kwargs": {"path": "my-snap.snap", "compression": "lzo"},
+                "expected_message": (
+                    "Reading 'my-snap.snap' compressed with lzo is not supported."
+                ),
+            },
+        ),
         (
             "CacheUpdateFailedError",
             {
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import hashlib
 import os
 import re
 import subprocess
@@ -22,7 +23,7 @@ from unittest import mock
 import fixtures
 import testtools
 import testscenarios
-from testtools.matchers import Equals
+from testtools.matchers import DirExists, Equals, FileContains, FileExists, Not
 
 from snapcraft import file_utils
 from snapcraft.internal.errors import (
@@ -190,6 +191,119 @@ class TestLinkOrCopy(unit.TestCase):
         self.assertTrue(os.path.isfile("foo2/bar/baz/4"))
 
 
+class TestCopy(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        with open("source", "w") as f:
+            f.write("contents")
+        os.chmod("source", 0o755)
+
+    def _assert_copied(self):
+        with open("destination") as f:
+            self.assertThat(f.read(), Equals("contents"))
+        self.assertThat(os.stat("destination").st_mode & 0o777, Equals(0o755))
+
+    def test_copy_method_copy(self):
+        self.useFixture(fixtures.EnvironmentVariable("SNAPCRAFT_COPY_METHOD", "copy"))
+        file_utils.reset_copy_counts()
+
+        with mock.patch("fcntl.ioctl") as mock_ioctl:
+            file_utils.copy("source", "destination")
+
+        mock_ioctl.assert_not_called()
+        self._assert_copied()
+        self.assertThat(file_utils.get_copy_counts(), Equals({"copy": 1}))
+
+        file_utils.reset_copy_counts()
+        self.assertThat(file_utils.get_copy_counts(), Equals({}))
+
+    def test_reflink_failure_falls_back(self):
+        with mock.patch("fcntl.ioctl", side_effect=OSError()) as mock_ioctl:
+            file_utils.copy("source", "destination")
+
+        mock_ioctl.assert_called_once_with(mock.ANY, file_utils._FICLONE, mock.ANY)
+        self._assert_copied()
+
+    def test_symlinks_are_not_followed(self):
+        os.symlink("source", "link")
+
+        file_utils.copy("link", "destination")
+
+        self.assertThat("destination", unit.LinkExists("source"))
+
+    def test_invalid_copy_method(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable("SNAPCRAFT_COPY_METHOD", "invalid")
+        )
+
+        self.assertRaises(
+            SnapcraftEnvironmentError, file_utils.copy, "source", "destination"
+        )
+
+
+class TestSyncTree(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        os.makedirs(os.path.join("source", "dir"))
+        with open(os.path.join("source", "dir", "1"), "w") as f:
+            f.write("1")
+        with open(os.path.join("source", "2"), "w") as f:
+            f.write("2")
+        os.symlink("dir", os.path.join("source", "link"))
+
+        self.synced_paths = file_utils.sync_tree("source", "destination")
+
+    def test_sync(self):
+        self.assertThat(self.synced_paths, Equals({"dir", "dir/1", "2", "link"}))
+        self.assertThat(os.path.join("destination", "dir", "1"), FileContains("1"))
+        self.assertThat(os.path.join("destination", "2"), FileContains("2"))
+        self.assertThat(os.path.join("destination", "link"), unit.LinkExists("dir"))
+
+    def test_only_changed_files_are_copied(self):
+        with open(os.path.join("source", "2"), "w") as f:
+            f.write("22")
+
+        copy_function = mock.Mock(wraps=file_utils.copy)
+        file_utils.sync_tree(
+            "source",
+            "destination",
+            synced_paths=self.synced_paths,
+            copy_function=copy_function,
+        )
+
+        copy_function.assert_called_once_with(
+            os.path.join("source", "2"), os.path.join("destination", "2")
+        )
+        self.assertThat(os.path.join("destination", "2"), FileContains("22"))
+
+    def test_removed_files_are_removed(self):
+        os.remove(os.path.join("source", "dir", "1"))
+        os.rmdir(os.path.join("source", "dir"))
+        with open(os.path.join("destination", "artifact"), "w") as f:
+            f.write("artifact")
+
+        synced_paths = file_utils.sync_tree(
+            "source", "destination", synced_paths=self.synced_paths
+        )
+
+        self.assertThat(synced_paths, Equals({"2", "link"}))
+        self.assertThat(os.path.join("destination", "dir"), Not(DirExists()))
+        self.assertThat(os.path.join("destination", "artifact"), FileExists())
+
+    def test_directories_with_other_files_are_kept(self):
+        os.remove(os.path.join("source", "dir", "1"))
+        os.rmdir(os.path.join("source", "dir"))
+        with open(os.path.join("destination", "dir", "artifact"), "w") as f:
+            f.write("artifact")
+
+        file_utils.sync_tree("source", "destination", synced_paths=self.synced_paths)
+
+        self.assertThat(os.path.join("destination", "dir", "1"), Not(FileExists()))
+        self.assertThat(os.path.join("destination", "dir", "artifact"), FileExists())
+
+
 class ExecutableExistsTestCase(unit.TestCase):
     def test_file_does_not_exist(self):
         workdir = self.useFixture(fixtures.TempDir()).path
@@ -326,6 +440,61 @@ class RequiresPathExistsTestCase(unit.TestCase):
         self.assertThat(str(raised), Equals("what? 'foo'"))
 
 
+class CalculateDigestsTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        # Spanning a few of the chunks the file is read in.
+        self.contents = b"".join(bytes([i]) * 2 ** 20 for i in range(3)) + b"tail"
+        with open("file", "wb") as f:
+            f.write(self.contents)
+
+    def test_calculate_digests(self):
+        self.assertThat(
+            file_utils.calculate_digests("file", algorithms=["sha256", "sha512"]),
+            Equals(
+                {
+                    "sha256": hashlib.sha256(self.contents).hexdigest(),
+                    "sha512": hashlib.sha512(self.contents).hexdigest(),
+                }
+            ),
+        )
+
+    def test_calculate_digests_without_mapping(self):
+        with mock.patch("mmap.mmap", side_effect=OverflowError):
+            self.assertThat(
+                file_utils.calculate_digests("file", algorithms=["sha256"]),
+                Equals({"sha256": hashlib.sha256(self.contents).hexdigest()}),
+            )
+
+    def test_calculate_digests_of_empty_file(self):
+        open("empty", "w").close()
+
+        self.assertThat(
+            file_utils.calculate_hash("empty", algorithm="sha256"),
+            Equals(hashlib.sha256().hexdigest()),
+        )
+
+    def test_calculate_digests_reads_once(self):
+        with mock.patch(
+            "snapcraft.file_utils._calculate_digests",
+            wraps=file_utils._calculate_digests,
+        ) as calculate_mock:
+            file_utils.calculate_digests("file", algorithms=["sha256", "sha512"])
+            file_utils.calculate_hash("file", algorithm="sha256")
+            file_utils.calculate_hash(os.path.abspath("file"), algorithm="sha512")
+            self.assertThat(calculate_mock.call_count, Equals(1))
+
+            # Until the file changes.
+            with open("file", "ab") as f:
+                f.write(b"more")
+            self.assertThat(
+                file_utils.calculate_hash("file", algorithm="sha256"),
+                Equals(hashlib.sha256(self.contents + b"more").hexdigest()),
+            )
+            self.assertThat(calculate_mock.call_count, Equals(2))
+
+
 class TestGetLinkerFromFile(unit.TestCase):
     def test_get_linker_version_from_basename(self):
         self.assertThat(
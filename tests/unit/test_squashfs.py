@@ -0,0 +1,155 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import subprocess
+from unittest import mock
+
+from testtools.matchers import Contains, Equals, Is
+
+import tests
+from snapcraft.internal import errors, squashfs
+from tests import unit
+
+
+def _get_test_snap(name):
+    return os.path.join(os.path.dirname(tests.__file__), "data", name)
+
+
+class SquashfsFileTestCase(unit.TestCase):
+    def test_read(self):
+        with squashfs.SquashfsFile(_get_test_snap("test-snap-with-icon.snap")) as snap:
+            self.assertThat(snap.read("meta/snap.yaml"), Contains(b"name: basic\n"))
+            self.assertThat(
+                snap.read("/meta/gui/icon.svg"),
+                Equals(
+                    b'<svg width="256" height="256">\n'
+                    b'<rect width="256" height="256" style="fill:rgb(0,0,255)" />\n'
+                    b"</svg>"
+                ),
+            )
+
+    def test_read_not_a_regular_file(self):
+        with squashfs.SquashfsFile(_get_test_snap("test-snap.snap")) as snap:
+            self.assertThat(snap.read("meta/gui/icon.png"), Is(None))
+            self.assertThat(snap.read("meta/snap.yaml/icon.png"), Is(None))
+            self.assertThat(snap.read("meta"), Is(None))
+
+    def test_invalid(self):
+        self.assertRaises(
+            errors.InvalidSquashfsError,
+            squashfs.SquashfsFile,
+            _get_test_snap("invalid.snap"),
+        )
+
+    def test_corrupt(self):
+        with open(_get_test_snap("test-snap.snap"), "rb") as f:
+            contents = f.read()
+        with open("corrupt.snap", "wb") as f:
+            f.write(contents[:400])
+
+        with squashfs.SquashfsFile("corrupt.snap") as snap:
+            self.assertRaises(errors.InvalidSquashfsError, snap.read, "meta/snap.yaml")
+
+    def test_compression_not_supported(self):
+        shutil.copyfile(_get_test_snap("test-snap.snap"), "lzo.snap")
+        # The compression id follows the magic and 4 other fields.
+        with open("lzo.snap", "r+b") as f:
+            f.seek(20)
+            f.write(b"\x03\x00")
+
+        raised = self.assertRaises(
+            errors.SquashfsCompressionNotSupportedError,
+            squashfs.SquashfsFile,
+            "lzo.snap",
+        )
+        self.assertThat(raised.compression, Equals("lzo"))
+
+
+class ReadSnapFileTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        shutil.copyfile(_get_test_snap("test-snap.snap"), "test-snap.snap")
+
+    def test_read_snap_file_is_memoized(self):
+        with mock.patch(
+            "snapcraft.internal.squashfs.SquashfsFile", wraps=squashfs.SquashfsFile
+        ) as squashfs_mock:
+            snap_yaml = squashfs.read_snap_file("test-snap.snap", "meta/snap.yaml")
+            self.assertThat(
+                squashfs.read_snap_file("test-snap.snap", "meta/snap.yaml"),
+                Equals(snap_yaml),
+            )
+            self.assertThat(squashfs_mock.call_count, Equals(1))
+
+            # Until the snap changes.
+            shutil.copyfile(
+                _get_test_snap("test-snap-with-icon.snap"), "test-snap.snap"
+            )
+            os.utime("test-snap.snap", (1000, 1000))
+            squashfs.read_snap_file("test-snap.snap", "meta/snap.yaml")
+            self.assertThat(squashfs_mock.call_count, Equals(2))
+
+    def test_read_invalid_snap_file(self):
+        raised = self.assertRaises(
+            errors.SnapDataExtractionError,
+            squashfs.read_snap_file,
+            _get_test_snap("invalid.snap"),
+            "meta/snap.yaml",
+        )
+
+        self.assertThat(str(raised), Contains("Cannot read data from snap"))
+
+    @mock.patch("snapcraft.file_utils.get_tool_path", return_value="unsquashfs")
+    @mock.patch("subprocess.check_output")
+    def test_read_snap_file_with_unsupported_compression(
+        self, mock_check_output, mock_get_tool_path
+    ):
+        def extract(command):
+            os.makedirs(os.path.join(command[2], "meta"))
+            with open(os.path.join(command[2], command[5]), "wb") as f:
+                f.write(b"name: lzo\n")
+
+        mock_check_output.side_effect = extract
+        with open("test-snap.snap", "r+b") as f:
+            f.seek(20)
+            f.write(b"\x03\x00")
+
+        self.assertThat(
+            squashfs.read_snap_file("test-snap.snap", "meta/snap.yaml"),
+            Equals(b"name: lzo\n"),
+        )
+
+    @mock.patch("snapcraft.file_utils.get_tool_path", return_value="unsquashfs")
+    @mock.patch(
+        "subprocess.check_output",
+        side_effect=subprocess.CalledProcessError(1, ["unsquashfs"]),
+    )
+    def test_read_snap_file_with_unsupported_compression_fails(
+        self, mock_check_output, mock_get_tool_path
+    ):
+        with open("test-snap.snap", "r+b") as f:
+            f.seek(20)
+            f.write(b"\x03\x00")
+
+        self.assertRaises(
+            errors.SnapDataExtractionError,
+            squashfs.read_snap_file,
+            "test-snap.snap",
+            "meta/snap.yaml",
+        )
@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmark matching stage and prime filesets against a synthetic tree.
+
+The FilesetMatcher is compared to the glob based implementation it
+replaced, which is kept here as a reference, and the results of both are
+checked to be identical.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import timeit
+from glob import iglob
+
+from snapcraft.internal.pluginhandler._fileset_matcher import FilesetMatcher
+
+_FILESETS = [
+    ["*"],
+    ["*", "-usr/share/doc", "-usr/share/man", "-**/*.a"],
+    ["usr/lib", "bin", "-**/*.pc", "-usr/lib/*/.hidden"],
+    ["**/*.so*", "-usr/lib/dir-00001"],
+    ["usr/*/dir-*/*.txt", ".config/*", "-bin/file-*1.txt"],
+]
+
+
+def _reference_match(directory, includes, excludes):
+    include_files = set()
+    for include in includes:
+        if "*" in include:
+            include_files |= set(
+                iglob(os.path.join(directory, include), recursive=True)
+            )
+        else:
+            include_files.add(os.path.join(directory, include))
+    include_dirs = [x for x in include_files if os.path.isdir(x)]
+    include_files = {os.path.relpath(x, directory) for x in include_files}
+    for include_dir in include_dirs:
+        for root, dirs, files in os.walk(include_dir):
+            for name in dirs + files:
+                include_files.add(os.path.relpath(os.path.join(root, name), directory))
+
+    exclude_files = set()
+    for exclude in excludes:
+        exclude_files |= set(iglob(os.path.join(directory, exclude), recursive=True))
+    exclude_dirs = [
+        os.path.relpath(x, directory) for x in exclude_files if os.path.isdir(x)
+    ]
+    exclude_files = {os.path.relpath(x, directory) for x in exclude_files}
+
+    snap_files = include_files - exclude_files
+    for exclude_dir in exclude_dirs:
+        snap_files = {x for x in snap_files if not x.startswith(exclude_dir + "/")}
+    snap_dirs = {
+        x
+        for x in snap_files
+        if os.path.isdir(os.path.join(directory, x))
+        and not os.path.islink(os.path.join(directory, x))
+    }
+    return snap_files - snap_dirs, snap_dirs
+
+
+def _make_tree(directory, file_count, seed):
+    rng = random.Random(seed)
+    directories = [
+        "bin",
+        ".config",
+        "usr/share/doc",
+        "usr/share/man",
+        "usr/lib/x86_64-linux-gnu",
+    ]
+    for directory_path in directories:
+        os.makedirs(os.path.join(directory, directory_path))
+    for index in range(file_count):
+        if index % 50 == 0:
+            parent = rng.choice(directories)
+            directory_path = os.path.join(parent, "dir-{:05d}".format(index))
+            os.makedirs(os.path.join(directory, directory_path))
+            directories.append(directory_path)
+        name = "file-{:06d}{}".format(
+            index, rng.choice([".txt", ".so.1", ".a", ".pc", ""])
+        )
+        if index % 97 == 0:
+            name = "." + name
+        open(os.path.join(directory, rng.choice(directories), name), "w").close()
+    os.symlink("x86_64-linux-gnu", os.path.join(directory, "usr", "lib", "lib64"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        _make_tree(directory, args.files, args.seed)
+
+        for fileset in _FILESETS:
+            includes = [f for f in fileset if not f.startswith("-")] or ["*"]
+            excludes = [f[1:] for f in fileset if f.startswith("-")]
+            matcher = FilesetMatcher(includes, excludes)
+
+            if matcher.match(directory) != _reference_match(
+                directory, includes, excludes
+            ):
+                raise RuntimeError("Results differ for {!r}".format(fileset))
+
+            for name, function in [
+                ("glob", lambda: _reference_match(directory, includes, excludes)),
+                ("matcher", lambda: matcher.match(directory)),
+            ]:
+                best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+                print(
+                    "{} {!r} ({} files): {:.4f}s".format(
+                        name, fileset, args.files, best
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmark the part graph operations of PartsConfig.
+
+Synthetic graphs are used so plugins do not need to be loaded, parts are
+stand-ins only carrying a name and their dependencies.
+"""
+
+import argparse
+import random
+import timeit
+
+from snapcraft.internal.project_loader._parts_config import PartsConfig
+
+
+class _Part:
+    def __init__(self, name):
+        self.name = name
+        self.deps = []
+
+
+def _make_parts_config(part_count, max_after, seed):
+    rng = random.Random(seed)
+    names = ["part-{:05d}".format(i) for i in range(part_count)]
+    after_requests = dict()
+    for index, name in enumerate(names[1:], start=1):
+        after_requests[name] = rng.sample(
+            names[:index], rng.randint(0, min(index, max_after))
+        )
+
+    parts_config = PartsConfig.__new__(PartsConfig)
+    parts_config.all_parts = [_Part(name) for name in rng.sample(names, part_count)]
+    parts_config.after_requests = after_requests
+    parts_config._compute_dependencies()
+    return parts_config
+
+
+def _query_all(parts_config):
+    for part in parts_config.all_parts:
+        parts_config.get_dependencies(part.name, recursive=True)
+        parts_config.get_reverse_dependencies(part.name, recursive=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--parts", type=int, default=1000)
+    parser.add_argument("--max-after", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    parts_config = _make_parts_config(args.parts, args.max_after, args.seed)
+
+    benchmarks = [
+        ("sort", lambda: parts_config._sort_parts()),
+        ("recursive dependency queries", lambda: _query_all(parts_config)),
+    ]
+    for name, function in benchmarks:
+        best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        print("{} ({} parts): {:.4f}s".format(name, args.parts, best))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+
+# Copyright (C) 2019 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmark the round-trip latency of snapcraftctl calls from scriptlets.
+
+An override-build scriptlet calls a no-op snapcraftctl function repeatedly,
+the time of a scriptlet that does nothing is subtracted to leave the cost of
+the calls themselves. snapcraftctl is taken from the bin directory of this
+tree.
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+
+from snapcraft.internal.pluginhandler._runner import Runner
+
+
+def _run_scriptlet(directory, scriptlet):
+    runner = Runner(
+        part_properties={"override-build": scriptlet},
+        sourcedir=directory,
+        builddir=directory,
+        stagedir=directory,
+        primedir=directory,
+        builtin_functions={"build": lambda: None},
+    )
+    runner.build()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bin_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "bin")
+    os.environ["PATH"] = os.pathsep.join(
+        [os.path.abspath(bin_dir), os.environ.get("PATH", "")]
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = min(
+            timeit.repeat(
+                lambda: _run_scriptlet(directory, "true"),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        scriptlet = "\n".join(["snapcraftctl build"] * args.calls)
+        total = min(
+            timeit.repeat(
+                lambda: _run_scriptlet(directory, scriptlet),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+
+    print(
+        "{} snapcraftctl calls: {:.4f}s, {:.1f}ms per call".format(
+            args.calls, total - baseline, (total - baseline) / args.calls * 1000
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()